@@ -1,10 +1,11 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Store, Product, Variant, PinTemplate, GeneratedPin
+from .models import Store, Product, Variant, PinTemplate, GeneratedPin, PinContentCache, Job
 admin.site.register(Store)
 admin.site.register(Product)
 admin.site.register(Variant)
 admin.site.register(PinTemplate)
 admin.site.register(GeneratedPin)
-
+admin.site.register(PinContentCache)
+admin.site.register(Job)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PinAutomateConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pin_forge.pin_automate'
+
+    def ready(self):
+        from .response_cache import connect_signals
+
+        connect_signals()
@@ -0,0 +1,524 @@
+"""Benchmark scenarios for the pin_automate hot paths.
+
+Each scenario runs inside a transaction that is rolled back afterwards,
+so benchmarks can be pointed at a development database without leaving
+rows behind. Run them with ``python manage.py benchmark <scenario>``.
+
+Every measured step reports wall time and query count, plus the peak
+memory it allocated above its starting point when ``tracemalloc`` is
+tracing (``run_suite`` turns it on unless asked not to). ``run_suite``
+runs scenarios at several catalog sizes and adds an ``environment()``
+block, so JSON saved from two commits can be compared directly.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .field_selection import compact_values
+from .models import GeneratedPin, PinTemplate, Product, Store, Variant
+from .serializers import GeneratedPinSerializer, ProductSerializer
+from .services.catalog_import_service import CatalogImportService, product_price
+from .services.option_matrix import VariantMatrix
+from .services.product_feed import PRODUCTS_KEY
+from .services.product_sync_service import ProductSyncService
+from .services.script_extractor import ScriptExtractor, extract_product_json
+
+
+SCENARIOS = {}
+
+# Catalog sizes (in variants) accepted by name wherever a count is.
+SCALES = {"small": 100, "medium": 10_000, "large": 100_000}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+def measure(func, *args, **kwargs):
+    """Run ``func`` and return ``(result, stats)`` with wall time and query count.
+
+    While ``tracemalloc`` is tracing, ``stats`` also has ``peak_mb``: the
+    most memory held during the call beyond what was held before it.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+    stats = {"seconds": round(elapsed, 4), "queries": len(queries)}
+    if tracing:
+        stats["peak_mb"] = round((tracemalloc.get_traced_memory()[1] - baseline) / 1024 ** 2, 2)
+    return result, stats
+
+
+def rolled_back(func):
+    """Run ``func`` in a transaction that is always rolled back."""
+    outcome = {}
+
+    try:
+        with transaction.atomic():
+            outcome["value"] = func()
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    return outcome["value"]
+
+
+# -----------------------------------------------------
+# SYNTHETIC PRINT HIVE PAYLOADS
+# -----------------------------------------------------
+def synthetic_products(count, colors=5, sizes=4, start=0, materials=0):
+    """Yield ``count`` Print Hive-shaped product dicts.
+
+    Each product has ``colors * sizes`` variants once expanded (times
+    ``materials`` when a material option is added).
+    """
+    for i in range(start, start + count):
+        product = {
+            "id": 10_000_000 + i,
+            "title": f"Synthetic Tee {i}",
+            "description": f"Soft cotton tee number {i}.",
+            "path": f"/product/synthetic-tee-{i}",
+            "image": f"https://images.example.com/tee-{i}.png",
+            "default_variant": {"retail_price": 2499},
+            "options": [
+                {
+                    "type": "color",
+                    "items": [
+                        {"id": 100 + c, "label": f"Color {c}", "values": [f"#{c:06x}"]}
+                        for c in range(colors)
+                    ],
+                },
+                {
+                    "type": "size",
+                    "items": [
+                        {"id": 200 + s, "label": f"Size {s}"}
+                        for s in range(sizes)
+                    ],
+                },
+            ],
+        }
+        if materials:
+            product["options"].append({
+                "type": "material",
+                "items": [{"id": 300 + m, "label": f"Material {m}"} for m in range(materials)],
+            })
+        yield product
+
+
+def _benchmark_store():
+    user = User.objects.create(username=f"benchmark-{time.time_ns()}")
+    return Store.objects.create(user=user, name="Print Hive", url="https://example.com")
+
+
+# -----------------------------------------------------
+# SCENARIOS
+# -----------------------------------------------------
+@scenario("import")
+def bench_import(variants=10_000, colors=5, sizes=4):
+    """Bulk catalog import of ``variants`` variants, then a no-op re-import."""
+    per_product = colors * sizes
+    products = max(1, variants // per_product)
+
+    def run():
+        store = _benchmark_store()
+        first, first_stats = measure(
+            CatalogImportService(store).run, synthetic_products(products, colors, sizes)
+        )
+        again, again_stats = measure(
+            CatalogImportService(store).run, synthetic_products(products, colors, sizes)
+        )
+        return {
+            "products": products,
+            "variants": products * per_product,
+            "initial": {**first_stats, **first.as_dict()},
+            "reimport": {**again_stats, **again.as_dict()},
+        }
+
+    return rolled_back(run)
+
+
+@scenario("sync")
+def bench_sync(variants=100_000, colors=5, sizes=4):
+    """Initial sync, unchanged resync, then a resync with 1% repriced and 1% removed."""
+    per_product = colors * sizes
+    products = max(1, variants // per_product)
+
+    def changed_payload():
+        for i, raw in enumerate(synthetic_products(products, colors, sizes)):
+            if i % 100 == 0:
+                continue
+            if i % 100 == 1:
+                raw["default_variant"] = {"retail_price": 2999}
+            yield raw
+
+    def run():
+        store = _benchmark_store()
+        stats = {"products": products, "variants": products * per_product}
+        for name, payload in (
+            ("initial", synthetic_products(products, colors, sizes)),
+            ("unchanged", synthetic_products(products, colors, sizes)),
+            ("changed", changed_payload()),
+        ):
+            result, timing = measure(ProductSyncService(store).run, payload)
+            stats[name] = {**timing, **result.as_dict()}
+        return stats
+
+    return rolled_back(run)
+
+
+def _render_full(queryset, serializer_class):
+    return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+
+def _render_compact(queryset, columns):
+    return JSONRenderer().render(list(compact_values(queryset, columns)))
+
+
+def _compare_representations(queryset, serializer_class, columns):
+    full, full_stats = measure(_render_full, queryset, serializer_class)
+    compact, compact_stats = measure(_render_compact, queryset, columns)
+    return {
+        "rows": queryset.count(),
+        "full": {**full_stats, "bytes": len(full)},
+        "compact": {**compact_stats, "bytes": len(compact)},
+        "speedup": round(full_stats["seconds"] / max(compact_stats["seconds"], 1e-6), 1),
+        "size_ratio": round(len(full) / max(len(compact), 1), 1),
+    }
+
+
+@scenario("serializers")
+def bench_serializers(variants=10_000, colors=5, sizes=4):
+    """Full nested ModelSerializer lists vs the compact ``values()`` lists."""
+    from .views import GeneratedPinViewSet, ProductViewSet
+
+    per_product = colors * sizes
+    products = max(1, variants // per_product)
+
+    def run():
+        store = _benchmark_store()
+        CatalogImportService(store).run(synthetic_products(products, colors, sizes))
+        PinTemplate.objects.bulk_create(
+            PinTemplate(variant_id=pk, title=f"Pin {pk}", description="Cozy and soft.", hashtags="#tee")
+            for pk in Variant.objects.filter(product__store=store).values_list("id", flat=True)
+        )
+        GeneratedPin.objects.bulk_create(
+            GeneratedPin(pin_template_id=pk, final_image="https://images.example.com/pin.png",
+                         title="Pin", description="Cozy and soft.", board="904590343844451063")
+            for pk in PinTemplate.objects.filter(variant__product__store=store).values_list("id", flat=True)
+        )
+
+        return {
+            "products": _compare_representations(
+                ProductViewSet.queryset.filter(store=store),
+                ProductSerializer,
+                ProductViewSet.compact_fields,
+            ),
+            "generatedpins": _compare_representations(
+                GeneratedPinViewSet.queryset.filter(pin_template__variant__product__store=store),
+                GeneratedPinSerializer,
+                GeneratedPinViewSet.compact_fields,
+            ),
+        }
+
+    return rolled_back(run)
+
+
+# -----------------------------------------------------
+# ENDPOINTS
+# -----------------------------------------------------
+def write_products_json(path, products):
+    """Save ``products`` the way the scraper does, under ``<PRODUCTS_KEY>.b.data``."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"{PRODUCTS_KEY}":{{"b":{{"data":[')
+        for i, product in enumerate(products):
+            if i:
+                f.write(",")
+            json.dump(product, f, separators=(",", ":"))
+        f.write("]}}}")
+
+
+def _request(user, viewset, actions, method, path):
+    """Call a viewset action as ``user`` and render its response."""
+    factory = APIRequestFactory()
+    request = factory.post(path, {}, format="json") if method == "post" else factory.get(path)
+    force_authenticate(request, user=user)
+    response = viewset.as_view(actions)(request)
+    response.render()
+    return response
+
+
+def _endpoint(user, viewset, actions, method, path):
+    response, stats = measure(_request, user, viewset, actions, method, path)
+    stats = {"status": response.status_code, **stats, "bytes": len(response.content)}
+    if method == "post" and isinstance(response.data, dict):
+        stats["result"] = {key: value for key, value in response.data.items() if key != "errors"}
+    return stats
+
+
+@scenario("endpoints")
+def bench_endpoints(variants=10_000, colors=5, sizes=4):
+    """storeProductfromJson, generatedPin, savePin and the list endpoints, in order.
+
+    The POSTs run inline (``?sync=true``) against a synthetic
+    ``products.json`` in a temporary ``BASE_DIR``. Generation uses the
+    FakeModel and rendering is off, so nothing leaves the process.
+    """
+    from .views import GeneratedPinViewSet, PinTemplateViewSet, ProductViewSet
+
+    per_product = colors * sizes
+    products = max(1, variants // per_product)
+    lists = (
+        ("products", ProductViewSet, "/api/products/"),
+        ("pintemplates", PinTemplateViewSet, "/api/pintemplates/"),
+        ("generatedpins", GeneratedPinViewSet, "/api/generatedpins/"),
+    )
+
+    def run():
+        user = _benchmark_store().user
+        stats = {"products": products, "variants": products * per_product}
+        for name, viewset, action, path in (
+            ("storeProductfromJson", ProductViewSet, "storeProductfromJson", "/api/products/storeProductfromJson/"),
+            ("reimport", ProductViewSet, "storeProductfromJson", "/api/products/storeProductfromJson/"),
+            ("generatedPin", PinTemplateViewSet, "generatedPin", "/api/pintemplates/generatedPin/"),
+            ("savePin", GeneratedPinViewSet, "save_pin", "/api/generatedpins/savePin/"),
+        ):
+            stats[name] = _endpoint(user, viewset, {"post": action}, "post", f"{path}?sync=true")
+
+        for name, viewset, path in lists:
+            stats[f"list_{name}"] = {
+                "compact": _endpoint(user, viewset, {"get": "list"}, "get", f"{path}?page_size=100"),
+                "expanded": _endpoint(user, viewset, {"get": "list"}, "get", f"{path}?page_size=100&expand=all"),
+            }
+        return stats
+
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+        BASE_DIR=directory,
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],  # APIRequestFactory's host
+        PIN_AI_MODEL="fake",
+        PIN_RENDERING={"ENABLED": False},
+    ):
+        os.makedirs(os.path.join(directory, "downloads"))
+        write_products_json(
+            os.path.join(directory, "downloads", "products.json"), synthetic_products(products, colors, sizes)
+        )
+        return rolled_back(run)
+
+
+# -----------------------------------------------------
+# STOREFRONT PAGES
+# -----------------------------------------------------
+STOREFRONT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "storefronts")
+
+
+def storefront_page(name, products=0, colors=5, sizes=4):
+    """A saved storefront fixture with ``products`` synthetic products added."""
+    with open(os.path.join(STOREFRONT_FIXTURES, name), encoding="utf-8") as fp:
+        page = fp.read()
+    if not products:
+        return page
+
+    items = json.dumps(list(synthetic_products(products, colors, sizes)), separators=(",", ":"))[1:-1] + ","
+    marker = '"data":['
+    if marker not in page:
+        # serverApp-state escapes its quotes
+        marker = "&q;data&q;:["
+        items = items.replace("&", "&a;").replace('"', "&q;")
+    return page.replace(marker, marker + items, 1)
+
+
+def _lxml_extract_product_json(text):
+    """The DOM + "product" substring heuristic the extractor replaced."""
+    from lxml import html
+
+    for script in html.fromstring(text).xpath("//script/text()"):
+        if "product" in script.lower() and "{" in script:
+            fi = script.find("{")
+            li = script.rfind("};")
+            if li == -1:
+                li = script.rfind("}")
+            else:
+                li += 2
+            return script[fi:li + 1]
+    raise ValueError("No valid product JSON found")
+
+
+def _chunked_extract(text, chunk_size=64 * 1024):
+    extractor = ScriptExtractor()
+    for start in range(0, len(text), chunk_size):
+        if extractor.feed(text[start:start + chunk_size]) is not None:
+            break
+    return extractor.close()
+
+
+def _holds_products(blob):
+    try:
+        return "2712286816" in json.loads(blob)
+    except ValueError:
+        return False
+
+
+def _best_of(repeat, func, *args):
+    runs = [measure(func, *args) for _ in range(repeat)]
+    return runs[0][0], min((stats for _, stats in runs), key=lambda stats: stats["seconds"])
+
+
+@scenario("extraction")
+def bench_extraction(variants=10_000, colors=5, sizes=4, repeat=5):
+    """lxml heuristic vs the streaming script extractor over the saved storefronts."""
+    products = max(1, variants // (colors * sizes))
+    results = {"products": products}
+
+    for name in sorted(os.listdir(STOREFRONT_FIXTURES)):
+        page = storefront_page(name, products, colors, sizes)
+        stats = {"bytes": len(page)}
+        for label, func in (
+            ("lxml", _lxml_extract_product_json),
+            ("streaming", extract_product_json),
+            ("streaming_64k_chunks", _chunked_extract),
+        ):
+            blob, timing = _best_of(repeat, func, page)
+            stats[label] = {"seconds": timing["seconds"], "valid_json": _holds_products(blob)}
+        stats["speedup"] = round(stats["lxml"]["seconds"] / max(stats["streaming"]["seconds"], 1e-6), 1)
+        results[name] = stats
+
+    return results
+
+
+# -----------------------------------------------------
+# VARIANT MATRICES
+# -----------------------------------------------------
+def _nested_loop_variants(raw, product_pk):
+    """The colour x size loops (and per-variant dicts) VariantMatrix replaced."""
+    colors, sizes = [], []
+    for option in raw.get("options", []):
+        if option.get("type") == "color":
+            for item in option.get("items", []):
+                colors.append({"id": item.get("id"), "label": item.get("label"), "hex": item.get("values", [None])[0]})
+        if option.get("type") == "size":
+            for item in option.get("items", []):
+                sizes.append({"id": item.get("id"), "label": item.get("label")})
+
+    price = product_price(raw)
+    variants = []
+    for color in colors:
+        for size in sizes:
+            variants.append({
+                "name": f"{color['label']}-{size['label']}",
+                "variant_id": f"{color['id']}-{size['id']}",
+                "price": price,
+                "attributes": {"color": color.get("label"), "hex": color.get("hex"), "size": size.get("label")},
+            })
+    return [
+        Variant(product_id=product_pk, variant_id=v["variant_id"], name=v["name"], price=v["price"],
+                attributes=v["attributes"], status="new")
+        for v in variants
+    ]
+
+
+def _expand(products, build):
+    count = 0
+    for pk, raw in enumerate(products, 1):
+        count += len(build(raw, pk))
+    return count
+
+
+def _matrix_rows(raw, pk):
+    return VariantMatrix.from_product(raw, product_price(raw)).variant_ids
+
+
+def _matrix_variants(raw, pk):
+    return VariantMatrix.from_product(raw, product_price(raw)).variants(pk, status="new")
+
+
+@scenario("variants")
+def bench_variants(variants=100_000, colors=10, sizes=10, repeat=3):
+    """Variant expansion: nested loops vs VariantMatrix, 2-D and 3-D catalogs."""
+    results = {}
+    for label, shape in (("color_x_size", (colors, sizes, 0)), ("color_x_size_x_material", (colors, sizes, 4))):
+        per_product = colors * sizes * (shape[2] or 1)
+        products = list(synthetic_products(max(1, variants // per_product), *shape[:2], materials=shape[2]))
+        stats = {"products": len(products), "variants": len(products) * per_product}
+
+        builders = [("matrix_columns", _matrix_rows), ("matrix_instances", _matrix_variants)]
+        if not shape[2]:
+            # the old code has no third axis
+            builders.insert(0, ("nested_loops", _nested_loop_variants))
+        for name, build in builders:
+            count, timing = _best_of(repeat, _expand, products, build)
+            stats[name] = {"seconds": timing["seconds"], "variants": count}
+        results[label] = stats
+
+    return results
+
+
+# -----------------------------------------------------
+# SUITE
+# -----------------------------------------------------
+def git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment(trace_memory=True):
+    """What a result depends on besides the code, for comparing runs."""
+    return {
+        "revision": git_revision(),
+        "timestamp": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "cpus": os.cpu_count(),
+        "tracemalloc": trace_memory,
+    }
+
+
+def run_suite(names, scales, trace_memory=True):
+    """Run each scenario at each scale: ``{"environment", "results": {name: {variants: result}}}``.
+
+    ``tracemalloc`` makes the measured code noticeably slower; pass
+    ``trace_memory=False`` when only timings matter.
+    """
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        results = {}
+        for name in names:
+            results[name] = {str(variants): SCENARIOS[name](variants=variants) for variants in scales}
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {"environment": environment(trace_memory), "results": results}
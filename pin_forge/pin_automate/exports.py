@@ -0,0 +1,261 @@
+"""Unpaginated bulk exports of a store's catalog and pins.
+
+Rows are read with ``QuerySet.values().iterator(chunk_size=...)`` and
+encoded as they arrive, as NDJSON lines, CSV rows or one Parquet row
+group per chunk. Memory therefore stays bounded by one chunk whatever
+the store size. Every writer yields ``bytes`` so the same generator
+feeds a ``StreamingHttpResponse`` or a file.
+
+Parquet needs ``pyarrow``; it is imported only when asked for.
+"""
+
+import csv
+import io
+import json
+from datetime import timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .field_selection import compact_values
+from .models import GeneratedPin, PinTemplate, Product, Variant
+
+
+CHUNK_SIZE = 2000
+
+NDJSON = "ndjson"
+CSV = "csv"
+PARQUET = "parquet"
+
+CONTENT_TYPES = {
+    NDJSON: "application/x-ndjson",
+    CSV: "text/csv; charset=utf-8",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+# ------------------------------
+# datasets
+# ------------------------------
+# name -> (model, store lookup, {output name: ORM lookup})
+DATASETS = {
+    "products": (Product, "store", {
+        "id": "id",
+        "product_id": "product_id",
+        "title": "title",
+        "description": "description",
+        "url": "url",
+        "main_image": "main_image",
+        "status": "status",
+        "deleted_at": "deleted_at",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }),
+    "variants": (Variant, "product__store", {
+        "id": "id",
+        "product_id": "product_id",
+        "variant_id": "variant_id",
+        "name": "name",
+        "price": "price",
+        "image": "image",
+        "attributes": "attributes",
+        "status": "status",
+        "deleted_at": "deleted_at",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }),
+    "templates": (PinTemplate, "variant__product__store", {
+        "id": "id",
+        "variant_id": "variant_id",
+        "title": "title",
+        "description": "description",
+        "hashtags": "hashtags",
+        "alt_text": "alt_text",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }),
+    "pins": (GeneratedPin, "pin_template__variant__product__store", {
+        "id": "id",
+        "title": "title",
+        "description": "description",
+        "status": "status",
+        "board": "board",
+        "final_image": "final_image",
+        "pinterest_pin_id": "pinterest_pin_id",
+        "scheduled_at": "scheduled_at",
+        "posted_at": "posted_at",
+        "created_at": "created_at",
+        "pin_template_id": "pin_template_id",
+        "variant_id": "pin_template__variant_id",
+        "product_id": "pin_template__variant__product_id",
+    }),
+}
+
+
+def dataset_rows(store, dataset):
+    """``values()`` rows of ``dataset`` for ``store``, oldest first."""
+    model, store_lookup, columns = DATASETS[dataset]
+    queryset = model.objects.filter(**{store_lookup: store}).order_by("id")
+    return compact_values(queryset, columns)
+
+
+def column_fields(dataset):
+    """Map each output column of ``dataset`` to its model field."""
+    model, _, columns = DATASETS[dataset]
+    fields = {}
+    for name, lookup in columns.items():
+        current = model
+        *relations, last = lookup.split("__")
+        for relation in relations:
+            current = current._meta.get_field(relation).related_model
+        field = current._meta.get_field(last)
+        # "<fk>_id" columns hold the related primary key
+        fields[name] = field.target_field if field.is_relation else field
+    return fields
+
+
+# ------------------------------
+# writers
+# ------------------------------
+def iter_ndjson(rows, chunk_size=CHUNK_SIZE):
+    """One JSON document per line for every row of ``rows``."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield (encoder.encode(row) + "\n").encode()
+
+
+class _Echo:
+    """Write-through pseudo buffer for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows, columns, chunk_size=CHUNK_SIZE):
+    """A header line, then one CSV line per row (JSON columns as JSON)."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns).encode()
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield writer.writerow([_csv_value(row[name]) for name in columns]).encode()
+
+
+def _arrow_type(pa, field):
+    internal = field.get_internal_type()
+    if internal in ("AutoField", "BigAutoField", "IntegerField", "BigIntegerField",
+                    "PositiveIntegerField", "SmallIntegerField"):
+        return pa.int64()
+    if internal == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal == "DateTimeField":
+        return pa.timestamp("us", tz="UTC")
+    if internal == "BooleanField":
+        return pa.bool_()
+    if internal == "FloatField":
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if hasattr(value, "tzinfo") and value.tzinfo is not None:
+        return value.astimezone(dt_timezone.utc)
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain.
+
+    ``tell()`` keeps counting across drains because the Parquet footer
+    records absolute offsets.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def iter_parquet(rows, fields, chunk_size=CHUNK_SIZE):
+    """A Parquet file written one row group per ``chunk_size`` rows.
+
+    Each row group is handed to the caller as soon as it is written;
+    only the footer waits for the end, as the format requires.
+    """
+    pa, pq = _pyarrow()
+    schema = pa.schema([(name, _arrow_type(pa, field)) for name, field in fields.items()])
+    sink = _ChunkSink()
+    batch = []
+
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append({name: _arrow_value(value) for name, value in row.items()})
+            if len(batch) >= chunk_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+                yield sink.drain()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_stream(store, dataset, output=NDJSON, chunk_size=CHUNK_SIZE):
+    """Byte chunks of ``dataset`` for ``store`` encoded as ``output``."""
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset {dataset!r}; choose from {', '.join(DATASETS)}")
+
+    rows = dataset_rows(store, dataset)
+    if output == NDJSON:
+        return iter_ndjson(rows, chunk_size)
+    if output == CSV:
+        return iter_csv(rows, list(DATASETS[dataset][2]), chunk_size)
+    if output == PARQUET:
+        _pyarrow()  # fail before the response starts, not mid-stream
+        return iter_parquet(rows, column_fields(dataset), chunk_size)
+    raise ExportError(f"Unknown output {output!r}; choose from {', '.join(CONTENT_TYPES)}")
+
+
+def export_filename(store, dataset, output):
+    return f"store-{store.id}-{dataset}.{output}"
@@ -0,0 +1,107 @@
+"""``?fields=`` / ``?expand=`` support for the pin_automate viewsets.
+
+List endpoints answer with a compact representation by default: a few
+scalar columns read straight from ``QuerySet.values()``, so no model
+instances are built and no nested serializer runs. ``?fields=a,b``
+picks other columns from the viewset's ``compact_fields`` and
+``selectable_fields``.
+
+``?expand=store,variants`` (or ``?expand=all``) switches to the full
+serializer with just those nested relations; ``fields`` then names
+serializer fields. On detail views both parameters only trim the full
+representation.
+"""
+
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .serializers import DynamicFieldsModelSerializer
+
+
+EXPAND_ALL = "all"
+
+
+def query_list(request, name):
+    """Comma separated query parameter as a list (None when absent)."""
+    raw = request.query_params.get(name)
+    if raw is None:
+        return None
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+def compact_values(queryset, columns):
+    """``queryset.values()`` for ``columns`` (output name -> ORM lookup)."""
+    plain = [name for name, lookup in columns.items() if name == lookup]
+    aliased = {name: F(lookup) for name, lookup in columns.items() if name != lookup}
+    return (
+        queryset.select_related(None)
+        .prefetch_related(None)
+        .values(*plain, **aliased)
+    )
+
+
+class FieldSelectionMixin:
+    # output name -> ORM lookup, returned by list views by default
+    compact_fields = {}
+    # further columns a list view returns when named in ?fields=
+    selectable_fields = {}
+
+    def requested_fields(self):
+        return query_list(self.request, "fields")
+
+    def requested_expand(self):
+        expand = query_list(self.request, "expand")
+        if not expand:
+            return expand
+
+        serializer_class = self.get_serializer_class()
+        allowed = set(getattr(serializer_class, "expandable_fields", ()))
+        unknown = set(expand) - allowed - {EXPAND_ALL}
+        if unknown:
+            raise ValidationError({
+                "expand": f"Unknown relation(s): {', '.join(sorted(unknown))}. "
+                          f"Choose from: {', '.join(sorted(allowed | {EXPAND_ALL}))}."
+            })
+        return list(allowed) if EXPAND_ALL in expand else expand
+
+    def compact_columns(self):
+        available = {**self.compact_fields, **self.selectable_fields}
+        fields = self.requested_fields()
+        if not fields:
+            return self.compact_fields
+
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError({
+                "fields": f"Unknown field(s): {', '.join(unknown)}. "
+                          f"Choose from: {', '.join(available)}."
+            })
+        return {name: available[name] for name in fields}
+
+    def list(self, request, *args, **kwargs):
+        if self.requested_expand():
+            return super().list(request, *args, **kwargs)
+
+        columns = dict(self.compact_columns())
+        # Cursor pagination reads its position from the ordering columns.
+        for name in getattr(self.paginator, "ordering", None) or ():
+            columns.setdefault(name.lstrip("-"), name.lstrip("-"))
+
+        rows = compact_values(self.filter_queryset(self.get_queryset()), columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(rows))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in ("GET", "HEAD") and issubclass(
+            self.get_serializer_class(), DynamicFieldsModelSerializer
+        ):
+            fields = self.requested_fields()
+            expand = self.requested_expand()
+            if fields:
+                kwargs.setdefault("fields", fields)
+            if expand is not None:
+                kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,138 @@
+"""Persistent memoization of AI pin content.
+
+Entries live in ``PinContentCache`` and are keyed by a SHA-256 of the
+normalized prompt inputs: product title, description, the attributes
+that actually change the copy (``size`` is ignored by default) and the
+prompt version. Sizes of the same color therefore share one model
+response. Entries expire after ``TTL`` seconds and the table is trimmed
+to ``MAX_ENTRIES`` rows, least recently used first.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import PinContentCache
+from .pinGeneration import PROMPT_VERSION
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TTL": 30 * 24 * 3600,
+    "MAX_ENTRIES": 50_000,
+    "IGNORED_ATTRIBUTES": ["size"],
+}
+
+QUERY_CHUNK = 500
+
+
+def cache_setting(name):
+    return getattr(settings, "PIN_CONTENT_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    return " ".join(str(value).split()).casefold()
+
+
+def content_key(product_name, attributes, description, prompt_version=PROMPT_VERSION,
+                ignored_attributes=None):
+    """Stable hash of the inputs that determine the generated content."""
+    if ignored_attributes is None:
+        ignored_attributes = cache_setting("IGNORED_ATTRIBUTES")
+    ignored = {name.casefold() for name in ignored_attributes}
+
+    relevant = {
+        _normalize(name): _normalize(value)
+        for name, value in (attributes or {}).items()
+        if name.casefold() not in ignored and value not in (None, "")
+    }
+    payload = json.dumps(
+        [prompt_version, _normalize(product_name), _normalize(description), relevant],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _chunks(items, size=QUERY_CHUNK):
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+class ContentCache:
+    """DB-backed content cache with process-wide hit/miss counters."""
+
+    _lock = threading.Lock()
+    _counters = {"hits": 0, "misses": 0}
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = cache_setting("TTL") if ttl is None else ttl
+        self.max_entries = cache_setting("MAX_ENTRIES") if max_entries is None else max_entries
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return dict(cls._counters)
+
+    @classmethod
+    def _count(cls, hits, misses):
+        with cls._lock:
+            cls._counters["hits"] += hits
+            cls._counters["misses"] += misses
+
+    def get_many(self, keys):
+        """Return ``{key: content}`` for the fresh entries among ``keys``."""
+        keys = set(keys)
+        found = {}
+        fresh_after = timezone.now() - timedelta(seconds=self.ttl)
+
+        for chunk in _chunks(keys):
+            found.update(
+                PinContentCache.objects.filter(key__in=chunk, created_at__gte=fresh_after)
+                .values_list("key", "content")
+            )
+
+        for chunk in _chunks(found):
+            PinContentCache.objects.filter(key__in=chunk).update(
+                hits=F("hits") + 1, last_used_at=timezone.now()
+            )
+
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def set_many(self, entries):
+        """Insert or refresh ``{key: content}`` entries."""
+        if not entries:
+            return
+        now = timezone.now()
+        PinContentCache.objects.bulk_create(
+            [
+                PinContentCache(key=key, content=content, created_at=now, last_used_at=now)
+                for key, content in entries.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["content", "created_at", "last_used_at"],
+        )
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond the cap."""
+        expired_before = timezone.now() - timedelta(seconds=self.ttl)
+        PinContentCache.objects.filter(created_at__lt=expired_before).delete()
+
+        excess = PinContentCache.objects.count() - self.max_entries
+        if excess > 0:
+            stale = list(
+                PinContentCache.objects.order_by("last_used_at")
+                .values_list("id", flat=True)[:excess]
+            )
+            for chunk in _chunks(stale):
+                PinContentCache.objects.filter(id__in=chunk).delete()
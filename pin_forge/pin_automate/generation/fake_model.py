@@ -0,0 +1,60 @@
+"""Local stand-in for the Gemini ``GenerativeModel``.
+
+Used when ``settings.PIN_AI_MODEL`` is ``"fake"`` and by the benchmarks.
+It answers every prompt (single or batch) with deterministic pin JSON
+after an optional delay, and can be told to fail a fraction of calls to
+exercise retries.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+
+_NAME = re.compile(r"- Name: (.*)")
+
+
+class FakeModel:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, request_options=None):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake model timed out after {timeout}s")
+
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise RuntimeError("fake model failure")
+
+        names = [name.strip() for name in _NAME.findall(prompt)] or ["Product"]
+        if "JSON array" in prompt:
+            content = [
+                {"index": index, **self.content_for(name)}
+                for index, name in enumerate(names)
+            ]
+        else:
+            content = self.content_for(names[0])
+        return SimpleNamespace(text=json.dumps(content))
+
+    @staticmethod
+    def content_for(name):
+        return {
+            "title": f"{name} | Shop the look",
+            "description": f"Discover {name}, made to be worn every day.",
+            "hashtags": "#style #ootd #tshirt",
+            "alt_text": f"Photo of {name}",
+        }
@@ -0,0 +1,289 @@
+"""Disk-backed cache of downloaded source images.
+
+Product and variant images are shared by every color and size of a
+product, so renders of a store would otherwise download the same files
+over and over. ``ImageCache`` keeps them on disk under
+``IMAGE_CACHE['DIRECTORY']``:
+
+    blobs/ab/<sha256 of content>    the image bytes
+    urls/cd/<sha256 of url>         the content hash the URL resolved to
+
+Two URLs serving the same bytes share one blob. A URL entry is trusted
+for ``TTL`` seconds, then re-downloaded (an unchanged image lands on the
+same blob). Blobs are written to a temp file and renamed into place, so
+several processes can share the directory.
+
+Within a process, concurrent requests for one URL are coalesced into a
+single download, and at most ``MAX_DOWNLOADS`` downloads run at once.
+Reads touch the blob's mtime; once the directory grows past
+``MAX_BYTES`` the least recently used blobs are deleted. ``open()``
+returns a read-only ``mmap`` of a blob, and the renderer's workers map
+blobs by path instead of receiving the bytes.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from ..instrumentation import span
+from ..services.storefront_service import storefront_session, storefront_timeout
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "DIRECTORY": None,  # BASE_DIR/cache/images
+    "MAX_BYTES": 2 * 1024 ** 3,
+    "MAX_IMAGE_BYTES": 20 * 1024 ** 2,
+    "MAX_DOWNLOADS": 8,
+    "TTL": 7 * 24 * 3600,
+}
+
+CHUNK_SIZE = 64 * 1024
+LOW_WATER = 0.9  # evict down to this fraction of MAX_BYTES
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def image_cache_setting(name):
+    return getattr(settings, "IMAGE_CACHE", {}).get(name, DEFAULTS[name])
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fanout(root, key):
+    return os.path.join(root, key[:2], key)
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            result = write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return result
+
+
+class ImageCache:
+    """Fetch images through the on-disk cache; see the module docstring."""
+
+    def __init__(self, directory=None, max_bytes=None, max_image_bytes=None, max_downloads=None,
+                 ttl=None, session=None):
+        self.directory = str(
+            directory or image_cache_setting("DIRECTORY") or os.path.join(settings.BASE_DIR, "cache", "images")
+        )
+        self.max_bytes = max_bytes or image_cache_setting("MAX_BYTES")
+        self.max_image_bytes = max_image_bytes or image_cache_setting("MAX_IMAGE_BYTES")
+        self.ttl = image_cache_setting("TTL") if ttl is None else ttl
+        self.session = session
+        self._downloads = threading.BoundedSemaphore(max_downloads or image_cache_setting("MAX_DOWNLOADS"))
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._size = None  # bytes in blobs/, scanned on first write
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evicted": 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    # ------------------------------
+    # lookups
+    # ------------------------------
+    def _blob_path(self, content_hash):
+        return _fanout(os.path.join(self.directory, "blobs"), content_hash)
+
+    def _url_path(self, url):
+        return _fanout(os.path.join(self.directory, "urls"), _digest(url.encode("utf-8")))
+
+    def _cached(self, url):
+        """Blob path for a fresh entry of ``url``, touched for LRU; else None."""
+        entry = self._url_path(url)
+        try:
+            if time.time() - os.stat(entry).st_mtime > self.ttl:
+                return None
+            with open(entry, encoding="ascii") as f:
+                blob = self._blob_path(f.read().strip())
+            os.utime(blob)
+        except (OSError, ValueError):
+            return None  # missing, expired or evicted
+        return blob
+
+    def path(self, url):
+        """Local path of ``url``'s bytes, downloading them if needed."""
+        blob = self._cached(url)
+        if blob is not None:
+            self._count("hits")
+            return blob
+
+        with self._lock:
+            future = self._in_flight.get(url)
+            leader = future is None
+            if leader:
+                future = self._in_flight[url] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            # Another thread may have finished this URL just before we led.
+            blob = self._cached(url) or self._download(url)
+            future.set_result(blob)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[url]
+        return blob
+
+    def read(self, url):
+        with open(self.path(url), "rb") as f:
+            return f.read()
+
+    @contextmanager
+    def open(self, url):
+        """Read-only ``mmap`` of ``url``'s bytes."""
+        with open(self.path(url), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+    def fetch_many(self, urls, max_workers=None):
+        """``{url: path or exception}``; each distinct URL is fetched once."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        workers = min(max_workers or image_cache_setting("MAX_DOWNLOADS"), len(urls))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(urls, pool.map(self._path_or_error, urls)))
+
+    def _path_or_error(self, url):
+        try:
+            return self.path(url)
+        except Exception as e:
+            return e
+
+    # ------------------------------
+    # downloads
+    # ------------------------------
+    def _download(self, url):
+        self._count("misses")
+        session = self.session or storefront_session()
+        blobs = os.path.join(self.directory, "blobs")
+        os.makedirs(blobs, exist_ok=True)
+
+        with self._downloads, span("image.download", url=url):
+            fd, tmp = tempfile.mkstemp(dir=blobs, prefix=".tmp-")
+            try:
+                digest = hashlib.sha256()
+                size = 0
+                with os.fdopen(fd, "wb") as f:
+                    response = session.get(url, timeout=storefront_timeout(), stream=True)
+                    try:
+                        if not response.ok:
+                            raise ImageFetchError(f"{response.status_code} fetching {url}")
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > self.max_image_bytes:
+                                raise ImageFetchError(f"{url} is larger than {self.max_image_bytes} bytes")
+                            digest.update(chunk)
+                            f.write(chunk)
+                    finally:
+                        response.close()
+
+                content_hash = digest.hexdigest()
+                blob = self._blob_path(content_hash)
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                new = not os.path.exists(blob)
+                os.replace(tmp, blob)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+
+        _write_atomic(self._url_path(url), lambda f: f.write(content_hash.encode("ascii")))
+        if new:
+            self._grew(size)
+        return blob
+
+    # ------------------------------
+    # eviction
+    # ------------------------------
+    def _blobs(self):
+        """``(mtime, size, path)`` of every blob."""
+        found = []
+        root = os.path.join(self.directory, "blobs")
+        for shard in os.scandir(root) if os.path.isdir(root) else ():
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def _grew(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._blobs())
+            else:
+                self._size += size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used blobs until under ``LOW_WATER`` of the cap."""
+        blobs = sorted(self._blobs())
+        total = sum(size for _, size, _ in blobs)
+        target = self.max_bytes * LOW_WATER
+        evicted = 0
+        for _, size, path in blobs:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        # URL entries of evicted blobs are misses from now on (see _cached).
+        with self._lock:
+            self._size = total
+            self._counters["evicted"] += evicted
+        return evicted
+
+
+def image_cache():
+    """Process-wide ``ImageCache``, so concurrent callers share downloads."""
+    global _cache, _cache_pid
+    pid = os.getpid()
+    if _cache is None or _cache_pid != pid:
+        with _cache_lock:
+            if _cache is None or _cache_pid != pid:
+                _cache, _cache_pid = ImageCache(), pid
+    return _cache
@@ -0,0 +1,150 @@
+"""Compose a 2:3 Pinterest creative from a product image and pin copy.
+
+Pure Pillow, no Django: ``render_pin`` runs in ``PinRenderer``'s process
+pool, whose workers import only this module. Pillow is imported on first
+use, so the rest of the app works without it.
+
+Layout: the product image is scaled to cover the whole canvas and
+centre-cropped, a translucent band is laid over the bottom third, and the
+title (large, up to three lines) and text (up to three lines) are wrapped
+into it.
+"""
+
+import io
+import mmap
+
+
+RENDER_VERSION = "1"
+
+BAND_HEIGHT = 0.34  # of the canvas
+BAND_COLOR = (20, 20, 20, 170)
+TITLE_COLOR = (255, 255, 255)
+TEXT_COLOR = (225, 225, 225)
+MARGIN = 0.06  # of the canvas width
+TITLE_SIZE = 0.064  # of the canvas width
+TEXT_SIZE = 0.036
+MAX_TITLE_LINES = 3
+MAX_TEXT_LINES = 3
+
+
+class RenderError(Exception):
+    pass
+
+
+def _pil():
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        raise RenderError("Pin rendering needs Pillow (pip install Pillow)")
+    return Image, ImageDraw, ImageFont
+
+
+def pillow_available():
+    try:
+        _pil()
+    except RenderError:
+        return False
+    return True
+
+
+def cover(image, width, height):
+    """Scale ``image`` to cover ``width`` x ``height`` and crop the overflow evenly."""
+    Image, _, _ = _pil()
+    scale = max(width / image.width, height / image.height)
+    resized = image.resize(
+        (max(width, round(image.width * scale)), max(height, round(image.height * scale))),
+        Image.LANCZOS,
+    )
+    left = (resized.width - width) // 2
+    top = (resized.height - height) // 2
+    return resized.crop((left, top, left + width, top + height))
+
+
+def wrap_text(text, font, width, max_lines):
+    """Greedy word wrap to ``width`` pixels; the last line gets "..." if cut."""
+    lines = []
+    line = ""
+    truncated = False
+    for word in (text or "").split():
+        candidate = f"{line} {word}" if line else word
+        if not line or font.getlength(candidate) <= width:
+            line = candidate
+        elif len(lines) + 1 == max_lines:
+            truncated = True
+            break
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+
+    if truncated:
+        last = lines[-1]
+        while last and font.getlength(f"{last}...") > width:
+            last = last.rsplit(" ", 1)[0] if " " in last else last[:-1]
+        lines[-1] = f"{last}..."
+    return lines
+
+
+def load_font(size, font_path=None):
+    _, _, ImageFont = _pil()
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size=size)
+
+
+def _decode(file, width, height):
+    Image, _, _ = _pil()
+    source = Image.open(file)
+    source.draft("RGB", (width, height))  # JPEG: decode at a reduced scale when possible
+    return source.convert("RGB")
+
+
+def load_source(width, height, image_bytes=None, image_path=None):
+    """The source image as RGB, from bytes or a memory-mapped file."""
+    try:
+        if image_path is None:
+            return _decode(io.BytesIO(image_bytes), width, height)
+        with open(image_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return _decode(view, width, height)
+    except (OSError, ValueError) as e:
+        raise RenderError(f"Unreadable source image: {e}")
+
+
+def render_pin(image_bytes=None, title="", text="", width=1000, height=1500, quality=88,
+               font_path=None, bold_font_path=None, image_path=None):
+    """JPEG bytes of the composed pin, from ``image_bytes`` or the file at ``image_path``."""
+    Image, ImageDraw, _ = _pil()
+    source = load_source(width, height, image_bytes, image_path)
+
+    canvas = cover(source, width, height).convert("RGBA")
+
+    band_top = height - round(height * BAND_HEIGHT)
+    overlay = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+    ImageDraw.Draw(overlay).rectangle((0, band_top, width, height), fill=BAND_COLOR)
+    canvas = Image.alpha_composite(canvas, overlay)
+
+    draw = ImageDraw.Draw(canvas)
+    margin = round(width * MARGIN)
+    title_font = load_font(round(width * TITLE_SIZE), bold_font_path or font_path)
+    text_font = load_font(round(width * TEXT_SIZE), font_path)
+
+    y = band_top + margin
+    for line in wrap_text(title, title_font, width - 2 * margin, MAX_TITLE_LINES):
+        draw.text((margin, y), line, font=title_font, fill=TITLE_COLOR)
+        y += round(title_font.size * 1.2)
+    y += round(text_font.size * 0.6)
+    for line in wrap_text(text, text_font, width - 2 * margin, MAX_TEXT_LINES):
+        if y + text_font.size > height - margin:
+            break
+        draw.text((margin, y), line, font=text_font, fill=TEXT_COLOR)
+        y += round(text_font.size * 1.35)
+
+    out = io.BytesIO()
+    canvas.convert("RGB").save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def render_job(job):
+    """Process pool entry point: ``render_pin(**job)``."""
+    return render_pin(**job)
@@ -1,13 +1,32 @@
 import google.generativeai as genai
 from django.conf import settings
 
+from ..instrumentation import span
+from .fake_model import FakeModel
+
 genai.configure(api_key=settings.GOOGLE_API_KEY)
 
 
-model = genai.GenerativeModel("gemini-2.5-flash")
+# Bump whenever build_prompt changes so cached content is not reused.
+PROMPT_VERSION = "1"
+
+_models = {}
+
 
-def generate_pin_content(product_name, attributes, description):
-    prompt = f"""
+def get_model(name=None):
+    """Return the (cached) content model named by ``settings.PIN_AI_MODEL``.
+
+    ``"fake"`` selects the local FakeModel, so the generation pipeline can
+    be exercised without calling Gemini.
+    """
+    name = name or getattr(settings, "PIN_AI_MODEL", "gemini-2.5-flash")
+    if name not in _models:
+        _models[name] = FakeModel() if name == "fake" else genai.GenerativeModel(name)
+    return _models[name]
+
+
+def build_prompt(product_name, attributes, description):
+    return f"""
     Generate Pinterest Pin content in STRICT JSON ONLY.
 
     Product:
@@ -26,7 +45,13 @@ def generate_pin_content(product_name, attributes, description):
     Do NOT include markdown. No explanations.
     """
 
-    response = model.generate_content(prompt)
+
+@span("ai.generate")
+def generate_pin_content(product_name, attributes, description, model=None, timeout=None):
+    prompt = build_prompt(product_name, attributes, description)
+
+    request_options = {"timeout": timeout} if timeout else None
+    response = (model or get_model()).generate_content(prompt, request_options=request_options)
 
     import json
     try:
@@ -34,3 +59,88 @@ def generate_pin_content(product_name, attributes, description):
     except json.JSONDecodeError:
         return {"title": "", "description": response.text, "hashtags": "", "alt_text": ""}
 
+
+# -----------------------------------------------------
+# BATCH MODE: many variants per prompt
+# -----------------------------------------------------
+PIN_CONTENT_FIELDS = ("title", "description", "hashtags", "alt_text")
+
+
+def build_batch_prompt(items):
+    products = "\n".join(
+        f"""    [{index}]
+    - Name: {item["product_name"]}
+    - Attributes: {item["attributes"]}
+    - Description: {item["description"]}"""
+        for index, item in enumerate(items)
+    )
+    return f"""
+    Generate Pinterest Pin content in STRICT JSON ONLY for each of the
+    {len(items)} products below.
+
+    Products:
+{products}
+
+    Return a JSON array with one object per product:
+    [
+        {{
+            "index": <product number>,
+            "title": "...",
+            "description": "...",
+            "hashtags": "...",
+            "alt_text": "..."
+        }}
+    ]
+
+    Do NOT include markdown. No explanations.
+    """
+
+
+def valid_pin_content(content):
+    return isinstance(content, dict) and all(
+        isinstance(content.get(name), str) for name in PIN_CONTENT_FIELDS
+    )
+
+
+def parse_batch_response(text, count):
+    """Return ``count`` items, each a pin content dict or None if unusable."""
+    import json
+
+    results = [None] * count
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        return results
+    if not isinstance(items, list):
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position)
+        if not isinstance(index, int) or not 0 <= index < count or results[index] is not None:
+            continue
+        if valid_pin_content(item):
+            results[index] = {name: item[name] for name in PIN_CONTENT_FIELDS}
+
+    return results
+
+
+@span("ai.generate_batch")
+def generate_pin_content_batch(items, model=None, timeout=None):
+    """Generate content for several products with a single model call.
+
+    ``items`` are dicts with ``product_name``, ``attributes`` and
+    ``description``. Returns a list aligned with ``items`` holding the
+    content dict, or None for items missing from or invalid in the reply.
+    """
+    prompt = build_batch_prompt(items)
+
+    request_options = {"timeout": timeout} if timeout else None
+    response = (model or get_model()).generate_content(prompt, request_options=request_options)
+
+    return parse_batch_response(response.text, len(items))
@@ -0,0 +1,246 @@
+"""Bounded-concurrency pin template generation.
+
+Model calls run on a thread pool with at most ``max_workers`` requests
+in flight. Each call gets a timeout and is retried with exponential
+backoff. All database work stays on the calling thread: results are
+buffered as they complete and flushed to ``PinTemplate`` with
+``bulk_create`` every ``flush_size`` rows, so a timeout or crash keeps
+everything generated so far.
+
+Variants whose prompt inputs hash to the same content key (e.g. sizes of
+one color) share a single model call, and keys already in the content
+cache are not sent to the model at all. With ``batch_size`` > 1 several
+keys go into one batch prompt; only items missing or invalid in the
+batch reply are retried with single-variant calls.
+"""
+
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+
+from django.conf import settings
+
+from ..instrumentation import span
+from ..models import PinTemplate
+from ..response_cache import invalidate_catalog
+from .content_cache import ContentCache, cache_setting, content_key
+from .pinGeneration import generate_pin_content, generate_pin_content_batch
+
+
+DEFAULTS = {
+    "MAX_WORKERS": 8,
+    "MAX_WORKERS_LIMIT": 32,
+    "TIMEOUT": 30,
+    "RETRIES": 3,
+    "BACKOFF": 1.0,
+    "FLUSH_SIZE": 25,
+    "BATCH_SIZE": 1,
+    "MAX_BATCH_SIZE": 20,
+}
+
+
+def generation_setting(name):
+    return getattr(settings, "PIN_GENERATION", {}).get(name, DEFAULTS[name])
+
+
+@dataclass
+class PipelineResult:
+    created: int = 0
+    skipped: int = 0  # templated by a concurrent run meanwhile
+    failed: int = 0
+    model_calls: int = 0
+    batch_fallbacks: int = 0
+    cache_hits: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return asdict(self)
+
+
+class PinGenerationPipeline:
+    """Generate and persist a ``PinTemplate`` for each variant given.
+
+    ``generate`` is called as ``generate(product_name=..., attributes=...,
+    description=..., timeout=...)`` and must return the pin content dict;
+    pass a wrapper around a FakeModel to run without Gemini.
+    ``generate_batch`` takes ``(items, timeout=...)`` and returns a list
+    aligned with ``items`` of content dicts or None. ``cache``
+    defaults to a ``ContentCache`` when ``PIN_CONTENT_CACHE['ENABLED']``;
+    pass ``cache=False`` to always call the model. ``progress`` is called
+    as ``progress(done, total)`` after every flush.
+    """
+
+    MAX_ERRORS = 20
+
+    def __init__(self, generate=None, max_workers=None, timeout=None,
+                 retries=None, backoff=None, flush_size=None, cache=None,
+                 batch_size=None, generate_batch=None, progress=None):
+        self.generate = generate or generate_pin_content
+        self.generate_batch = generate_batch or generate_pin_content_batch
+        batch_limit = generation_setting("MAX_BATCH_SIZE")
+        self.batch_size = max(1, min(batch_size or generation_setting("BATCH_SIZE"), batch_limit))
+        limit = generation_setting("MAX_WORKERS_LIMIT")
+        self.max_workers = max(1, min(max_workers or generation_setting("MAX_WORKERS"), limit))
+        self.timeout = timeout or generation_setting("TIMEOUT")
+        self.retries = generation_setting("RETRIES") if retries is None else retries
+        self.backoff = generation_setting("BACKOFF") if backoff is None else backoff
+        self.flush_size = flush_size or generation_setting("FLUSH_SIZE")
+        self.progress = progress
+
+        if cache is None and cache_setting("ENABLED"):
+            cache = ContentCache()
+        self.cache = cache or None
+
+    def run(self, variants):
+        result = PipelineResult()
+        self._result = result
+        self._pending = []
+        self._fresh = {}
+
+        # content key -> variants sharing it, and one request per key
+        groups = {}
+        requests = {}
+        for variant in variants:
+            request = self._request_for(variant)
+            key = content_key(**request)
+            groups.setdefault(key, []).append(variant)
+            requests.setdefault(key, request)
+        self._total = sum(len(group) for group in groups.values())
+
+        if self.cache is not None:
+            for key, content in self.cache.get_many(groups).items():
+                for variant in groups.pop(key):
+                    self._pending.append(self._template_for(variant, content))
+                    result.cache_hits += 1
+            self._flush()
+
+        keys = list(groups)
+        jobs = iter([keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = {}
+
+            def submit_next():
+                job = next(jobs, None)
+                if job is None:
+                    return False
+                work = self._call if len(job) == 1 else self._call_batch
+                in_flight[pool.submit(work, [requests[key] for key in job])] = job
+                return True
+
+            for _ in range(self.max_workers * 2):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        outcomes, calls, fallbacks = future.result()
+                    except Exception as e:
+                        outcomes, calls, fallbacks = [e] * len(job), 1, 0
+                    result.model_calls += calls
+                    result.batch_fallbacks += fallbacks
+
+                    for key, content in zip(job, outcomes):
+                        group = groups[key]
+                        if isinstance(content, Exception):
+                            result.failed += len(group)
+                            if len(result.errors) < self.MAX_ERRORS:
+                                result.errors.append({"variant_id": group[0].variant_id, "error": str(content)})
+                            continue
+                        # don't memoize the raw-text fallback of an unparsable reply
+                        if content.get("title"):
+                            self._fresh[key] = content
+                        for variant in group:
+                            self._pending.append(self._template_for(variant, content))
+                    submit_next()
+
+                if len(self._pending) >= self.flush_size:
+                    self._flush()
+
+        self._flush()
+        if self.cache is not None and result.model_calls:
+            self.cache.evict()
+        return result
+
+    # ------------------------------
+    # worker side (no ORM access)
+    # ------------------------------
+    @staticmethod
+    def _request_for(variant):
+        return {
+            "product_name": variant.product.title,
+            "attributes": variant.attributes,
+            "description": variant.product.description,
+        }
+
+    def _retry(self, func, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return func(*args, timeout=self.timeout, **kwargs)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def _call(self, requests):
+        """Single-variant job; returns ``(outcomes, model_calls, fallbacks)``."""
+        return [self._retry(self.generate, **requests[0])], 1, 0
+
+    def _call_batch(self, requests):
+        """Batch job; items the batch reply didn't cover get single calls."""
+        outcomes = self._retry(self.generate_batch, requests)
+        calls = 1
+        fallbacks = 0
+
+        for index, content in enumerate(outcomes):
+            if content is not None:
+                continue
+            fallbacks += 1
+            calls += 1
+            try:
+                outcomes[index] = self._retry(self.generate, **requests[index])
+            except Exception as e:
+                outcomes[index] = e
+
+        return outcomes, calls, fallbacks
+
+    # ------------------------------
+    # persistence (calling thread)
+    # ------------------------------
+    @staticmethod
+    def _template_for(variant, ai_output):
+        return PinTemplate(
+            variant=variant,
+            title=ai_output.get("title", variant.name),
+            description=ai_output.get("description", ""),
+            hashtags=ai_output.get("hashtags", ""),
+            alt_text=ai_output.get("alt_text", ""),
+            ai_prompt_used="auto_generated",
+            ai_response_id=""
+        )
+
+    def _flush(self):
+        if self.cache is not None and self._fresh:
+            self.cache.set_many(self._fresh)
+            self._fresh = {}
+
+        if self._pending:
+            # Another run may have templated the same variant meanwhile, and
+            # ignore_conflicts hides which rows lost: count them instead.
+            templates = PinTemplate.objects.filter(variant_id__in=[t.variant_id for t in self._pending])
+            with span("db.save_templates"):
+                existing = templates.count()
+                PinTemplate.objects.bulk_create(self._pending, ignore_conflicts=True)
+                created = templates.count() - existing
+            self._result.created += created
+            self._result.skipped += len(self._pending) - created
+            invalidate_catalog()
+            self._pending = []
+
+        if self.progress is not None:
+            done = self._result.created + self._result.skipped + self._result.failed
+            self.progress(done, self._total)
@@ -0,0 +1,249 @@
+"""Render pin creatives into a content-addressed cache under MEDIA_ROOT.
+
+``PinRenderer.render(templates)`` turns each ``PinTemplate`` (its
+variant's image, title and description) into a 2:3 JPEG via
+``imaging.render_pin`` and returns the public URL of each.
+
+Files are named by a SHA-256 of everything that affects the output
+(source image URL, copy, canvas size, quality, fonts and the layout's
+``RENDER_VERSION``), so re-rendering an unchanged template is a storage
+lookup and templates with identical inputs share one file. Misses have
+their source images fetched once per URL through the disk-backed
+``ImageCache``, then are rendered on a process pool of
+``PIN_RENDERING['MAX_WORKERS']`` (all cores by default) so batches aren't
+serialized on the GIL. Workers get cached images by path and map them;
+only the rendered JPEGs travel back. Files are written in the calling
+process.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from ..services.storefront_service import storefront_session, storefront_timeout
+from ..instrumentation import span
+from .image_cache import image_cache as shared_image_cache, image_cache_setting
+from .imaging import RENDER_VERSION, RenderError, render_job
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "WIDTH": 1000,
+    "HEIGHT": 1500,
+    "QUALITY": 88,
+    "MAX_WORKERS": None,
+    "FETCH_WORKERS": 8,
+    "DIRECTORY": "pins",
+    "FONT": None,
+    "BOLD_FONT": None,
+    "BASE_URL": "",
+}
+
+
+def render_setting(name):
+    return getattr(settings, "PIN_RENDERING", {}).get(name, DEFAULTS[name])
+
+
+def render_spec(template):
+    """The inputs of a template's creative."""
+    variant = template.variant
+    return {
+        "image_url": variant.image or variant.product.main_image or "",
+        "title": template.title or "",
+        "text": template.description or "",
+    }
+
+
+def _options():
+    return {
+        "width": render_setting("WIDTH"),
+        "height": render_setting("HEIGHT"),
+        "quality": render_setting("QUALITY"),
+        "font_path": render_setting("FONT"),
+        "bold_font_path": render_setting("BOLD_FONT"),
+    }
+
+
+def render_key(spec, options=None):
+    """Stable hash of everything that determines the rendered file."""
+    payload = json.dumps([RENDER_VERSION, spec, options or _options()], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_name(key):
+    return f"{render_setting('DIRECTORY')}/{key[:2]}/{key}.jpg"
+
+
+def fetch_image(url):
+    response = storefront_session().get(url, timeout=storefront_timeout())
+    response.raise_for_status()
+    return response.content
+
+
+@dataclass
+class RenderResult:
+    rendered: int = 0
+    cache_hits: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    urls: dict = field(default_factory=dict)  # template id -> public URL
+
+    def as_dict(self):
+        return {
+            "rendered": self.rendered,
+            "cache_hits": self.cache_hits,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+class PinRenderer:
+    """Render ``PinTemplate`` creatives; see the module docstring.
+
+    Source images come from ``image_cache`` (the process-wide
+    ``ImageCache`` when ``IMAGE_CACHE['ENABLED']``), or from ``fetch(url)``
+    returning the bytes. ``storage`` defaults to ``default_storage``
+    (``MEDIA_ROOT``).
+    """
+
+    MAX_ERRORS = 20
+
+    def __init__(self, max_workers=None, fetch=None, storage=None, fetch_workers=None, image_cache=None):
+        self.max_workers = max(1, max_workers or render_setting("MAX_WORKERS") or os.cpu_count() or 1)
+        self.fetch_workers = fetch_workers or render_setting("FETCH_WORKERS")
+        if fetch is None and image_cache is None and image_cache_setting("ENABLED"):
+            image_cache = shared_image_cache()
+        self.image_cache = image_cache if fetch is None else None
+        self.fetch = fetch or fetch_image
+        self.storage = storage or default_storage
+        self.options = _options()
+
+    @span("render.batch")
+    def render(self, templates):
+        result = RenderResult()
+        self._result = result
+
+        # render key -> template ids sharing it, and its inputs
+        groups = {}
+        specs = {}
+        for template in templates:
+            spec = render_spec(template)
+            if not spec["image_url"]:
+                self._fail([template.pk], "No source image")
+                continue
+            key = render_key(spec, self.options)
+            groups.setdefault(key, []).append(template.pk)
+            specs.setdefault(key, spec)
+
+        for key in list(groups):
+            name = cache_name(key)
+            if self.storage.exists(name):
+                result.cache_hits += len(groups[key])
+                self._done(groups.pop(key), name)
+
+        if groups:
+            self._render_missing(groups, specs)
+        return result
+
+    # ------------------------------
+    # misses
+    # ------------------------------
+    def _download(self, url):
+        try:
+            return {"image_bytes": self.fetch(url)}
+        except Exception as e:
+            return RenderError(f"Could not fetch {url}: {e}")
+
+    def _sources(self, urls):
+        """``{url: render_pin source kwargs or RenderError}``."""
+        if self.image_cache is not None:
+            return {
+                url: RenderError(f"Could not fetch {url}: {found}") if isinstance(found, Exception)
+                else {"image_path": found}
+                for url, found in self.image_cache.fetch_many(urls, self.fetch_workers).items()
+            }
+        with ThreadPoolExecutor(max_workers=max(1, min(self.fetch_workers, len(urls)))) as pool:
+            return dict(zip(urls, pool.map(self._download, urls)))
+
+    def _jobs(self, keys, groups, specs):
+        """``{key: render_pin kwargs}`` for ``keys``, each source image fetched once."""
+        sources = self._sources(list({specs[key]["image_url"] for key in keys}))
+
+        jobs = {}
+        for key in keys:
+            spec = specs[key]
+            source = sources[spec["image_url"]]
+            if isinstance(source, Exception):
+                self._fail(groups[key], str(source))
+                continue
+            jobs[key] = {**source, "title": spec["title"], "text": spec["text"], **self.options}
+        return jobs
+
+    def _render_missing(self, groups, specs):
+        keys = list(groups)
+        pool = None
+        if len(keys) > 1 and self.max_workers > 1:
+            # spawn: workers import only imaging.py, never Django or open sockets
+            pool = ProcessPoolExecutor(
+                max_workers=min(self.max_workers, len(keys)), mp_context=multiprocessing.get_context("spawn")
+            )
+
+        # A few jobs per worker at a time, so source images aren't all held at once.
+        chunk_size = self.max_workers * 4
+        try:
+            for start in range(0, len(keys), chunk_size):
+                jobs = self._jobs(keys[start:start + chunk_size], groups, specs)
+                if pool is None:
+                    for key, job in jobs.items():
+                        self._finish(groups[key], key, lambda job=job: render_job(job))
+                    continue
+
+                futures = {pool.submit(render_job, job): key for key, job in jobs.items()}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    self._finish(groups[key], key, future.result)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    # ------------------------------
+    # bookkeeping (calling process)
+    # ------------------------------
+    def _finish(self, template_ids, key, rendered):
+        """Store the output of ``rendered()``, or record why it failed."""
+        try:
+            data = rendered()
+        except Exception as e:
+            self._fail(template_ids, str(e))
+            return
+        self._save(template_ids, key, data)
+
+    def _save(self, template_ids, key, data):
+        name = cache_name(key)
+        if not self.storage.exists(name):
+            saved = self.storage.save(name, ContentFile(data))
+            if saved != name:
+                # Another renderer wrote the same file first; keep theirs.
+                self.storage.delete(saved)
+        self._result.rendered += len(template_ids)
+        self._done(template_ids, name)
+
+    def _done(self, template_ids, name):
+        url = self.storage.url(name)
+        if url.startswith("/"):
+            # Pinterest fetches media itself, so it needs an absolute URL.
+            url = render_setting("BASE_URL").rstrip("/") + url
+        for template_id in template_ids:
+            self._result.urls[template_id] = url
+
+    def _fail(self, template_ids, error):
+        self._result.failed += len(template_ids)
+        if len(self._result.errors) < self.MAX_ERRORS:
+            self._result.errors.append({"template_ids": template_ids, "error": error})
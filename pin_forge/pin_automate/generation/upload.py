@@ -1,4 +1,4 @@
-import requests
+from ..services import pinterest_client
 
 PINTEREST_ACCESS_TOKEN = ""
 PINTEREST_BOARD_ID = "YOUR_BOARD_ID"
@@ -21,7 +21,7 @@ def upload_pin(title, alt_text, image_url):
         }
     }
 
-    resp = requests.post(url, json=data, headers=headers)
+    resp = pinterest_client.request("POST", url, json=data, headers=headers)
     return resp.json()
 
 
@@ -0,0 +1,292 @@
+"""Timing spans, per-request query counts and Prometheus metrics.
+
+``span(name)`` times a block (or decorates a function) and records it in
+the ``pin_forge_span_seconds`` histogram labelled by span name, plus an
+error counter when the block raises. Span names are fixed strings such as
+``storefront.scrape``, ``ai.generate`` or ``pinterest.post.pins``, so the
+label set stays small; anything variable goes into the attributes, which
+only OTLP sees.
+
+``InstrumentationMiddleware`` counts and times each request's database
+queries with ``connection.execute_wrapper``, records per-view request
+metrics and answers with a ``Server-Timing`` header. ``metrics_view``
+serves everything in the Prometheus text format.
+
+Metrics live in process memory, so each web or worker process exposes
+its own. With ``INSTRUMENTATION['OTLP_ENDPOINT']`` set and the
+OpenTelemetry SDK installed, spans are also exported to that collector
+over OTLP/HTTP.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "METRICS_TOKEN": "",
+    "OTLP_ENDPOINT": "",
+    "SERVICE_NAME": "pin_forge",
+    "BUCKETS": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    "QUERY_BUCKETS": (1, 2, 5, 10, 20, 50, 100, 200, 500),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS = {
+    "pin_forge_span_seconds": ("histogram", "Duration of instrumented operations.", "BUCKETS"),
+    "pin_forge_span_errors_total": ("counter", "Instrumented operations that raised.", None),
+    "pin_forge_http_requests_total": ("counter", "HTTP requests by view, method and status.", None),
+    "pin_forge_http_request_seconds": ("histogram", "HTTP request duration by view.", "BUCKETS"),
+    "pin_forge_http_request_queries": ("histogram", "Database queries per HTTP request by view.", "QUERY_BUCKETS"),
+    "pin_forge_db_query_seconds_total": ("counter", "Time spent in database queries by view.", None),
+}
+
+
+def instrumentation_setting(name):
+    return getattr(settings, "INSTRUMENTATION", {}).get(name, DEFAULTS[name])
+
+
+# ------------------------------
+# registry
+# ------------------------------
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Thread-safe counters and histograms, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (metric, labels) -> value
+        self._histograms = {}  # (metric, labels) -> [bucket counts..., +Inf, sum]
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, metric, labels, value=1):
+        key = (metric, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, metric, labels, value):
+        buckets = instrumentation_setting(METRICS[metric][2])
+        key = (metric, _labels(labels))
+        index = bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def value(self, metric, **labels):
+        """A counter's value, or a histogram's observation count."""
+        key = (metric, _labels(labels))
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            series = self._histograms.get(key)
+            return sum(series[:-1]) if series else 0
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(series) for key, series in self._histograms.items()}
+
+        lines = []
+        for metric, (kind, help_text, buckets_setting) in METRICS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            if kind == "counter":
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric:
+                        lines.append(f"{metric}{_format_labels(labels)} {_format_number(value)}")
+                continue
+
+            bounds = list(instrumentation_setting(buckets_setting)) + ["+Inf"]
+            for (name, labels), series in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(bounds, series):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {_format_number(series[-1])}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ------------------------------
+# OTLP export (optional)
+# ------------------------------
+_provider = None
+_tracer = None
+_tracer_pid = None
+_tracer_lock = threading.Lock()
+
+
+def _otel():
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    return OTLPSpanExporter, Resource, TracerProvider, BatchSpanProcessor
+
+
+def otlp_available():
+    try:
+        _otel()
+    except ImportError:
+        return False
+    return True
+
+
+def _build_provider():
+    endpoint = instrumentation_setting("OTLP_ENDPOINT")
+    if not endpoint:
+        return None
+    try:
+        OTLPSpanExporter, Resource, TracerProvider, BatchSpanProcessor = _otel()
+    except ImportError:
+        logger.warning("OTLP export needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": instrumentation_setting("SERVICE_NAME")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    return provider
+
+
+def tracer():
+    """Process-wide OpenTelemetry tracer, or None when OTLP export is off."""
+    global _provider, _tracer, _tracer_pid
+    pid = os.getpid()
+    if _tracer_pid != pid:
+        with _tracer_lock:
+            if _tracer_pid != pid:
+                _provider = _build_provider()
+                _tracer = _provider.get_tracer("pin_forge.pin_automate") if _provider is not None else None
+                _tracer_pid = pid
+    return _tracer
+
+
+def flush_spans(timeout_millis=5000):
+    """Export spans still queued in the batch processor; True if all were sent."""
+    return _provider.force_flush(timeout_millis) if _provider is not None else True
+
+
+# ------------------------------
+# spans
+# ------------------------------
+@contextmanager
+def span(name, **attributes):
+    """Time the block as ``name``; also usable as a decorator."""
+    if not instrumentation_setting("ENABLED"):
+        yield
+        return
+
+    otel = tracer()
+    otel_span = otel.start_as_current_span(name, attributes=attributes) if otel is not None else None
+    if otel_span is not None:
+        otel_span.__enter__()
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        REGISTRY.inc("pin_forge_span_errors_total", {"span": name})
+        raise
+    finally:
+        REGISTRY.observe("pin_forge_span_seconds", {"span": name}, time.perf_counter() - start)
+        if otel_span is not None:
+            otel_span.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+
+# ------------------------------
+# requests
+# ------------------------------
+class QueryCounter:
+    """``execute_wrapper`` that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not instrumentation_setting("ENABLED"):
+            return self.get_response(request)
+
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries), span("http.request", method=request.method, path=request.path):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else "") or "unmatched"
+        REGISTRY.inc(
+            "pin_forge_http_requests_total",
+            {"view": view, "method": request.method, "status": str(response.status_code)},
+        )
+        REGISTRY.observe("pin_forge_http_request_seconds", {"view": view}, elapsed)
+        REGISTRY.observe("pin_forge_http_request_queries", {"view": view}, queries.count)
+        REGISTRY.inc("pin_forge_db_query_seconds_total", {"view": view}, queries.seconds)
+
+        response["Server-Timing"] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries"'
+        )
+        return response
+
+
+def metrics_view(request):
+    """GET /metrics/ - Prometheus text exposition of this process's metrics."""
+    token = instrumentation_setting("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
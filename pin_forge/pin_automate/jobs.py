@@ -0,0 +1,254 @@
+"""Database-backed background job queue.
+
+Views enqueue a ``Job`` row and return its id; ``manage.py runworker``
+processes claim queued jobs and run the handler registered for the job's
+``kind``. Claiming is a conditional ``UPDATE ... WHERE status='queued'``
+(plus ``SKIP LOCKED`` where the database supports it), so any number of
+workers, on one box or several, can share the queue on SQLite or
+Postgres without a broker.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .instrumentation import span
+from .models import Job, Store
+from .services.bulk_publisher import BulkPublisher
+from .services.catalog_import_service import import_products_json
+from .services.pin_service import generate_pin_templates, save_generated_pins
+from .services.store_crawler import crawl_stores
+from .services.storefront_service import sync_store_from_url
+
+
+DEFAULTS = {
+    "ASYNC": True,
+    "POLL_INTERVAL": 1.0,
+    "STALE_AFTER": 600,
+    "HEARTBEAT_INTERVAL": 60,
+    "MAX_ATTEMPTS": 3,
+}
+
+HANDLERS = {}
+
+
+def jobs_setting(name):
+    return getattr(settings, "PIN_JOBS", {}).get(name, DEFAULTS[name])
+
+
+def job_handler(kind):
+    """Register ``func(job)`` as the handler for jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, user=None, **payload):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    return Job.objects.create(kind=kind, user=user, payload=payload)
+
+
+def owned(job):
+    """``job``'s row, as long as this run still holds it."""
+    return Job.objects.filter(pk=job.pk, worker=job.worker, status=Job.RUNNING)
+
+
+def report_progress(job, done, total=None):
+    job.progress = done
+    job.total = total
+    owned(job).update(progress=done, total=total, heartbeat_at=timezone.now())
+
+
+class Heartbeat:
+    """Refresh a running job's ``heartbeat_at`` from a background thread.
+
+    Not every handler reports progress, and one that runs past
+    ``STALE_AFTER`` without a heartbeat would be requeued and run twice.
+    """
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or jobs_setting("HEARTBEAT_INTERVAL")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"job-{job.pk}-heartbeat", daemon=True)
+
+    def _beat(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not owned(self.job).update(heartbeat_at=timezone.now()):
+                        return  # requeued from under us; the new run beats for itself
+                except OperationalError:
+                    pass  # e.g. SQLite busy; the next beat will do
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def claim_next(worker_id):
+    """Atomically move the oldest queued job to running; None if idle."""
+    with transaction.atomic():
+        queued = Job.objects.filter(status=Job.QUEUED).order_by("created_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+
+        job_id = queued.values_list("id", flat=True).first()
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            worker=worker_id,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+
+    return Job.objects.get(pk=job_id) if claimed else None
+
+
+def requeue_stale():
+    """Requeue running jobs whose worker stopped heartbeating.
+
+    Jobs that have used up ``MAX_ATTEMPTS`` are failed instead.
+    """
+    cutoff = timezone.now() - timedelta(seconds=jobs_setting("STALE_AFTER"))
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff)
+
+    stale.filter(attempts__gte=jobs_setting("MAX_ATTEMPTS")).update(
+        status=Job.FAILED, error="Worker stopped responding", finished_at=timezone.now()
+    )
+    return stale.update(status=Job.QUEUED, worker=None)
+
+
+def run_job(job):
+    """Run a claimed ``job`` in this process and record its outcome.
+
+    The outcome is only written while this run still holds the job, so a
+    run superseded by ``requeue_stale()`` can't overwrite the live one.
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind {job.kind!r}")
+        with span(f"job.{job.kind}", job_id=job.pk), Heartbeat(job):
+            result = handler(job)
+    except Exception as e:
+        job.status = Job.FAILED
+        job.error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        job.result = None
+    else:
+        job.status = Job.SUCCEEDED
+        # Handlers may return datetimes/Decimals; store them as JSON does.
+        job.result = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+        job.error = None
+
+    job.finished_at = timezone.now()
+    owned(job).update(status=job.status, result=job.result, error=job.error, finished_at=job.finished_at)
+    return job
+
+
+class Worker:
+    """Poll-claim-run loop executed by each ``runworker`` process."""
+
+    def __init__(self, name=None, poll_interval=None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval or jobs_setting("POLL_INTERVAL")
+
+    def run_once(self):
+        """Claim and run one job; return it, or None if the queue was empty."""
+        close_old_connections()
+        try:
+            requeue_stale()
+            job = claim_next(self.name)
+        except OperationalError:
+            # e.g. SQLite "database is locked" while another worker writes
+            return None
+        return run_job(job) if job is not None else None
+
+    def run(self, stop_when_idle=False):
+        while True:
+            job = self.run_once()
+            if job is None:
+                if stop_when_idle:
+                    return
+                time.sleep(self.poll_interval)
+
+
+# -----------------------------------------------------
+# HANDLERS
+# -----------------------------------------------------
+@job_handler("sync_store")
+def sync_store_job(job):
+    payload = job.payload
+    if payload.get("store_url"):
+        return sync_store_from_url(job.user, payload["store_url"])
+
+    # A known store is re-fetched conditionally; 304 skips the sync.
+    store = Store.objects.get(id=payload["store_id"], user=job.user)
+    crawl = crawl_stores([store])
+    if crawl["failed"]:
+        raise Exception(crawl["stores"][0]["error"])
+    return {"message": "Sync finished", "store_id": store.id, "synced_at": store.synced_at, **crawl}
+
+
+@job_handler("crawl_stores")
+def crawl_stores_job(job):
+    stores = Store.objects.filter(id__in=job.payload["store_ids"])
+    result = crawl_stores(stores, progress=lambda done, total: report_progress(job, done, total))
+    return {"message": f"{result['fetched']} stores changed, {result['not_modified']} unchanged.", **result}
+
+
+@job_handler("import_products")
+def import_products_job(job):
+    store = Store.objects.get(id=job.payload["store_id"])
+    result = import_products_json(store, update_existing=job.payload.get("update_existing", False))
+    return {"message": f"{result.created_products} products imported successfully", **result.as_dict()}
+
+
+@job_handler("generate_templates")
+def generate_templates_job(job):
+    store = Store.objects.get(id=job.payload["store_id"])
+    result = generate_pin_templates(
+        store,
+        parallelism=job.payload.get("parallelism"),
+        batch_size=job.payload.get("batch_size"),
+        progress=lambda done, total: report_progress(job, done, total),
+    )
+    return {"message": f"{result.created} pin templates generated.", **result.as_dict()}
+
+
+@job_handler("save_pins")
+def save_pins_job(job):
+    store = Store.objects.get(id=job.payload["store_id"])
+    created = save_generated_pins(store, board=job.payload.get("board"))
+    return {"message": f"{created} generated pins saved.", "created": created}
+
+
+@job_handler("bulk_publish")
+def bulk_publish_job(job):
+    results = BulkPublisher(job.user, concurrency=job.payload.get("concurrency")).publish(job.payload["pins"])
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"message": f"{counts.get('posted', 0)} of {len(results)} pins posted.", "counts": counts, "results": results}
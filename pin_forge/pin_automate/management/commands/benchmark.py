@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pin_forge.pin_automate.benchmarks import SCALES, SCENARIOS, run_suite
+
+
+def scale(value):
+    """A variant count, or one of the ``SCALES`` names."""
+    return SCALES[value] if value in SCALES else int(value)
+
+
+class Command(BaseCommand):
+    help = "Run pin_automate benchmark scenarios at one or more scales and print the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="+", metavar="scenario", choices=sorted(SCENARIOS) + ["all"])
+        parser.add_argument(
+            "--variants", nargs="+", type=scale, default=[10_000],
+            help=f"Variant counts to run at; also {', '.join(f'{k}={v}' for k, v in SCALES.items())}.",
+        )
+        parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no peak_mb).")
+        parser.add_argument("--output", help="Also write the JSON to this file.")
+
+    def handle(self, *args, **options):
+        names = sorted(SCENARIOS) if "all" in options["scenarios"] else list(dict.fromkeys(options["scenarios"]))
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenario {unknown[0]!r}")
+
+        report = json.dumps(
+            run_suite(names, options["variants"], trace_memory=not options["no_memory"]), indent=2
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+        self.stdout.write(report)
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from pin_forge.pin_automate.models import Store
+from pin_forge.pin_automate.services.store_crawler import crawl_stores
+
+
+class Command(BaseCommand):
+    help = "Fetch store pages concurrently and sync the ones that changed since the last crawl."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--store", type=int, action="append", dest="store_ids", help="Store id (repeatable); default: all.")
+        parser.add_argument("--workers", type=int, default=None, help="Concurrent fetches (default STORE_CRAWLER['MAX_WORKERS']).")
+        parser.add_argument("--no-sync", action="store_true", help="Fetch and extract only; do not touch products.")
+
+    def handle(self, *args, **options):
+        stores = Store.objects.exclude(url="")
+        if options["store_ids"]:
+            stores = stores.filter(id__in=options["store_ids"])
+
+        result = crawl_stores(stores, max_workers=options["workers"], sync=not options["no_sync"])
+        for row in result["stores"]:
+            self.stdout.write(json.dumps(row, default=str))
+        self.stderr.write(
+            f"{result['fetched']} fetched, {result['not_modified']} not modified, {result['failed']} failed"
+        )
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pin_forge.pin_automate.exports import CONTENT_TYPES, DATASETS, NDJSON, ExportError, export_stream
+from pin_forge.pin_automate.models import Store
+
+
+class Command(BaseCommand):
+    help = "Stream a store's products, variants, templates or pins as NDJSON, CSV or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("store_id", type=int)
+        parser.add_argument("dataset", choices=list(DATASETS))
+        parser.add_argument("--output", choices=list(CONTENT_TYPES), default=NDJSON)
+        parser.add_argument("--file", default="-", help="Destination path; '-' writes to stdout.")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(pk=options["store_id"])
+        except Store.DoesNotExist:
+            raise CommandError(f"Store {options['store_id']} not found")
+
+        kwargs = {"chunk_size": options["chunk_size"]} if options["chunk_size"] else {}
+        try:
+            stream = export_stream(store, options["dataset"], options["output"], **kwargs)
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if options["file"] == "-":
+            self._write(stream, sys.stdout.buffer)
+            return
+
+        with open(options["file"], "wb") as fp:
+            written = self._write(stream, fp)
+        self.stderr.write(f"Wrote {written} bytes to {options['file']}")
+
+    @staticmethod
+    def _write(stream, fp):
+        written = 0
+        for chunk in stream:
+            fp.write(chunk)
+            written += len(chunk)
+        fp.flush()
+        return written
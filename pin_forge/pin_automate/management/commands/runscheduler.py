@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from pin_forge.pin_automate.services.publishing_scheduler import PublishScheduler
+
+
+class Command(BaseCommand):
+    help = "Publish due queued GeneratedPins to Pinterest within the configured rate limit."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process one batch of due pins and exit.")
+        parser.add_argument("--rate", type=float, default=None, help="Pins per minute per Pinterest user.")
+        parser.add_argument("--burst", type=int, default=None, help="Token bucket capacity per user.")
+
+    def handle(self, *args, **options):
+        scheduler = PublishScheduler(rate_per_minute=options["rate"], burst=options["burst"])
+
+        if options["once"]:
+            self.stdout.write(json.dumps(scheduler.run(once=True)))
+            return
+
+        self.stdout.write("Publishing scheduler started")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
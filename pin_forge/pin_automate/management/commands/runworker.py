@@ -0,0 +1,58 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+
+
+def _worker_main(poll_interval, stop_when_idle):
+    # Runs in a freshly spawned interpreter: set Django up before
+    # touching models.
+    import django
+    django.setup()
+
+    from pin_forge.pin_automate.jobs import Worker
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    Worker(poll_interval=poll_interval).run(stop_when_idle=stop_when_idle)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers for pin_automate (DB-backed queue)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--poll-interval", type=float, default=None, help="Seconds between polls when idle.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        poll_interval = options["poll_interval"]
+        once = options["once"]
+
+        if processes == 1:
+            from pin_forge.pin_automate.jobs import Worker
+
+            self.stdout.write("Starting 1 worker")
+            try:
+                Worker(poll_interval=poll_interval).run(stop_when_idle=once)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        # "spawn" behaves the same on Linux, macOS and Windows and gives
+        # every worker its own database connection.
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=_worker_main, args=(poll_interval, once), daemon=True)
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} workers")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
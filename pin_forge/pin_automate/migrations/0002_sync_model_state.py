@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pin_automate', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='generatedpin',
+            name='variant',
+        ),
+        migrations.AddField(
+            model_name='pinterestauth',
+            name='scope',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pinterestauth',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='status',
+            field=models.CharField(default='new', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='pinterestauth',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, unique=True),
+        ),
+    ]
@@ -0,0 +1,60 @@
+"""Merge duplicate catalog rows so 0006 can add its unique constraints.
+
+Duplicates come from concurrent imports/generation runs before the
+constraints existed. The oldest row of every group is kept and the
+children of the others are moved onto it; extra GeneratedPins are
+detached (``pin_template=None``) rather than deleted, since they may
+already be posted.
+"""
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def _duplicates(model, fields, **filters):
+    """Yield ``(keep_id, [duplicate ids])`` for every duplicated ``fields`` group."""
+    groups = (
+        model.objects.filter(**filters)
+        .values(*fields)
+        .annotate(n=Count("id"), keep=Min("id"))
+        .filter(n__gt=1)
+    )
+    for group in groups:
+        lookup = {field: group[field] for field in fields}
+        extra = list(
+            model.objects.filter(**lookup).exclude(pk=group["keep"]).values_list("pk", flat=True)
+        )
+        yield group["keep"], extra
+
+
+def dedupe_catalog(apps, schema_editor):
+    Product = apps.get_model("pin_automate", "Product")
+    Variant = apps.get_model("pin_automate", "Variant")
+    PinTemplate = apps.get_model("pin_automate", "PinTemplate")
+    GeneratedPin = apps.get_model("pin_automate", "GeneratedPin")
+
+    for keep, extra in _duplicates(Product, ["store", "product_id"]):
+        Variant.objects.filter(product_id__in=extra).update(product_id=keep)
+        Product.objects.filter(pk__in=extra).delete()
+
+    for keep, extra in _duplicates(Variant, ["product", "variant_id"]):
+        PinTemplate.objects.filter(variant_id__in=extra).update(variant_id=keep)
+        Variant.objects.filter(pk__in=extra).delete()
+
+    for keep, extra in _duplicates(PinTemplate, ["variant"]):
+        GeneratedPin.objects.filter(pin_template_id__in=extra).update(pin_template_id=keep)
+        PinTemplate.objects.filter(pk__in=extra).delete()
+
+    for keep, extra in _duplicates(GeneratedPin, ["pin_template"], pin_template__isnull=False):
+        GeneratedPin.objects.filter(pk__in=extra).update(pin_template=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pin_automate', '0004_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_catalog, migrations.RunPython.noop),
+    ]
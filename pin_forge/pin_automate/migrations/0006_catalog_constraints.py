@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pin_automate', '0005_dedupe_catalog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedpin',
+            index=models.Index(fields=['status', 'scheduled_at'], name='gpin_status_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['user', 'name'], name='store_user_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='generatedpin',
+            constraint=models.UniqueConstraint(fields=('pin_template',), name='uniq_generated_pin_per_template'),
+        ),
+        migrations.AddConstraint(
+            model_name='pintemplate',
+            constraint=models.UniqueConstraint(fields=('variant',), name='uniq_pin_template_per_variant'),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('store', 'product_id'), name='uniq_product_per_store'),
+        ),
+        migrations.AddConstraint(
+            model_name='variant',
+            constraint=models.UniqueConstraint(fields=('product', 'variant_id'), name='uniq_variant_per_product'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pin_automate', '0006_catalog_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedpin',
+            index=models.Index(fields=['created_at', 'id'], name='gpin_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pintemplate',
+            index=models.Index(fields=['created_at', 'id'], name='pintemplate_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pin_automate', '0009_store_crawl_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedpin',
+            name='idempotency_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='generatedpin',
+            name='publish_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedpin',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('queued', 'Queued'), ('publishing', 'Publishing'), ('posted', 'Posted'), ('failed', 'Failed')], default='draft', max_length=50),
+        ),
+    ]
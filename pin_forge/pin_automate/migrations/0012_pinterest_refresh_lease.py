@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pin_automate', '0011_publish_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pinterestauth',
+            name='refreshing_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -7,9 +7,19 @@ class Store(models.Model):
     name = models.CharField(max_length=255, null=True, blank=True)
     url = models.URLField()
     connected = models.BooleanField(default=False)
+    synced_at = models.DateTimeField(null=True, blank=True)  # last successful ProductSyncService run
+    # Validators of the last crawled storefront page, for conditional GETs
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    crawled_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "name"], name="store_user_name_idx"),
+        ]
+
     def __str__(self):
         return self.name or "Unnamed Store"
 
@@ -22,9 +32,19 @@ class Product(models.Model):
     url = models.URLField()  # link to your product page
     main_image = models.URLField(null=True, blank=True)
     status = models.CharField(max_length=100)  # draft, active, archived
+    content_hash = models.CharField(max_length=32, blank=True, default="")  # of the last synced payload
+    deleted_at = models.DateTimeField(null=True, blank=True)  # gone from the storefront
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["store", "product_id"], name="uniq_product_per_store"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="product_created_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -39,10 +59,17 @@ class Variant(models.Model):
     image = models.URLField(null=True, blank=True)
     attributes = models.JSONField(default=dict)  # color, size, etc.
     status = models.CharField(max_length=100, default="new")  # draft, active, archived
+    content_hash = models.CharField(max_length=32, blank=True, default="")
+    deleted_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "variant_id"], name="uniq_variant_per_product"),
+        ]
+
     def __str__(self):
         return f"{self.product.title} - {self.name}"
 
@@ -61,6 +88,14 @@ class PinTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["variant"], name="uniq_pin_template_per_variant"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="pintemplate_created_idx"),
+        ]
+
     def __str__(self):
         return f"Template for {self.variant.name}"
 
@@ -78,6 +113,7 @@ class GeneratedPin(models.Model):
         choices=[
             ("draft", "Draft"),
             ("queued", "Queued"),
+            ("publishing", "Publishing"),
             ("posted", "Posted"),
             ("failed", "Failed")
         ],
@@ -86,13 +122,26 @@ class GeneratedPin(models.Model):
 
     pinterest_pin_id = models.CharField(max_length=255, null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
+    # Sent in the Pinterest pin note; see services/pin_publishing.py.
+    idempotency_key = models.CharField(max_length=64, blank=True, default="")
 
     scheduled_at = models.DateTimeField(null=True, blank=True)
+    publish_started_at = models.DateTimeField(null=True, blank=True)
     posted_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # NULLs are distinct, so detached pins don't collide.
+            models.UniqueConstraint(fields=["pin_template"], name="uniq_generated_pin_per_template"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "scheduled_at"], name="gpin_status_scheduled_idx"),
+            models.Index(fields=["created_at", "id"], name="gpin_created_idx"),
+        ]
+
     def __str__(self):
         return f"Generated Pin - {self.title}"
 
@@ -103,8 +152,80 @@ class PinterestAuth(models.Model):
     refresh_token = models.TextField(null=True, blank=True)
     scope = models.TextField(null=True, blank=True)
     expires_at = models.DateTimeField(null=True, blank=True)
+    # lease of the process currently refreshing the token
+    refreshing_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Pinterest Auth - {self.user.username}"
+
+
+class PublishBucket(models.Model):
+    """A user's publishing token bucket, shared by every scheduler process."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="publish_bucket")
+    tokens = models.FloatField()
+    # seconds since the epoch, as the scheduler's clock reports them
+    updated = models.FloatField()
+    blocked_until = models.FloatField(default=0)
+    # bumped by every write; writes are conditional on it
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Publish bucket - {self.user_id}"
+
+
+class PinContentCache(models.Model):
+    """Memoized AI pin content, keyed by a hash of the prompt inputs."""
+    key = models.CharField(max_length=64, unique=True)
+    content = models.JSONField(default=dict)
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Pin content {self.key[:12]}"
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py runworker``."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs")
+    kind = models.CharField(max_length=100)  # key into jobs.HANDLERS
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (QUEUED, "Queued"),
+            (RUNNING, "Running"),
+            (SUCCEEDED, "Succeeded"),
+            (FAILED, "Failed")
+        ],
+        default=QUEUED
+    )
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=255, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="job_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} - {self.kind} ({self.status})"
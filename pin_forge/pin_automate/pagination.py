@@ -0,0 +1,16 @@
+"""Keyset pagination for the high-volume pin_automate list endpoints."""
+
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Newest first, paged by an opaque ``?cursor=`` instead of ``?page=``.
+
+    Each page is a ``WHERE created_at < …`` range over the
+    ``(created_at, id)`` indexes, so deep pages cost the same as the
+    first one and no ``COUNT(*)`` is run. Clients may ask for
+    ``?page_size=`` up to ``max_page_size``.
+    """
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,164 @@
+"""Per-user caching of the catalog read endpoints, with ETags.
+
+``CachedResponseMixin`` keeps the rendered JSON of list and retrieve
+responses in the ``RESPONSE_CACHE['ALIAS']`` cache, keyed by catalog
+version, user, media type and full URL. Every response carries an ETag
+(a hash of its body), so a client repeating a request with
+``If-None-Match`` gets a bodyless 304; on a cache hit that costs no
+queries at all.
+
+The catalog version is a token in the same cache. ``invalidate_catalog()``
+replaces it when the current transaction commits, which orphans every
+cached response at once (orphans expire after ``TIMEOUT``). It runs on
+``post_save``/``post_delete`` of stores, products, variants and pin
+templates, and after the bulk paths that bypass those signals: catalog
+import, product sync, template generation and store crawls. Entries are
+per user, but invalidation is catalog-wide because the list endpoints are
+not scoped to the user's stores.
+
+Requests inside a transaction (``ATOMIC_REQUESTS``, tests, benchmarks)
+neither read nor fill the cache, since they may see uncommitted rows.
+
+Web servers and ``runworker`` processes must share the cache for a
+worker's import to reach the servers: a local-memory cache is only
+correct with a single process, hence the file-based default.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import PinTemplate, Product, Store, Variant
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "ALIAS": "default",
+    "TIMEOUT": 3600,
+}
+
+KEY_PREFIX = "pin_forge.responses"
+VERSION_KEY = f"{KEY_PREFIX}.catalog-version"
+CATALOG_MODELS = (Store, Product, Variant, PinTemplate)
+
+
+def response_cache_setting(name):
+    return getattr(settings, "RESPONSE_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def response_cache():
+    return caches[response_cache_setting("ALIAS")]
+
+
+# ------------------------------
+# invalidation
+# ------------------------------
+def catalog_version():
+    cache = response_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First use, or the token was evicted: any fresh value is safe.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _new_version():
+    response_cache().set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_catalog(using=None):
+    """Orphan every cached catalog response once the current transaction commits."""
+    if not response_cache_setting("ENABLED"):
+        return
+    pending = transaction.get_connection(using).run_on_commit
+    # once per transaction, however many rows it touches
+    if not any(func is _new_version for _, func, _ in pending):
+        transaction.on_commit(_new_version, using=using)
+
+
+def _catalog_changed(sender, using=None, **kwargs):
+    invalidate_catalog(using)
+
+
+def connect_signals():
+    """Called from ``PinAutomateConfig.ready()``."""
+    for model in CATALOG_MODELS:
+        for signal in (post_save, post_delete):
+            signal.connect(_catalog_changed, sender=model, dispatch_uid=f"response_cache.{model.__name__}")
+
+
+# ------------------------------
+# responses
+# ------------------------------
+def etag_for(content):
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def not_modified(request, etag):
+    """True when the request's ``If-None-Match`` already names ``etag``."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags = [tag.removeprefix("W/") for tag in parse_etags(header)]
+    return "*" in etags or etag in etags
+
+
+def conditional_response(request, response, etag):
+    if not_modified(request, etag):
+        response = HttpResponseNotModified()
+    response["ETag"] = etag
+    # Clients may keep the body but must revalidate it on every use.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class CachedResponseMixin:
+    """Cache ``list``/``retrieve`` JSON per user; see the module docstring."""
+
+    def response_cache_key(self, request):
+        """Key for this request's response, or None when it must not be cached."""
+        if not response_cache_setting("ENABLED") or connection.in_atomic_block:
+            return None
+        raw = f"{request.user.pk}|{request.accepted_media_type}|{request.build_absolute_uri()}"
+        return f"{KEY_PREFIX}.{catalog_version()}.{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def _cached(self, handler, request, *args, **kwargs):
+        self._with_etag = isinstance(request.accepted_renderer, JSONRenderer)
+        self._cache_key = self.response_cache_key(request) if self._with_etag else None
+        if self._cache_key is not None:
+            entry = response_cache().get(self._cache_key)
+            if entry is not None:
+                response = HttpResponse(entry["content"], content_type=entry["content_type"])
+                return conditional_response(request, response, entry["etag"])
+        return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not getattr(self, "_with_etag", False) or not isinstance(response, Response) or response.status_code != 200:
+            return response
+
+        response.render()
+        etag = etag_for(response.content)
+        if self._cache_key is not None:
+            response_cache().set(
+                self._cache_key,
+                {"content": response.content, "content_type": response["Content-Type"], "etag": etag},
+                response_cache_setting("TIMEOUT"),
+            )
+        return conditional_response(request, response, etag)
@@ -7,9 +7,34 @@ from .models import (
     PinTemplate,
     GeneratedPin,
     PinterestAuth,
+    Job,
 )
 
 
+# ----------------------------------------
+# FIELD SELECTION
+# ----------------------------------------
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer taking optional ``fields`` and ``expand`` kwargs.
+
+    ``fields`` keeps only those names. Nested relations listed in
+    ``expandable_fields`` are dropped unless named in ``expand``.
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", None)
+        super().__init__(*args, **kwargs)
+
+        keep = set(self.fields) if not fields else set(fields) | set(expand or ())
+        if expand is not None:
+            keep -= set(self.expandable_fields) - set(expand)
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
 # ----------------------------------------
 # USER + GROUP SERIALIZERS
 # ----------------------------------------
@@ -33,7 +58,9 @@ class StoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Store
         fields = "__all__"
-        read_only_fields = ["user", "connected", "created_at", "updated_at"]
+        read_only_fields = [
+            "user", "connected", "synced_at", "etag", "last_modified", "crawled_at", "created_at", "updated_at",
+        ]
 
 
 # ----------------------------------------
@@ -49,10 +76,12 @@ class VariantSerializer(serializers.ModelSerializer):
 # ----------------------------------------
 # PRODUCT - READ (nested)
 # ----------------------------------------
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsModelSerializer):
     variants = VariantSerializer(many=True, read_only=True)
     store = StoreSerializer(read_only=True)
 
+    expandable_fields = ("store", "variants")
+
     class Meta:
         model = Product
         fields = "__all__"
@@ -136,9 +165,11 @@ class ProductWriteSerializer(serializers.ModelSerializer):
 # ----------------------------------------
 # PIN TEMPLATE
 # ----------------------------------------
-class PinTemplateSerializer(serializers.ModelSerializer):
+class PinTemplateSerializer(DynamicFieldsModelSerializer):
     variant = VariantSerializer(read_only=True)
 
+    expandable_fields = ("variant",)
+
     class Meta:
         model = PinTemplate
         fields = "__all__"
@@ -148,10 +179,12 @@ class PinTemplateSerializer(serializers.ModelSerializer):
 # ----------------------------------------
 # GENERATED PIN
 # ----------------------------------------
-class GeneratedPinSerializer(serializers.ModelSerializer):
-    variant = VariantSerializer(read_only=True)
+class GeneratedPinSerializer(DynamicFieldsModelSerializer):
+    variant = VariantSerializer(source="pin_template.variant", read_only=True, allow_null=True)
     pin_template = PinTemplateSerializer(read_only=True)
 
+    expandable_fields = ("variant", "pin_template")
+
     class Meta:
         model = GeneratedPin
         fields = "__all__"
@@ -161,6 +194,8 @@ class GeneratedPinSerializer(serializers.ModelSerializer):
             "updated_at",
             "pinterest_pin_id",
             "error_message",
+            "idempotency_key",
+            "publish_started_at",
             "posted_at",
         ]
 
@@ -175,3 +210,12 @@ class PinterestAuthSerializer(serializers.ModelSerializer):
         model = PinterestAuth
         fields = "__all__"
         read_only_fields = ["id", "created_at"]
+
+
+# ----------------------------------------
+# BACKGROUND JOB
+# ----------------------------------------
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        exclude = ["user", "worker", "heartbeat_at"]
@@ -6,11 +6,13 @@ the real implementations are missing during development.
 """
 
 from .product_sync_service import ProductSyncService
+from .catalog_import_service import CatalogImportService
 from .ai_service import AIContentService
 from .pin_service import PinGeneratorService
 
 __all__ = [
     "ProductSyncService",
+    "CatalogImportService",
     "AIContentService",
     "PinGeneratorService",
 ]
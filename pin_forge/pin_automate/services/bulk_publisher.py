@@ -0,0 +1,252 @@
+"""Publish many pins in one call.
+
+``BulkPublisher(user).publish(items)`` takes ``GeneratedPin`` ids and/or
+ad-hoc pin payloads (the ``pinterest/postPin`` body), posts them to
+Pinterest on a thread pool of ``PINTEREST_PUBLISHING['BULK_CONCURRENCY']``
+over the shared keep-alive session, and returns one result per item in
+input order.
+
+Stored pins are claimed with one ``-> publishing`` transition that also
+writes their idempotency keys, so a pin that a scheduler (or another bulk
+request) is already posting is skipped rather than posted twice. The
+access token is read once up front, so workers never touch the database:
+the caller keeps ``concurrency`` posts in flight, stamps each pin's
+``publish_started_at`` just before submitting it and records each outcome
+as it arrives, conditionally on that stamp like ``record_attempt``. A
+large batch can outlast ``RECONCILE_AFTER``; a pin that reconciliation
+requeues while still waiting here is skipped, not posted. A 429 stops the
+batch: stored pins not yet sent are requeued (``status='queued'``,
+``scheduled_at`` after ``Retry-After``) for the publishing scheduler
+instead of being failed, while ad-hoc payloads, which have no row to
+requeue, fail as not sent. Posts without a clear answer are left in
+``publishing`` for reconciliation.
+"""
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db.models import Case, CharField, Value, When
+from django.utils import timezone
+
+from ..models import GeneratedPin
+from . import pinterest_client
+from .pin_publishing import (
+    DEFERRED, FAILED, POSTED, PUBLISHING,
+    Attempt, idempotency_key, pin_payload, publishing_setting, record_attempt, retry_after_seconds, send_pin,
+    transition,
+)
+
+
+NOT_FOUND = "not_found"
+SKIPPED = "skipped"
+
+PAYLOAD_REQUIRED = ("board_id", "title", "media_url")
+
+
+class BulkPublishError(Exception):
+    pass
+
+
+def _is_pin_id(item):
+    return isinstance(item, int) and not isinstance(item, bool)
+
+
+def validate_items(items, max_items=None):
+    """Reject a ``pins`` body that is not a non-empty, bounded list."""
+    max_items = max_items or publishing_setting("BULK_MAX_ITEMS")
+    if not isinstance(items, list) or not items:
+        raise BulkPublishError("pins must be a non-empty list of ids or payloads")
+    if len(items) > max_items:
+        raise BulkPublishError(f"At most {max_items} pins per request")
+
+
+def adhoc_payload(data):
+    """Pinterest body for a ``pinterest/postPin``-style item; None if incomplete."""
+    if not all(data.get(name) for name in PAYLOAD_REQUIRED):
+        return None
+    return {
+        "board_id": data["board_id"],
+        "title": data["title"],
+        "description": data.get("description"),
+        "alt_text": data.get("alt_text"),
+        "dominant_color": data.get("dominant_color"),
+        "link": data.get("link"),
+        "media_source": {"source_type": "image_url", "url": data["media_url"]},
+    }
+
+
+class BulkPublisher:
+    def __init__(self, user, concurrency=None, max_items=None):
+        self.user = user
+        limit = publishing_setting("BULK_CONCURRENCY")
+        self.concurrency = min(concurrency or limit, limit)
+        self.max_items = max_items or publishing_setting("BULK_MAX_ITEMS")
+        self._paused = threading.Event()
+        self._retry_after = 0
+
+    # ------------------------------
+    # input
+    # ------------------------------
+    def _resolve(self, items):
+        """``(result, pin, payload)`` per item; pin and payload None when not publishable."""
+        validate_items(items, self.max_items)
+
+        ids = {item for item in items if _is_pin_id(item)}
+        pins = GeneratedPin.objects.filter(
+            pk__in=ids, pin_template__variant__product__store__user=self.user
+        ).select_related("pin_template__variant__product").in_bulk()
+
+        resolved = []
+        seen = set()
+        for index, item in enumerate(items):
+            if _is_pin_id(item):
+                result = {"index": index, "id": item}
+                pin = pins.get(item)
+                if item in seen:
+                    resolved.append(({**result, "status": SKIPPED, "error": "Listed twice"}, None, None))
+                    continue
+                seen.add(item)
+                if pin is None:
+                    resolved.append(({**result, "status": NOT_FOUND, "error": "Pin not found"}, None, None))
+                elif pin.status == POSTED:
+                    resolved.append((
+                        {**result, "status": SKIPPED, "pinterest_pin_id": pin.pinterest_pin_id,
+                         "error": "Already posted"},
+                        None, None,
+                    ))
+                elif pin.status == PUBLISHING:
+                    resolved.append(({**result, "status": SKIPPED, "error": "Already being published"}, None, None))
+                else:
+                    # payload is built once the pin is claimed
+                    resolved.append((result, pin, None))
+            elif isinstance(item, dict):
+                result = {"index": index, "id": None}
+                payload = adhoc_payload(item)
+                if payload is None:
+                    error = f"{', '.join(PAYLOAD_REQUIRED)} required"
+                    resolved.append(({**result, "status": FAILED, "error": error}, None, None))
+                else:
+                    resolved.append((result, None, payload))
+            else:
+                resolved.append((
+                    {"index": index, "id": None, "status": FAILED, "error": "Expected a pin id or a payload"},
+                    None, None,
+                ))
+        return resolved
+
+    def _claim(self, pins):
+        """Move ``pins`` to publishing with their keys; the pks this call won."""
+        if not pins:
+            return set()
+        now = timezone.now()
+        keys = {pin.pk: idempotency_key(pin) for pin in pins}
+        transition(
+            GeneratedPin.objects.filter(pk__in=keys),
+            PUBLISHING,
+            publish_started_at=now,
+            idempotency_key=Case(
+                *(When(pk=pk, then=Value(key)) for pk, key in keys.items()), output_field=CharField()
+            ),
+        )
+        claimed = set(
+            GeneratedPin.objects.filter(pk__in=keys, status=PUBLISHING, publish_started_at=now)
+            .values_list("pk", flat=True)
+        )
+        for pin in pins:
+            if pin.pk in claimed:
+                pin.status = PUBLISHING
+                pin.publish_started_at = now
+                pin.idempotency_key = keys[pin.pk]
+        return claimed
+
+    def _start(self, pin):
+        """Restamp a claimed pin as posted from now; False if reconciliation took it back."""
+        now = timezone.now()
+        started = GeneratedPin.objects.filter(
+            pk=pin.pk, status=PUBLISHING, publish_started_at=pin.publish_started_at
+        ).update(publish_started_at=now, updated_at=now)
+        if started:
+            pin.publish_started_at = now
+        return bool(started)
+
+    # ------------------------------
+    # workers
+    # ------------------------------
+    def _post(self, token, payload):
+        """An ``Attempt`` for one pin; runs on the pool."""
+        if self._paused.is_set():
+            return Attempt(DEFERRED)
+
+        def post(data):
+            response = pinterest_client.api_request(token, "POST", "pins", data=data)
+            if response.status_code == 429:
+                self._retry_after = max(self._retry_after, retry_after_seconds(response))
+                self._paused.set()
+            return response
+
+        return send_pin(post, payload)
+
+    # ------------------------------
+    # run
+    # ------------------------------
+    def publish(self, items):
+        resolved = self._resolve(items)
+        claimed = self._claim([pin for _, pin, _ in resolved if pin is not None])
+
+        pending = []
+        for result, pin, payload in resolved:
+            if pin is not None:
+                if pin.pk not in claimed:
+                    result.update(status=SKIPPED, error="Already being published")
+                    continue
+                payload = pin_payload(pin)
+            if payload is not None:
+                pending.append((result, pin, payload))
+
+        if pending:
+            token = pinterest_client.get_user_access_token(self.user)
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending))) as pool:
+                self._run(pool, token, pending)
+
+        return [result for result, _, _ in resolved]
+
+    def _run(self, pool, token, pending):
+        """Post ``pending`` with ``concurrency`` in flight, recording each outcome as it arrives."""
+        waiting = iter(pending)
+        running = {}
+        while True:
+            for entry in waiting:
+                result, pin, payload = entry
+                if self._paused.is_set():
+                    self._record(entry, Attempt(DEFERRED))
+                elif pin is not None and not self._start(pin):
+                    result.update(status=SKIPPED, error="Requeued by reconciliation before it was sent")
+                else:
+                    running[pool.submit(self._post, token, payload)] = entry
+                    if len(running) >= self.concurrency:
+                        break
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._record(running.pop(future), future.result())
+
+    def _record(self, entry, attempt):
+        result, pin, _ = entry
+        now = timezone.now()
+        if attempt.outcome == DEFERRED and self._paused.is_set():
+            attempt.retry_after = self._retry_after
+            attempt.error = f"Rate limited by Pinterest, retrying in {int(self._retry_after)}s"
+        result.update(status=attempt.outcome, pinterest_pin_id=attempt.pinterest_pin_id, error=attempt.error)
+        if pin is None:
+            if attempt.outcome == DEFERRED:
+                # No row for the scheduler to retry: the caller has to resend it.
+                error = "Rate limited by Pinterest, not sent" if self._paused.is_set() else attempt.error
+                result.update(status=FAILED, error=error)
+            return
+
+        # Only lands while the row still carries this call's stamp.
+        record_attempt(pin, attempt, now)
+        if attempt.outcome == DEFERRED:
+            # left for the publishing scheduler
+            result["scheduled_at"] = pin.scheduled_at
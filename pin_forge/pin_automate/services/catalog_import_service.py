@@ -0,0 +1,227 @@
+"""Bulk catalog import for scraped storefront payloads.
+
+Existing product and variant keys for the store are loaded up front,
+diffed in memory, and only the new rows are written with chunked
+``bulk_create`` calls inside a single transaction.
+"""
+
+import json
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from itertools import chain, islice
+
+from django.db import transaction
+
+from ..instrumentation import span
+from ..models import Product, Variant
+from ..response_cache import invalidate_catalog
+from .option_matrix import OptionAxis, VariantMatrix, extract_axes
+from .product_feed import iter_products
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+# -----------------------------------------------------
+# OPTION / VARIANT HELPERS
+# -----------------------------------------------------
+def extract_options(product):
+    """Return ``(colors, sizes)`` option items from a scraped product."""
+    items = {axis.type: axis.items for axis in extract_axes(product)}
+    return items.get("color", []), items.get("size", [])
+
+
+def generate_variants(colors, sizes, price):
+    """Build the color x size variant dicts for one product."""
+    if not colors or not sizes:
+        return []
+    return VariantMatrix([OptionAxis("color", colors), OptionAxis("size", sizes)], price).as_dicts()
+
+
+def product_price(product):
+    """Default variant retail price in currency units (payload is in cents)."""
+    default_variant = product.get("default_variant") or {}
+    return (default_variant.get("retail_price") or 0) / 100
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_insert(rows, scope, batch_size):
+    """``bulk_create`` ``rows`` ignoring conflicts; returns how many were really inserted.
+
+    A concurrent import may have inserted some of them already, and
+    ``ignore_conflicts`` hides which. ``scope`` is a queryset covering
+    every row ``rows`` could create, counted right before and after the
+    insert.
+    """
+    before = scope.count()
+    scope.model.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return scope.count() - before
+
+
+@dataclass
+class ImportResult:
+    created_products: int = 0
+    created_variants: int = 0
+    skipped_products: int = 0
+    skipped_variants: int = 0
+    updated_products: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+class CatalogImportService:
+    """Import scraped products (and their variants) into a store.
+
+    ``products`` may be any iterable, including a generator, and is
+    consumed ``chunk_size`` products at a time. Products that already
+    exist are skipped unless ``update_existing`` is set, in which case
+    changed scalar fields are written back with ``bulk_update``. Missing
+    variants of existing products are still created.
+    """
+
+    PRODUCT_FIELDS = ["title", "description", "url", "main_image"]
+
+    def __init__(self, store, chunk_size=DEFAULT_CHUNK_SIZE, update_existing=False):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.update_existing = update_existing
+
+    def run(self, products):
+        result = ImportResult()
+
+        with span("db.import_products", store_id=self.store.pk), transaction.atomic():
+            existing_products = self._load_existing_products()
+            # product pk -> variant_ids
+            existing_variants = defaultdict(set)
+            for product_pk, variant_id in Variant.objects.filter(product__store=self.store).values_list(
+                "product_id", "variant_id"
+            ):
+                existing_variants[product_pk].add(variant_id)
+
+            for chunk in _chunked(products, self.chunk_size):
+                self._import_chunk(chunk, existing_products, existing_variants, result)
+
+            if result.created_products or result.created_variants or result.updated_products:
+                invalidate_catalog()
+
+        return result
+
+    def _load_existing_products(self):
+        """Map ``product_id`` -> row values for every product of the store."""
+        fields = ["id", "product_id"]
+        if self.update_existing:
+            fields += self.PRODUCT_FIELDS
+
+        return {
+            row["product_id"]: row
+            for row in Product.objects.filter(store=self.store).values(*fields)
+        }
+
+    def _build_product(self, raw):
+        return Product(
+            store=self.store,
+            product_id=str(raw.get("id")),
+            title=raw.get("title", "Untitled"),
+            description=raw.get("description", ""),
+            url=self.store.url + raw.get("path", ""),
+            main_image=raw.get("image", ""),
+            status="new",
+        )
+
+    def _import_chunk(self, chunk, existing_products, existing_variants, result):
+        new_products = []
+        to_update = []
+        # product_id -> raw payload, for every product whose variants we diff
+        pending = {}
+
+        for raw in chunk:
+            product = self._build_product(raw)
+            key = product.product_id
+
+            if key in pending:
+                result.skipped_products += 1
+                continue
+            pending[key] = raw
+
+            row = existing_products.get(key)
+            if row is None:
+                new_products.append(product)
+                continue
+
+            if self.update_existing and any(
+                row[name] != getattr(product, name) for name in self.PRODUCT_FIELDS
+            ):
+                product.pk = row["id"]
+                to_update.append(product)
+                row.update({name: getattr(product, name) for name in self.PRODUCT_FIELDS})
+            else:
+                result.skipped_products += 1
+
+        if new_products:
+            # A concurrent import of the same store may have inserted some
+            # of these already; the unique constraint makes those no-ops and
+            # the re-query below picks up whichever row won.
+            scope = Product.objects.filter(
+                store=self.store,
+                product_id__in=[p.product_id for p in new_products],
+            )
+            created = bulk_insert(new_products, scope, self.chunk_size)
+            pks = dict(scope.values_list("product_id", "id"))
+            for product in new_products:
+                product.pk = pks[product.product_id]
+            for product in new_products:
+                existing_products[product.product_id] = {"id": product.pk, "product_id": product.product_id}
+            result.created_products += created
+            result.skipped_products += len(new_products) - created
+
+        if to_update:
+            Product.objects.bulk_update(to_update, self.PRODUCT_FIELDS, batch_size=self.chunk_size)
+            result.updated_products += len(to_update)
+
+        new_variants = []
+        for key, raw in pending.items():
+            product_pk = existing_products[key]["id"]
+            matrix = VariantMatrix.from_product(raw, product_price(raw))
+            known = existing_variants[product_pk]
+
+            variants = matrix.variants(product_pk, skip=known, status="new")
+            result.skipped_variants += len(matrix) - len(variants)
+            known.update(variant.variant_id for variant in variants)
+            new_variants += variants
+
+        if new_variants:
+            scope = Variant.objects.filter(product_id__in={variant.product_id for variant in new_variants})
+            created = bulk_insert(new_variants, scope, self.chunk_size)
+            result.created_variants += created
+            result.skipped_variants += len(new_variants) - created
+
+
+def import_products_json(store, update_existing=False, file_path=None):
+    """Import the saved products.json payload into ``store``.
+
+    Raises ValueError when the payload is missing, empty or invalid.
+    """
+    products = iter_products(file_path)
+    try:
+        try:
+            first = next(products)
+        except (FileNotFoundError, KeyError, json.JSONDecodeError, StopIteration):
+            raise ValueError("No data found")
+
+        try:
+            return CatalogImportService(store, update_existing=update_existing).run(
+                chain([first], products)
+            )
+        except json.JSONDecodeError:
+            raise ValueError("products.json is invalid")
+    finally:
+        products.close()
@@ -0,0 +1,158 @@
+"""N-dimensional option matrices for product variants.
+
+A scraped product lists option types (``color``, ``size``, and later
+``material``, ``fit``, ...), each with items; its variants are the cross
+product of those axes. ``VariantMatrix`` builds that product one column
+at a time: variant ids, names and attribute dicts as flat lists made by
+``itertools.product`` and ``str.join``, with no per-variant f-strings or
+intermediate row dicts. The columns are turned into ``Variant``
+instances for ``bulk_create`` or read as rows by the sync.
+
+Axes are ordered ``color``, ``size``, then other types in payload order,
+so colour x size variants keep their ``"<color id>-<size id>"`` ids and
+``"<color>-<size>"`` names.
+"""
+
+from itertools import product as cross_product
+
+from ..models import Variant
+
+
+LEADING_AXES = ("color", "size")
+
+
+class OptionAxis:
+    """One option type and its items (``{"id", "label"}``, plus ``hex`` for colors)."""
+
+    __slots__ = ("type", "items")
+
+    def __init__(self, type, items):
+        self.type = type
+        self.items = items
+
+    def __repr__(self):
+        return f"OptionAxis({self.type!r}, {len(self.items)} items)"
+
+    def attributes(self):
+        """The ``Variant.attributes`` contribution of each item."""
+        if self.type == "color":
+            return [{"color": item["label"], "hex": item["hex"]} for item in self.items]
+        return [{self.type: item["label"]} for item in self.items]
+
+
+def _option_item(option_type, item):
+    data = {"id": item.get("id"), "label": item.get("label")}
+    if option_type == "color":
+        data["hex"] = (item.get("values") or [None])[0]
+    return data
+
+
+def extract_axes(product):
+    """The non-empty option axes of a scraped product, in variant-id order."""
+    items = {}
+    for option in product.get("options", []):
+        option_type = option.get("type")
+        if not option_type:
+            continue
+        items.setdefault(option_type, []).extend(
+            _option_item(option_type, item) for item in option.get("items", [])
+        )
+
+    order = [name for name in LEADING_AXES if name in items]
+    order += [name for name in items if name not in LEADING_AXES]
+    return [OptionAxis(name, items[name]) for name in order if items[name]]
+
+
+def _merge(parts):
+    merged = {}
+    for part in parts:
+        merged.update(part)
+    return merged
+
+
+class VariantMatrix:
+    """Columnar cross product of a product's option axes.
+
+    ``variant_ids[i]``, ``names[i]`` and ``attributes[i]`` describe the
+    i-th variant; every variant shares ``price``. A product without
+    options has no variants.
+    """
+
+    __slots__ = ("axes", "price", "variant_ids", "names", "attributes")
+
+    def __init__(self, axes, price):
+        self.axes = axes
+        self.price = price
+        if not axes:
+            self.variant_ids, self.names, self.attributes = [], [], []
+            return
+
+        ids = [[str(item["id"]) for item in axis.items] for axis in axes]
+        labels = [[str(item["label"]) for item in axis.items] for axis in axes]
+        self.variant_ids = list(map("-".join, cross_product(*ids)))
+        self.names = list(map("-".join, cross_product(*labels)))
+        self.attributes = list(map(_merge, cross_product(*(axis.attributes() for axis in axes))))
+
+    @classmethod
+    def from_product(cls, product, price):
+        return cls(extract_axes(product), price)
+
+    def __len__(self):
+        return len(self.variant_ids)
+
+    def axis(self, type):
+        """Items of the ``type`` axis ([] when the product has none)."""
+        return next((axis.items for axis in self.axes if axis.type == type), [])
+
+    def rows(self):
+        """``(variant_id, name, attributes)`` per variant."""
+        return zip(self.variant_ids, self.names, self.attributes)
+
+    def as_dicts(self):
+        return [
+            {"name": name, "variant_id": variant_id, "price": self.price, "attributes": attributes}
+            for variant_id, name, attributes in self.rows()
+        ]
+
+    def variants(self, product_id, skip=(), **fields):
+        """Unsaved ``Variant`` rows for ``bulk_create``, minus ids in ``skip``.
+
+        Instances are built with positional arguments, ``Model.__init__``'s
+        fast path (as ``Model.from_db`` does), from a per-call template row.
+        """
+        template, fresh = _variant_template(product_id=product_id, price=self.price, **fields)
+        variant_id_at, name_at, attributes_at = _VARIANT_COLUMNS
+
+        variants = []
+        for variant_id, name, attributes in self.rows():
+            if variant_id in skip:
+                continue
+            values = template.copy()
+            values[variant_id_at] = variant_id
+            values[name_at] = name
+            values[attributes_at] = attributes
+            for index, default in fresh:
+                values[index] = default()
+            variants.append(Variant(*values))
+        return variants
+
+
+_VARIANT_ATTNAMES = [field.attname for field in Variant._meta.concrete_fields]
+_VARIANT_COLUMNS = tuple(_VARIANT_ATTNAMES.index(name) for name in ("variant_id", "name", "attributes"))
+
+
+def _variant_template(**fields):
+    """Positional values for every concrete Variant field, defaults filled in.
+
+    Also returns ``(index, default)`` for defaults that must be fresh per row.
+    """
+    template = []
+    fresh = []
+    for index, field in enumerate(Variant._meta.concrete_fields):
+        if field.attname in fields:
+            template.append(fields[field.attname])
+            continue
+        template.append(field.get_default())
+        if callable(field.default) and index not in _VARIANT_COLUMNS:
+            fresh.append((index, field.get_default))
+    return template, fresh
@@ -0,0 +1,291 @@
+"""GeneratedPin publishing states, idempotency keys and reconciliation.
+
+A pin moves ``draft -> queued -> publishing -> posted | failed``; a
+rate-limited or confirmed-unsent pin goes from ``publishing`` back to
+``queued``. Every move is a conditional ``UPDATE ... WHERE status IN
+(...)``, so when several schedulers, a bulk publish and a retry race for
+the same pin exactly one of them takes it to ``publishing`` and posts it.
+
+Each pin carries an idempotency key derived from its template, board and
+image. Pinterest's v5 API has no idempotency header, so the key travels
+in the pin's private ``note``. A POST that ends without a clear answer
+(read timeout, dropped connection, 5xx) leaves the pin in ``publishing``;
+``reconcile_publishing()`` later lists the board's pins and looks for the
+key instead of posting again. Found means posted; not found after
+``RECONCILE_AFTER`` seconds means the POST never landed and the pin is
+requeued.
+"""
+
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import GeneratedPin
+from . import pinterest_client
+
+
+DEFAULTS = {
+    "RATE_PER_MINUTE": 10,
+    "BURST": 5,
+    "BATCH_SIZE": 50,
+    "POLL_INTERVAL": 5.0,
+    "DEFAULT_RETRY_AFTER": 60,
+    "RECONCILE_AFTER": 300,
+    "RECONCILE_PAGES": 5,
+    "BULK_CONCURRENCY": 8,
+    "BULK_MAX_ITEMS": 500,
+}
+
+DRAFT = "draft"
+QUEUED = "queued"
+PUBLISHING = "publishing"
+POSTED = "posted"
+FAILED = "failed"
+
+# outcomes of one POST that are not pin states
+DEFERRED = "deferred"
+UNCERTAIN = "uncertain"
+
+TRANSITIONS = {
+    DRAFT: {QUEUED, PUBLISHING},  # bulk publish posts drafts directly
+    QUEUED: {DRAFT, PUBLISHING},
+    PUBLISHING: {QUEUED, POSTED, FAILED},
+    FAILED: {QUEUED, PUBLISHING},
+    POSTED: set(),
+}
+SOURCES = {
+    state: {source for source, targets in TRANSITIONS.items() if state in targets}
+    for state in TRANSITIONS
+}
+
+NOTE_PREFIX = "pin_forge:"
+
+
+def publishing_setting(name):
+    return getattr(settings, "PINTEREST_PUBLISHING", {}).get(name, DEFAULTS[name])
+
+
+def retry_after_seconds(response, default=None):
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+    default = publishing_setting("DEFAULT_RETRY_AFTER") if default is None else default
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        return max(0, (parsedate_to_datetime(value) - timezone.now()).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+# ------------------------------
+# state machine
+# ------------------------------
+def transition(queryset, state, **fields):
+    """Move the rows of ``queryset`` that may enter ``state``; returns how many moved."""
+    return queryset.filter(status__in=SOURCES[state]).update(
+        status=state, updated_at=timezone.now(), **fields
+    )
+
+
+# ------------------------------
+# keys and payloads
+# ------------------------------
+def idempotency_key(pin):
+    """Stable key for "this image of this template on this board"."""
+    # Detached pins have no template; fall back to the row itself.
+    source = f"template:{pin.pin_template_id}" if pin.pin_template_id else f"pin:{pin.pk}"
+    raw = f"{source}|{pin.board or ''}|{pin.final_image}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def key_note(key):
+    return f"{NOTE_PREFIX}{key}"
+
+
+def pin_owner(pin):
+    template = pin.pin_template
+    if template is None:
+        return None
+    return template.variant.product.store.user
+
+
+def pin_payload(pin):
+    template = pin.pin_template
+    payload = {
+        "board_id": pin.board,
+        "title": pin.title,
+        "description": pin.description,
+        "alt_text": template.alt_text if template else None,
+        "link": template.variant.product.url if template else None,
+        "media_source": {
+            "source_type": "image_url",
+            "url": pin.final_image
+        }
+    }
+    if pin.idempotency_key:
+        payload["note"] = key_note(pin.idempotency_key)
+    return payload
+
+
+# ------------------------------
+# posting
+# ------------------------------
+@dataclass
+class Attempt:
+    """What one POST of a pin achieved."""
+
+    outcome: str
+    pinterest_pin_id: str = None
+    error: str = None
+    retry_after: float = 0
+
+    def fields(self, now):
+        """Column updates recording this attempt on a ``publishing`` pin.
+
+        ``status`` is absent for an uncertain attempt: the pin stays in
+        ``publishing`` until reconciled.
+        """
+        if self.outcome == POSTED:
+            return {"status": POSTED, "pinterest_pin_id": self.pinterest_pin_id, "posted_at": now,
+                    "error_message": None}
+        if self.outcome == DEFERRED:
+            return {"status": QUEUED, "scheduled_at": now + timedelta(seconds=self.retry_after),
+                    "error_message": self.error}
+        if self.outcome == UNCERTAIN:
+            return {"error_message": self.error}
+        return {"status": FAILED, "error_message": self.error}
+
+
+def send_pin(post, payload):
+    """Classify ``post(payload)`` (a Pinterest response) as an ``Attempt``."""
+    try:
+        response = post(payload)
+    except requests.ConnectTimeout as e:
+        # Never reached Pinterest, so nothing can have been created.
+        return Attempt(DEFERRED, error=f"Could not reach Pinterest: {e}",
+                       retry_after=publishing_setting("DEFAULT_RETRY_AFTER"))
+    except requests.RequestException as e:
+        return Attempt(UNCERTAIN, error=f"No answer from Pinterest ({e}); awaiting reconciliation")
+
+    if response.status_code == 429:
+        wait = retry_after_seconds(response)
+        return Attempt(DEFERRED, error=f"Rate limited by Pinterest, retrying in {int(wait)}s", retry_after=wait)
+
+    if response.ok:
+        try:
+            return Attempt(POSTED, pinterest_pin_id=str(response.json().get("id") or ""))
+        except ValueError:
+            return Attempt(POSTED, pinterest_pin_id="")
+
+    if response.status_code >= 500:
+        return Attempt(UNCERTAIN, error=f"{response.status_code} from Pinterest; awaiting reconciliation")
+
+    return Attempt(FAILED, error=f"{response.status_code}: {response.text[:2000]}")
+
+
+def record_attempt(pin, attempt, now=None):
+    """Write ``attempt`` to ``pin``'s row if the pin is still ``publishing``."""
+    now = now or timezone.now()
+    fields = attempt.fields(now)
+    for name, value in fields.items():
+        setattr(pin, name, value)
+
+    ours = GeneratedPin.objects.filter(pk=pin.pk, publish_started_at=pin.publish_started_at)
+    state = fields.pop("status", None)
+    if state is None:
+        return ours.filter(status=PUBLISHING).update(updated_at=now, **fields)
+    return transition(ours, state, **fields)
+
+
+# ------------------------------
+# reconciliation
+# ------------------------------
+def find_board_pins(request, user, board, keys, max_pages=None):
+    """``({key: pinterest_pin_id}, complete)`` for the ``keys`` found in ``board``'s pin notes.
+
+    ``complete`` is False when the board has more than ``max_pages`` pages,
+    so a key not found may still be on it.
+    """
+    max_pages = max_pages or publishing_setting("RECONCILE_PAGES")
+    wanted = set(keys)
+    found = {}
+    bookmark = None
+    complete = False
+    for _ in range(max_pages):
+        params = {"page_size": 100}
+        if bookmark:
+            params["bookmark"] = bookmark
+        response = request(user, "GET", f"boards/{board}/pins", data=params)
+        response.raise_for_status()
+        page = response.json()
+
+        for item in page.get("items") or []:
+            note = item.get("note") or ""
+            if note.startswith(NOTE_PREFIX) and note[len(NOTE_PREFIX):] in wanted:
+                found[note[len(NOTE_PREFIX):]] = str(item.get("id") or "")
+
+        bookmark = page.get("bookmark")
+        if not bookmark:
+            complete = True
+            break
+        if len(found) == len(wanted):
+            break
+    return found, complete
+
+
+def reconcile_publishing(request=None, now=None, older_than=None):
+    """Settle pins left in ``publishing`` by a POST that got no clear answer.
+
+    Pins are looked up on their board by idempotency key, never re-posted
+    here. Boards that can't be listed, or that are too long to list in
+    ``RECONCILE_PAGES`` pages, leave their unfound pins for the next pass.
+    """
+    request = request or pinterest_client.pinterest_request
+    now = now or timezone.now()
+    older_than = publishing_setting("RECONCILE_AFTER") if older_than is None else older_than
+    stats = {"reconciled": 0, "requeued": 0, "abandoned": 0, "unresolved": 0}
+
+    stuck = GeneratedPin.objects.filter(
+        status=PUBLISHING, publish_started_at__lt=now - timedelta(seconds=older_than)
+    ).select_related("pin_template__variant__product__store__user")
+
+    groups = defaultdict(list)
+    for pin in stuck:
+        groups[(pin_owner(pin), pin.board)].append(pin)
+
+    for (user, board), pins in groups.items():
+        if user is None or not board:
+            # Could never have been accepted by Pinterest.
+            for pin in pins:
+                stats["abandoned"] += record_attempt(pin, Attempt(FAILED, error="Pin has no owner or board"), now)
+            continue
+
+        try:
+            found, complete = find_board_pins(request, user, board, [pin.idempotency_key for pin in pins])
+        except (requests.RequestException, ValueError):
+            stats["unresolved"] += len(pins)
+            continue
+
+        for pin in pins:
+            if pin.idempotency_key in found:
+                stats["reconciled"] += record_attempt(
+                    pin, Attempt(POSTED, pinterest_pin_id=found[pin.idempotency_key]), now
+                )
+            elif not complete:
+                # May sit deeper in the board than we looked: never repost on a guess.
+                stats["unresolved"] += 1
+            else:
+                stats["requeued"] += record_attempt(
+                    pin, Attempt(DEFERRED, error="Not found on Pinterest after an unanswered post; requeued"), now
+                )
+    return stats
@@ -1,4 +1,17 @@
-"""Stub PinGeneratorService used during development/startup."""
+"""Pin template generation and GeneratedPin drafting for a store.
+
+``PinGeneratorService`` is still the development stub; the module-level
+functions are the real implementations behind the pin endpoints and the
+matching background jobs.
+"""
+
+from ..generation.imaging import pillow_available
+from ..generation.pipeline import PinGenerationPipeline
+from ..generation.renderer import PinRenderer, render_setting
+from ..instrumentation import span
+from ..models import GeneratedPin, PinTemplate, Variant
+from .catalog_import_service import bulk_insert
+
 
 class PinGeneratorService:
     @staticmethod
@@ -14,3 +27,57 @@ class PinGeneratorService:
             n = 10
 
         return [{"product_id": getattr(product, "id", None), "pin_index": i} for i in range(n)]
+
+
+def generate_pin_templates(store, parallelism=None, batch_size=None, progress=None):
+    """Generate a PinTemplate for every variant of ``store`` without one."""
+    variants = (
+        Variant.objects.filter(
+            product__store=store,
+            pin_templates__isnull=True,
+            deleted_at__isnull=True,
+            product__deleted_at__isnull=True,
+        )
+        .select_related("product")
+    )
+    pipeline = PinGenerationPipeline(max_workers=parallelism, batch_size=batch_size, progress=progress)
+    return pipeline.run(variants)
+
+
+def save_generated_pins(store, board, render=None):
+    """Create a draft GeneratedPin on ``board`` for each template without one.
+
+    With ``render`` (default: ``PIN_RENDERING['ENABLED']`` when Pillow is
+    installed) each pin's ``final_image`` is its rendered creative; pins
+    whose render failed fall back to the variant image. Returns how many
+    pins were created.
+    """
+    templates = list(
+        PinTemplate.objects.filter(
+            variant__product__store=store,
+            generatedpin__isnull=True,
+            variant__deleted_at__isnull=True,
+        )
+        .select_related("variant__product")
+    )
+
+    if render is None:
+        render = render_setting("ENABLED") and pillow_available()
+    rendered = PinRenderer().render(templates).urls if render and templates else {}
+
+    pins = [
+        GeneratedPin(
+            final_image=(
+                rendered.get(template.pk) or template.variant.image or template.variant.product.main_image or ""
+            ),
+            pin_template=template,
+            title=template.title,
+            description=template.description,
+            board=board,
+            status="draft",
+        )
+        for template in templates
+    ]
+    with span("db.save_pins"):
+        # A concurrent save may have given some of these templates a pin.
+        return bulk_insert(pins, GeneratedPin.objects.filter(pin_template__variant__product__store=store), 500)
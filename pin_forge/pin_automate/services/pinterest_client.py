@@ -0,0 +1,273 @@
+"""Pinterest v5 API client shared by the views, jobs and scheduler.
+
+Every outbound Pinterest call goes through one ``requests.Session`` per
+process, so connections are kept alive and reused instead of paying a
+TCP+TLS handshake per call. The pool size, timeouts and retry policy come
+from ``settings.PINTEREST_HTTP``. Only idempotent methods are retried;
+POSTs (pin creation, token exchange) are never replayed automatically.
+
+Access tokens are cached per user in-process until shortly before they
+expire. Refreshing is single-flight: threads of one process queue on a
+per-user lock, and processes take a lease on the user's
+``PinterestAuth`` row with a conditional UPDATE of ``refreshing_until``.
+The lease holder calls Pinterest outside any transaction, so no database
+lock is held for the HTTP round trip, and writes the new token only while
+it still holds the lease. Other processes poll the row and reuse the
+holder's token.
+"""
+
+import base64
+import os
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..instrumentation import span
+from ..models import PinterestAuth
+
+
+TOKEN_URL = "https://api.pinterest.com/v5/oauth/token"
+LEASE_POLL_INTERVAL = 0.1
+SANDBOX_BASE_URL = "https://api-sandbox.pinterest.com/v5/"
+
+DEFAULTS = {
+    "POOL_CONNECTIONS": 4,
+    "POOL_MAXSIZE": 32,
+    "CONNECT_TIMEOUT": 5,
+    "READ_TIMEOUT": 30,
+    "RETRIES": 3,
+    "BACKOFF": 0.5,
+    "TOKEN_REFRESH_MARGIN": 300,
+    "TOKEN_CACHE_TTL": 300,
+}
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# user id -> (access token, cache it until)
+_tokens = {}
+_token_locks = {}
+_token_locks_guard = threading.Lock()
+
+
+def http_setting(name):
+    return getattr(settings, "PINTEREST_HTTP", {}).get(name, DEFAULTS[name])
+
+
+def api_base_url():
+    return getattr(settings, "PINTEREST_API_BASE_URL", None) or SANDBOX_BASE_URL
+
+
+def default_timeout():
+    return (http_setting("CONNECT_TIMEOUT"), http_setting("READ_TIMEOUT"))
+
+
+def _build_session():
+    retry = Retry(
+        total=http_setting("RETRIES"),
+        backoff_factor=http_setting("BACKOFF"),
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_setting("POOL_CONNECTIONS"),
+        pool_maxsize=http_setting("POOL_MAXSIZE"),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """The process-wide pooled session (rebuilt after a fork)."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def request(method, url, **kwargs):
+    """``requests.request`` over the pooled session with default timeouts."""
+    kwargs.setdefault("timeout", default_timeout())
+    return get_session().request(method.upper(), url, **kwargs)
+
+
+# ------------------------------
+# access tokens
+# ------------------------------
+def _user_id(user):
+    return getattr(user, "pk", user)
+
+
+def _token_lock(user_id):
+    with _token_locks_guard:
+        return _token_locks.setdefault(user_id, threading.Lock())
+
+
+def _needs_refresh(pa, now):
+    margin = timedelta(seconds=http_setting("TOKEN_REFRESH_MARGIN"))
+    return bool(pa.expires_at and pa.expires_at < now + margin)
+
+
+def _cache_token(pa):
+    """Remember ``pa``'s token until it enters the refresh window.
+
+    Tokens without an expiry are re-read after TOKEN_CACHE_TTL so a
+    reconnect done by another process is picked up.
+    """
+    now = timezone.now()
+    until = now + timedelta(seconds=http_setting("TOKEN_CACHE_TTL"))
+    if pa.expires_at:
+        until = min(until, pa.expires_at - timedelta(seconds=http_setting("TOKEN_REFRESH_MARGIN")))
+    if until > now:
+        _tokens[pa.user_id] = (pa.access_token, until)
+    else:
+        _tokens.pop(pa.user_id, None)
+
+
+def _cached_token(user_id):
+    entry = _tokens.get(user_id)
+    if entry and entry[1] > timezone.now():
+        return entry[0]
+    return None
+
+
+def forget_user_token(user):
+    """Drop a cached token, e.g. after the user reconnects Pinterest."""
+    _tokens.pop(_user_id(user), None)
+
+
+def _refresh_lease():
+    """Longest a token exchange can take: the lease outlives it."""
+    return timedelta(seconds=sum(default_timeout()) + 5)
+
+
+def _take_lease(pa):
+    """Lease ``pa`` for refreshing; its expiry, or None while another holder has it."""
+    now = timezone.now()
+    until = now + _refresh_lease()
+    taken = PinterestAuth.objects.filter(
+        Q(refreshing_until__isnull=True) | Q(refreshing_until__lt=now), pk=pa.pk
+    ).update(refreshing_until=until)
+    return until if taken else None
+
+
+def get_user_access_token(user):
+    user_id = _user_id(user)
+    token = _cached_token(user_id)
+    if token:
+        return token
+
+    with _token_lock(user_id):
+        # Another thread may have loaded or refreshed it while we waited.
+        token = _cached_token(user_id)
+        if token:
+            return token
+
+        pa = PinterestAuth.objects.filter(user_id=user_id).first()
+        if not pa:
+            raise Exception("Pinterest not connected for this user")
+
+        if _needs_refresh(pa, timezone.now()):
+            pa = refresh_pinterest_token(pa)
+        else:
+            _cache_token(pa)
+        return pa.access_token
+
+
+def refresh_pinterest_token(pa: PinterestAuth):
+    """Refresh ``pa`` unless another process already did or is doing it."""
+    while True:
+        pa = PinterestAuth.objects.get(pk=pa.pk)
+        if not _needs_refresh(pa, timezone.now()):
+            # refreshed by whoever held the lease
+            _cache_token(pa)
+            return pa
+        lease = _take_lease(pa)
+        if lease is not None:
+            break
+        time.sleep(LEASE_POLL_INTERVAL)
+
+    try:
+        _exchange_refresh_token(pa)
+    finally:
+        saved = PinterestAuth.objects.filter(pk=pa.pk, refreshing_until=lease).update(
+            access_token=pa.access_token,
+            refresh_token=pa.refresh_token,
+            expires_at=pa.expires_at,
+            scope=pa.scope,
+            refreshing_until=None,
+            updated_at=timezone.now(),
+        )
+    if not saved:
+        # The lease ran out and another process took over; keep its token.
+        pa = PinterestAuth.objects.get(pk=pa.pk)
+    _cache_token(pa)
+    return pa
+
+
+def _exchange_refresh_token(pa):
+    """Trade ``pa``'s refresh token for a new token, updating ``pa`` in memory."""
+    client_id = settings.PINTEREST_APP_ID
+    client_secret = settings.PINTEREST_APP_SECRET
+    b64 = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+    headers = {"Authorization": f"Basic {b64}", "Content-Type": "application/x-www-form-urlencoded"}
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": pa.refresh_token,
+    }
+    resp = request("POST", TOKEN_URL, headers=headers, data=data)
+    resp.raise_for_status()
+    token_data = resp.json()
+    pa.access_token = token_data.get("access_token")
+    pa.refresh_token = token_data.get("refresh_token", pa.refresh_token)
+    expires_in = token_data.get("expires_in")
+    pa.expires_at = timezone.now() + timedelta(seconds=int(expires_in)) if expires_in else None
+    pa.scope = token_data.get("scope", pa.scope)
+    return pa
+
+
+def pinterest_request(user, method, endpoint, data=None):
+    return api_request(get_user_access_token(user), method, endpoint, data=data)
+
+
+def api_request(token, method, endpoint, data=None):
+    """Call a v5 ``endpoint`` with an access token the caller already holds."""
+    url = f"{api_base_url()}{endpoint}"
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    method = method.upper()
+    if method not in ("GET", "POST"):
+        raise Exception("Unsupported method")
+
+    # e.g. "pinterest.post.pins", "pinterest.get.boards"
+    with span(f"pinterest.{method.lower()}.{endpoint.split('/')[0]}", endpoint=endpoint):
+        if method == "GET":
+            return request("GET", url, headers=headers, params=data)
+        return request("POST", url, headers=headers, json=data)
@@ -0,0 +1,232 @@
+"""Incremental reader for the scraped ``products.json`` payload.
+
+The storefront payload is one large JSON object whose product list
+lives at ``<PRODUCTS_KEY>.b.data``. ``JsonStream`` walks the document
+forward from a file object, skipping everything that is not on the
+requested path without decoding it, and decodes only the values that
+are asked for. Iterating the product list therefore holds one product
+in memory at a time instead of the whole document.
+"""
+
+import json
+import os
+import re
+
+from django.conf import settings
+
+
+PRODUCTS_KEY = "2712286816"  # this is from where our products are starting
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[,}\]\s]")
+
+
+def products_json_path():
+    return os.path.join(settings.BASE_DIR, "downloads", "products.json")
+
+
+class JsonStream:
+    """Forward-only JSON navigator over a text file object.
+
+    Paths are tuples whose items are object keys (``str``) or positions
+    (``int``); a position selects the n-th member of an object or the
+    n-th element of an array. A stream can be walked only once.
+    """
+
+    def __init__(self, fp, chunk_size=64 * 1024):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    # ------------------------------
+    # buffer management
+    # ------------------------------
+    def _fill(self, size=None):
+        """Read more input, dropping what has been consumed. False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    # ------------------------------
+    # decoding / skipping values
+    # ------------------------------
+    def _read_string(self):
+        self._expect('"')
+        while True:
+            try:
+                value, end = json.decoder.scanstring(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+    def _decode(self):
+        """Decode the value at the cursor, reading more input as needed."""
+        if self._peek() not in '{["':
+            # A scalar split across chunks ("1." + "5", "tr" + "ue") still
+            # decodes as something, so read on until its end is buffered.
+            while _SCALAR_END.search(self.buf, self.pos) is None and self._fill():
+                pass
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill(size):
+                    size *= 2
+                    continue
+                raise
+            self.pos = end
+            return value
+
+    def _skip_string(self):
+        # cursor is just past the opening quote
+        while True:
+            match = _STRING_SPECIAL.search(self.buf, self.pos)
+            if match is None or (match.group() == "\\" and match.end() == len(self.buf)):
+                self.pos = len(self.buf) if match is None else match.start()
+                if not self._fill():
+                    raise json.JSONDecodeError("Unterminated string", self.buf, self.pos)
+                continue
+            if match.group() == "\\":
+                self.pos = match.end() + 1
+                continue
+            self.pos = match.end()
+            return
+
+    def _skip(self):
+        """Skip over the value at the cursor without building it."""
+        char = self._peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string()
+            return
+        if char not in "{[":
+            while True:
+                match = _SCALAR_END.search(self.buf, self.pos)
+                if match is not None:
+                    self.pos = match.start()
+                    return
+                if not self._fill():
+                    self.pos = len(self.buf)
+                    return
+
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise json.JSONDecodeError("Unterminated container", self.buf, self.pos)
+                continue
+            self.pos = match.end()
+            token = match.group()
+            if token == '"':
+                self._skip_string()
+            elif token in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    # ------------------------------
+    # navigation
+    # ------------------------------
+    def _seek(self, path):
+        for step in path:
+            opener = self._expect("{[")
+            closer = "}" if opener == "{" else "]"
+            index = 0
+
+            if self._peek() == closer:
+                raise KeyError(step)
+
+            while True:
+                if opener == "{":
+                    key = self._read_string()
+                    self._expect(":")
+                    found = key == step if isinstance(step, str) else index == step
+                else:
+                    found = index == step
+
+                if found:
+                    break
+
+                self._skip()
+                index += 1
+                if self._expect("," + closer) == closer:
+                    raise KeyError(step)
+
+    def read_value(self, path=()):
+        """Decode and return the value at ``path``."""
+        self._seek(path)
+        return self._decode()
+
+    def iter_array(self, path=()):
+        """Yield the elements of the array at ``path`` one at a time.
+
+        A non-array value at ``path`` is yielded as a single item.
+        """
+        self._seek(path)
+
+        if self._peek() != "[":
+            yield self._decode()
+            return
+
+        self._expect("[")
+        if self._peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            yield self._decode()
+            if self._expect(",]") == "]":
+                return
+
+
+# -----------------------------------------------------
+# products.json HELPERS
+# -----------------------------------------------------
+def iter_products(file_path=None, key=PRODUCTS_KEY):
+    """Yield product dicts from ``<key>.b.data`` of the saved payload."""
+    with open(file_path or products_json_path(), "r", encoding="utf-8") as f:
+        yield from JsonStream(f).iter_array((key, "b", "data"))
+
+
+def read_store_title(file_path=None):
+    """Title of the first product under the payload's first key."""
+    try:
+        with open(file_path or products_json_path(), "r", encoding="utf-8") as f:
+            title = JsonStream(f).read_value((0, "b", "data", 0, "title"))
+    except (OSError, KeyError, json.JSONDecodeError):
+        return "Untitled"
+    return title if isinstance(title, str) else "Untitled"
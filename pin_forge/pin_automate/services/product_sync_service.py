@@ -1,13 +1,243 @@
-"""Stub ProductSyncService used during development/startup.
+"""Incremental, change-detecting product sync for a store.
 
-The real implementation may contact external stores. This lightweight
-stub provides the expected API so imports succeed while running
-management commands like `makemigrations`.
+Every product and variant gets a content hash of the fields we derive
+from the scraped payload. A sync recomputes the hashes and only writes
+what changed: new rows with ``bulk_create``, changed or reappearing rows
+with ``bulk_update``, and rows missing from the payload are soft-deleted
+by setting ``deleted_at``. A product's hash also covers its options and
+price, so the variants of an unchanged product are not even loaded.
+An unchanged store therefore costs a handful of queries and writes only
+``Store.synced_at``, the per-store watermark.
 """
 
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..instrumentation import span
+from ..models import Product, Store, Variant
+from ..response_cache import invalidate_catalog
+from .catalog_import_service import _chunked, bulk_insert, product_price
+from .option_matrix import LEADING_AXES, VariantMatrix
+from .product_feed import iter_products
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def content_hash(data):
+    """Stable 32-char digest of a JSON-serializable value."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class SyncResult:
+    created_products: int = 0
+    updated_products: int = 0
+    deleted_products: int = 0
+    unchanged_products: int = 0
+    created_variants: int = 0
+    updated_variants: int = 0
+    deleted_variants: int = 0
+    # inserted by a concurrent sync meanwhile
+    skipped_products: int = 0
+    skipped_variants: int = 0
+
+    @property
+    def changed(self):
+        """Whether any product or variant row was written."""
+        return any((
+            self.created_products, self.updated_products, self.deleted_products,
+            self.created_variants, self.updated_variants, self.deleted_variants,
+        ))
+
+    def as_dict(self):
+        return asdict(self)
+
+
 class ProductSyncService:
-    @staticmethod
-    def sync(store):
-        """No-op stub for syncing products from a store."""
-        # In the real implementation this would enqueue or run sync logic.
-        return None
+    """Bring a store's products and variants in line with a scraped payload.
+
+    ``products`` may be any iterable of raw product dicts (the saved
+    products.json feed by default) and is consumed ``chunk_size`` at a
+    time inside one transaction.
+    """
+
+    PRODUCT_FIELDS = ["title", "description", "url", "main_image"]
+    VARIANT_FIELDS = ["name", "price", "attributes"]
+
+    def __init__(self, store, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.store = store
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def sync(cls, store, products=None):
+        return cls(store).run(iter_products() if products is None else products)
+
+    def run(self, products):
+        result = SyncResult()
+        now = timezone.now()
+
+        with span("db.sync_products", store_id=self.store.pk), transaction.atomic():
+            # product_id -> (pk, content_hash, deleted_at)
+            existing = {
+                row[0]: row[1:]
+                for row in Product.objects.filter(store=self.store)
+                .values_list("product_id", "id", "content_hash", "deleted_at")
+            }
+            seen = set()
+
+            for chunk in _chunked(products, self.chunk_size):
+                self._sync_chunk(chunk, existing, seen, now, result)
+
+            gone = [
+                pk for product_id, (pk, _, deleted_at) in existing.items()
+                if product_id not in seen and deleted_at is None
+            ]
+            for pks in _chunked(gone, self.chunk_size):
+                result.deleted_products += Product.objects.filter(pk__in=pks).update(deleted_at=now)
+                result.deleted_variants += Variant.objects.filter(
+                    product_id__in=pks, deleted_at__isnull=True
+                ).update(deleted_at=now)
+
+            Store.objects.filter(pk=self.store.pk).update(synced_at=now)
+            self.store.synced_at = now
+            # a no-op resync keeps the cached responses
+            if result.changed:
+                invalidate_catalog()
+
+        return result
+
+    # ------------------------------
+    # products
+    # ------------------------------
+    def _build_product(self, raw):
+        matrix = VariantMatrix.from_product(raw, product_price(raw))
+        product = Product(
+            store=self.store,
+            product_id=str(raw.get("id")),
+            title=raw.get("title", "Untitled"),
+            description=raw.get("description", ""),
+            url=self.store.url + raw.get("path", ""),
+            main_image=raw.get("image", ""),
+            status="new",
+        )
+        product.content_hash = content_hash({
+            **{name: getattr(product, name) for name in self.PRODUCT_FIELDS},
+            "price": matrix.price,
+            "colors": matrix.axis("color"),
+            "sizes": matrix.axis("size"),
+            # further option types; absent for plain colour x size products
+            **{f"options:{axis.type}": axis.items for axis in matrix.axes if axis.type not in LEADING_AXES},
+        })
+        return product, matrix
+
+    def _sync_chunk(self, chunk, existing, seen, now, result):
+        new_products = []
+        changed_products = []
+        # product_id -> VariantMatrix, for every product whose variants we diff
+        pending = {}
+
+        for raw in chunk:
+            product, matrix = self._build_product(raw)
+            key = product.product_id
+            if key in seen:
+                continue
+            seen.add(key)
+
+            row = existing.get(key)
+            if row is None:
+                new_products.append(product)
+            elif row[1] != product.content_hash or row[2] is not None:
+                product.pk = row[0]
+                product.deleted_at = None
+                changed_products.append(product)
+            else:
+                result.unchanged_products += 1
+                continue
+            pending[key] = matrix
+
+        if new_products:
+            scope = Product.objects.filter(store=self.store, product_id__in=[p.product_id for p in new_products])
+            created = bulk_insert(new_products, scope, self.chunk_size)
+            pks = dict(scope.values_list("product_id", "id"))
+            for product in new_products:
+                product.pk = pks[product.product_id]
+                existing[product.product_id] = (product.pk, product.content_hash, None)
+            result.created_products += created
+            result.skipped_products += len(new_products) - created
+
+        if changed_products:
+            Product.objects.bulk_update(
+                changed_products,
+                self.PRODUCT_FIELDS + ["content_hash", "deleted_at"],
+                batch_size=self.chunk_size,
+            )
+            for product in changed_products:
+                existing[product.product_id] = (product.pk, product.content_hash, None)
+            result.updated_products += len(changed_products)
+
+        if pending:
+            self._sync_variants(
+                {existing[key][0]: matrix for key, matrix in pending.items()},
+                check_existing=bool(changed_products),
+                now=now,
+                result=result,
+            )
+
+    # ------------------------------
+    # variants
+    # ------------------------------
+    def _sync_variants(self, matrices, check_existing, now, result):
+        # (product pk, variant_id) -> (pk, content_hash, deleted_at)
+        current = {}
+        if check_existing:
+            current = {
+                (row[0], row[1]): row[2:]
+                for row in Variant.objects.filter(product_id__in=list(matrices))
+                .values_list("product_id", "variant_id", "id", "content_hash", "deleted_at")
+            }
+
+        new_variants = []
+        changed_variants = []
+        seen = set()
+        for product_pk, matrix in matrices.items():
+            for variant in matrix.variants(product_pk, status="new"):
+                key = (product_pk, variant.variant_id)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                variant.content_hash = content_hash(
+                    {"name": variant.name, "price": matrix.price, "attributes": variant.attributes}
+                )
+
+                row = current.get(key)
+                if row is None:
+                    new_variants.append(variant)
+                elif row[1] != variant.content_hash or row[2] is not None:
+                    variant.pk = row[0]
+                    variant.deleted_at = None
+                    changed_variants.append(variant)
+
+        if new_variants:
+            scope = Variant.objects.filter(product_id__in=list(matrices))
+            created = bulk_insert(new_variants, scope, self.chunk_size)
+            result.created_variants += created
+            result.skipped_variants += len(new_variants) - created
+
+        if changed_variants:
+            Variant.objects.bulk_update(
+                changed_variants,
+                self.VARIANT_FIELDS + ["content_hash", "deleted_at"],
+                batch_size=self.chunk_size,
+            )
+            result.updated_variants += len(changed_variants)
+
+        gone = [row[0] for key, row in current.items() if key not in seen and row[2] is None]
+        for pks in _chunked(gone, self.chunk_size):
+            result.deleted_variants += Variant.objects.filter(pk__in=pks).update(deleted_at=now)
@@ -0,0 +1,204 @@
+"""Scheduled publishing of queued GeneratedPins to Pinterest.
+
+``PublishScheduler.run_once()`` looks at due pins (``status='queued'``
+and ``scheduled_at`` unset or in the past), claims each one and posts it
+through a per-user token bucket sized by ``PINTEREST_PUBLISHING``.
+Candidates are taken round-robin across users, at most ``BURST`` per
+user and none for users whose bucket is empty, so one rate-limited
+user's backlog never starves the others. A token is only spent once the
+claim is won.
+
+Buckets live in ``PublishBucket`` rows and are updated conditionally on
+their version, so any number of scheduler processes share one quota per
+user instead of each posting at the full rate.
+
+A claim is the ``queued -> publishing`` transition from
+``pin_publishing``, a conditional update, so several scheduler processes
+never post the same pin. A 429 pauses that user's bucket for
+``Retry-After`` seconds and requeues the pin instead of failing it; a
+post with no clear answer stays in ``publishing`` and each pass starts
+by reconciling such pins against Pinterest rather than re-posting them.
+"""
+
+import time
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from ..models import GeneratedPin, PublishBucket
+from . import pinterest_client
+from .pin_publishing import (
+    DEFERRED, FAILED, POSTED, PUBLISHING, QUEUED, UNCERTAIN,
+    Attempt, idempotency_key, pin_owner, pin_payload, publishing_setting, reconcile_publishing,
+    record_attempt, send_pin, transition,
+)
+from .rate_limit import TokenBucket
+
+
+def due_pins(now=None):
+    now = now or timezone.now()
+    return GeneratedPin.objects.filter(
+        Q(scheduled_at__isnull=True) | Q(scheduled_at__lte=now),
+        status=QUEUED,
+    )
+
+
+class UserBucket(TokenBucket):
+    """A ``TokenBucket`` kept in the user's ``PublishBucket`` row.
+
+    Every operation loads the row, applies the in-memory logic and writes
+    the result back with ``UPDATE ... WHERE version = <loaded>``; when
+    another process wrote in between, it reloads and tries again.
+    """
+
+    def __init__(self, user_id, rate, capacity, clock=time.time):
+        super().__init__(rate, capacity, clock)
+        self.user_id = user_id
+
+    def _load(self):
+        row, _ = PublishBucket.objects.get_or_create(
+            user_id=self.user_id, defaults={"tokens": self.capacity, "updated": self.clock()}
+        )
+        self.tokens, self.updated, self.blocked_until = row.tokens, row.updated, row.blocked_until
+        return row.version
+
+    def _write(self, operation, *args):
+        while True:
+            version = self._load()
+            outcome = operation(*args)
+            if PublishBucket.objects.filter(user_id=self.user_id, version=version).update(
+                tokens=self.tokens, updated=self.updated, blocked_until=self.blocked_until, version=version + 1
+            ):
+                return outcome
+
+    def wait_time(self, tokens=1):
+        self._load()
+        return super().wait_time(tokens)
+
+    def try_acquire(self, tokens=1):
+        return self._write(super().try_acquire, tokens)
+
+    def pause(self, seconds):
+        self._write(super().pause, seconds)
+
+
+class PublishScheduler:
+    OWNER = "pin_template__variant__product__store__user_id"
+
+    def __init__(self, rate_per_minute=None, burst=None, batch_size=None, poll_interval=None, request=None,
+                 clock=time.time):
+        self.rate = (rate_per_minute or publishing_setting("RATE_PER_MINUTE")) / 60
+        self.burst = burst or publishing_setting("BURST")
+        self.batch_size = batch_size or publishing_setting("BATCH_SIZE")
+        self.poll_interval = poll_interval or publishing_setting("POLL_INTERVAL")
+        self.request = request or pinterest_client.pinterest_request
+        self.clock = clock
+        self.buckets = {}
+
+    def bucket_for(self, user_id):
+        if user_id not in self.buckets:
+            self.buckets[user_id] = UserBucket(user_id, self.rate, self.burst, clock=self.clock)
+        return self.buckets[user_id]
+
+    def candidates(self):
+        """``(pin_id, user_id)`` of due pins, interleaved across users that may post now."""
+        now = self.clock()
+        # users whose bucket, as any scheduler left it, is paused or short of a token
+        waiting = PublishBucket.objects.filter(
+            Q(blocked_until__gt=now) | Q(tokens__lt=1 - (now - F("updated")) * self.rate)
+        ).values("user_id")
+        oldest_first = [F("scheduled_at").asc(nulls_first=True), "id"]
+        return list(
+            due_pins()
+            .exclude(**{f"{self.OWNER}__in": waiting})
+            .annotate(turn=Window(RowNumber(), partition_by=F(self.OWNER), order_by=oldest_first))
+            .filter(turn__lte=self.burst)
+            .order_by("turn", *oldest_first)
+            .values_list("id", self.OWNER)[:self.batch_size]
+        )
+
+    # ------------------------------
+    # claiming
+    # ------------------------------
+    def claim(self, pin_id):
+        """Move one due pin from queued to publishing; None if it's gone or taken."""
+        pin = (
+            due_pins()
+            .filter(pk=pin_id)
+            .select_related("pin_template__variant__product__store__user")
+            .first()
+        )
+        if pin is None:
+            return None
+
+        # The conditional update is the claim: of several schedulers (or a
+        # bulk publish) racing for this pin, only one sees a row updated.
+        pin.idempotency_key = idempotency_key(pin)
+        pin.publish_started_at = timezone.now()
+        claimed = transition(
+            due_pins(pin.publish_started_at).filter(pk=pin.pk),
+            PUBLISHING,
+            idempotency_key=pin.idempotency_key,
+            publish_started_at=pin.publish_started_at,
+        )
+        if not claimed:
+            return None
+        pin.status = PUBLISHING
+        return pin
+
+    # ------------------------------
+    # publishing
+    # ------------------------------
+    def publish(self, pin):
+        """Post one claimed pin and record the outcome on its row."""
+        user = pin_owner(pin)
+        if user is None:
+            attempt = Attempt(FAILED, error="Pin has no template/store owner")
+        else:
+            attempt = send_pin(lambda payload: self.request(user, "POST", "pins", data=payload), pin_payload(pin))
+            if attempt.outcome == DEFERRED:
+                self.bucket_for(user.id).pause(attempt.retry_after)
+
+        record_attempt(pin, attempt)
+        return attempt.outcome
+
+    # ------------------------------
+    # loop
+    # ------------------------------
+    def run_once(self):
+        """Publish what the buckets allow from one batch of due pins."""
+        stats = {POSTED: 0, FAILED: 0, DEFERRED: 0, UNCERTAIN: 0, "throttled": 0}
+        stats.update(reconcile_publishing(self.request))
+
+        for pin_id, user_id in self.candidates():
+            # Ownerless pins are failed by publish() without a request.
+            bucket = self.bucket_for(user_id) if user_id is not None else None
+            if bucket is not None and bucket.wait_time() > 0:
+                # spent earlier in this pass or by another scheduler, or paused by a 429
+                stats["throttled"] += 1
+                continue
+
+            pin = self.claim(pin_id)
+            if pin is None:
+                continue  # another scheduler won it; no token spent
+            if bucket is not None and not bucket.try_acquire():
+                # another scheduler took the last token meanwhile
+                transition(GeneratedPin.objects.filter(pk=pin.pk, publish_started_at=pin.publish_started_at), QUEUED)
+                stats["throttled"] += 1
+                continue
+            stats[self.publish(pin)] += 1
+
+        return stats
+
+    def next_wait(self):
+        waits = [bucket.wait_time() for bucket in self.buckets.values()]
+        return min([self.poll_interval] + [w for w in waits if w > 0])
+
+    def run(self, once=False):
+        while True:
+            stats = self.run_once()
+            if once:
+                return stats
+            if not (stats[POSTED] or stats[FAILED] or stats[DEFERRED] or stats[UNCERTAIN]):
+                time.sleep(self.next_wait())
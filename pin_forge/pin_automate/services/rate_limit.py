@@ -0,0 +1,59 @@
+"""Token-bucket rate limiting for outbound API calls."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Allow ``rate`` calls per second on average with bursts of ``capacity``.
+
+    ``pause(seconds)`` empties the bucket and blocks it for that long,
+    which is how a 429 ``Retry-After`` is honored.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, tokens=1):
+        """Seconds until ``tokens`` can be taken (0 if available now)."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            blocked = max(0.0, self.blocked_until - now)
+            missing = max(0.0, tokens - self.tokens)
+            return max(blocked, missing / self.rate if self.rate else float("inf"))
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            now = self.clock()
+            if now < self.blocked_until:
+                return False
+            self._refill(now)
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` are available, then take them."""
+        while not self.try_acquire(tokens):
+            time.sleep(max(self.wait_time(tokens), 0.01))
+
+    def pause(self, seconds):
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens = 0.0
+            self.updated = max(self.updated, now)
+            self.blocked_until = max(self.blocked_until, now + seconds)
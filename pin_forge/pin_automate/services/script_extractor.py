@@ -0,0 +1,207 @@
+"""Locate the product JSON embedded in a storefront page.
+
+Storefronts are Angular server renders: the product request's response
+is inlined in a ``<script id="ng-state" type="application/json">``
+transfer-state blob (``serverApp-state`` with ``&q;``-escaped quotes on
+older builds) keyed by ``PRODUCTS_KEY``.
+
+``ScriptExtractor`` is a small streaming tokenizer that recognises only
+``<script>`` open and close tags. Page text can be fed in chunks as it
+downloads; markup outside scripts is skipped with a single regex search
+per chunk, and scanning stops at the first script that carries the
+products key. No DOM is built and no script body is copied or
+lowercased unless it is a candidate. A candidate is sliced to its outer
+object and sanity checked before anyone pays for a JSON parse.
+"""
+
+import codecs
+import re
+
+from .product_feed import PRODUCTS_KEY
+
+
+STATE_SCRIPT_IDS = ("ng-state", "serverApp-state")
+JSON_SCRIPT_TYPES = ("application/json",)
+
+_SCRIPT_OPEN = re.compile(r"<script\b([^>]*)>", re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.IGNORECASE)
+_ATTRIBUTE = re.compile(r"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+_PRODUCT_WORD = re.compile("product", re.IGNORECASE)
+
+# longest open tag / close tag we wait for across chunk boundaries
+_MAX_OPEN_TAG = 2048
+_MAX_CLOSE_TAG = 16
+
+# Angular TransferState escaping (serverApp-state); "&a;" must go last
+_ANGULAR_ESCAPES = (("&q;", '"'), ("&s;", "'"), ("&l;", "<"), ("&g;", ">"), ("&a;", "&"))
+
+
+def script_attributes(raw):
+    attributes = {}
+    for match in _ATTRIBUTE.finditer(raw):
+        name, *values = match.groups()
+        attributes[name.lower()] = next((value for value in values if value is not None), "")
+    return attributes
+
+
+def object_slice(text, start=0, end=None):
+    """The outermost ``{...}`` within ``text[start:end]``, or None."""
+    end = len(text) if end is None else end
+    first = text.find("{", start, end)
+    last = text.rfind("}", start, end)
+    if first == -1 or last < first:
+        return None
+    return text[first:last + 1]
+
+
+def _find_script_close(text, pos):
+    """``(start, end)`` of the next ``</script>`` at or after ``pos``, else (-1, -1)."""
+    while True:
+        start = text.find("</", pos)
+        if start == -1:
+            return -1, -1
+        match = _SCRIPT_CLOSE.match(text, start)
+        if match is not None:
+            return start, match.end()
+        pos = start + 2
+
+
+def looks_like_json_object(blob):
+    """Cheap structural check: braces at both ends and a quoted first key."""
+    if len(blob) < 2 or blob[0] != "{" or blob[-1] != "}":
+        return False
+    inner = blob[1:64].lstrip()
+    return inner[:1] in ('"', "}")
+
+
+def unescape_transfer_state(blob):
+    for escaped, char in _ANGULAR_ESCAPES:
+        # Once the quotes are done, most payloads have no "&" left at all.
+        if "&" not in blob:
+            break
+        blob = blob.replace(escaped, char)
+    return blob
+
+
+class ScriptExtractor:
+    """Incrementally scan HTML for the script holding the products key.
+
+    ``feed(text)`` returns the JSON blob as soon as it has been seen and
+    None until then; ``close()`` falls back to the best weaker candidate
+    (a transfer-state script without the key, then the first script that
+    mentions "product") and raises ``ValueError`` if there is none.
+    """
+
+    def __init__(self, key=PRODUCTS_KEY):
+        self.needle = f'"{key}"'
+        self.escaped_needle = f"&q;{key}&q;"
+        self.result = None
+        self.fallback = None
+        self._fallback_is_state = False
+        self._pending = ""
+        self._attributes = None  # raw attributes of the open script
+        self._body = []
+
+    def feed(self, text):
+        if self.result is not None or not text:
+            return self.result
+
+        buf = self._pending + text if self._pending else text
+        pos = 0
+        while True:
+            if self._attributes is None:
+                match = _SCRIPT_OPEN.search(buf, pos)
+                if match is None:
+                    self._pending = buf[max(pos, len(buf) - _MAX_OPEN_TAG):]
+                    return None
+                self._attributes = match.group(1)
+                pos = match.end()
+
+            end, after = _find_script_close(buf, pos)
+            if end == -1:
+                # Keep just enough to recognise a close tag split across chunks.
+                keep = max(pos, len(buf) - _MAX_CLOSE_TAG)
+                if keep > pos:
+                    self._body.append(buf[pos:keep])
+                self._pending = buf[keep:]
+                return None
+
+            if self._body:
+                self._body.append(buf[pos:end])
+                body = "".join(self._body)
+                self._script(body, 0, len(body))
+            else:
+                self._script(buf, pos, end)
+            self._attributes = None
+            self._body = []
+            pos = after
+
+            if self.result is not None:
+                self._pending = ""
+                return self.result
+
+    def close(self):
+        if self.result is None:
+            self.result = self.fallback
+        if self.result is None:
+            raise ValueError("No valid product JSON found")
+        return self.result
+
+    def _script(self, text, start, end):
+        """Judge the script body ``text[start:end]`` without copying it."""
+        if text.find(self.needle, start, end) != -1:
+            escaped = False
+        elif text.find(self.escaped_needle, start, end) != -1:
+            escaped = True
+        else:
+            if not self._fallback_is_state:
+                self._consider_fallback(text[start:end])
+            return
+
+        blob = object_slice(text, start, end)
+        if blob is not None and escaped:
+            blob = unescape_transfer_state(blob)
+        if blob is not None and looks_like_json_object(blob):
+            self.result = blob
+
+    def _consider_fallback(self, body):
+        attributes = script_attributes(self._attributes)
+        is_state = (
+            attributes.get("id") in STATE_SCRIPT_IDS
+            or attributes.get("type", "").lower() in JSON_SCRIPT_TYPES
+        )
+        # A transfer-state script beats an earlier "product" mention.
+        if not is_state and (self.fallback is not None or not _PRODUCT_WORD.search(body)):
+            return
+
+        blob = object_slice(body)
+        if blob is not None and "&q;" in blob[:64]:
+            blob = unescape_transfer_state(blob)
+        if blob is not None and looks_like_json_object(blob):
+            self.fallback = blob
+            self._fallback_is_state = is_state
+
+
+def extract_product_json(text, key=PRODUCTS_KEY):
+    """The product JSON blob embedded in a storefront page's scripts."""
+    extractor = ScriptExtractor(key)
+    extractor.feed(text)
+    return extractor.close()
+
+
+def extract_from_response(response, key=PRODUCTS_KEY, chunk_size=64 * 1024):
+    """Like ``extract_product_json`` for a streamed ``requests`` response.
+
+    Stops reading (and closes the response) once the blob has been found.
+    """
+    extractor = ScriptExtractor(key)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if extractor.feed(decoder.decode(chunk)) is not None:
+                break
+        else:
+            extractor.feed(decoder.decode(b"", final=True))
+    finally:
+        response.close()
+    return extractor.close()
@@ -0,0 +1,183 @@
+"""Concurrent, conditional crawling of Store storefront pages.
+
+``StoreCrawler.crawl(stores)`` fetches every store's ``url`` on a bounded
+thread pool. ``HostLimiter`` keeps at most ``PER_HOST`` requests in
+flight per host and starts them at least ``MIN_INTERVAL`` seconds apart.
+Requests carry the ``If-None-Match`` / ``If-Modified-Since`` validators
+saved by the previous crawl, so an unchanged storefront answers 304 and
+is neither parsed nor synced.
+
+Only the network round trip and the script extraction run on the pool.
+The products are synced (``ProductSyncService``) and the validators
+saved on the calling thread as results complete, so the database sees a
+single writer.
+"""
+
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urlsplit
+
+import requests
+from django.utils import timezone
+
+from ..instrumentation import span
+from ..models import Store
+from ..response_cache import invalidate_catalog
+from .product_feed import PRODUCTS_KEY, JsonStream
+from .product_sync_service import ProductSyncService
+from .script_extractor import extract_from_response
+from .storefront_service import crawler_setting, storefront_session, storefront_timeout
+
+
+FETCHED = "fetched"
+NOT_MODIFIED = "not_modified"
+FAILED = "failed"
+
+
+class HostLimiter:
+    """Per-host concurrency cap plus a minimum spacing between request starts."""
+
+    def __init__(self, per_host, min_interval, clock=time.monotonic, sleep=time.sleep):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._slots = {}
+        self._next_start = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host):
+        with self._lock:
+            semaphore = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+
+        semaphore.acquire()
+        try:
+            with self._lock:
+                now = self.clock()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                self.sleep(start - now)
+            yield
+        finally:
+            semaphore.release()
+
+
+@dataclass
+class CrawlResult:
+    store_id: int
+    url: str
+    status: str
+    http_status: int = None
+    seconds: float = 0.0
+    error: str = None
+    sync: dict = None
+    etag: str = ""
+    last_modified: str = ""
+    # extracted product JSON, dropped once synced
+    blob: str = field(default=None, repr=False)
+
+    def as_dict(self):
+        data = asdict(self)
+        data.pop("blob")
+        return data
+
+
+class StoreCrawler:
+    def __init__(self, max_workers=None, per_host=None, min_interval=None, session=None, sync=True):
+        self.max_workers = max_workers or crawler_setting("MAX_WORKERS")
+        self.limiter = HostLimiter(
+            per_host or crawler_setting("PER_HOST"),
+            crawler_setting("MIN_INTERVAL") if min_interval is None else min_interval,
+        )
+        self.session = session or storefront_session()
+        self.sync = sync
+
+    # ------------------------------
+    # pool side
+    # ------------------------------
+    def fetch(self, store):
+        """GET one storefront (conditionally) and extract its product JSON."""
+        result = CrawlResult(store_id=store.id, url=store.url, status=FAILED)
+        headers = {}
+        if store.etag:
+            headers["If-None-Match"] = store.etag
+        if store.last_modified:
+            headers["If-Modified-Since"] = store.last_modified
+
+        start = time.perf_counter()
+        try:
+            with span("storefront.scrape", url=store.url), self.limiter.slot(urlsplit(store.url).netloc), self.session.get(
+                store.url, headers=headers, timeout=storefront_timeout(), stream=True
+            ) as response:
+                result.http_status = response.status_code
+                if response.status_code == 304:
+                    result.status = NOT_MODIFIED
+                else:
+                    response.raise_for_status()
+                    result.blob = extract_from_response(response)
+                    result.etag = response.headers.get("ETag", "")
+                    result.last_modified = response.headers.get("Last-Modified", "")
+                    result.status = FETCHED
+        except (requests.RequestException, ValueError) as e:
+            result.error = str(e)
+
+        result.seconds = round(time.perf_counter() - start, 4)
+        return result
+
+    # ------------------------------
+    # caller side
+    # ------------------------------
+    def apply(self, store, result):
+        """Sync a fetched store and remember its validators."""
+        if result.status == FAILED:
+            return
+
+        updates = {"crawled_at": timezone.now()}
+        if result.status == FETCHED and self.sync:
+            products = JsonStream(io.StringIO(result.blob)).iter_array((PRODUCTS_KEY, "b", "data"))
+            result.sync = ProductSyncService(store).run(products).as_dict()
+            # Only a synced page may be skipped next time.
+            updates.update(etag=result.etag, last_modified=result.last_modified)
+        result.blob = None
+
+        Store.objects.filter(pk=store.pk).update(**updates)
+        for name, value in updates.items():
+            setattr(store, name, value)
+
+    def crawl(self, stores, progress=None):
+        stores = list(stores)
+        results = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.fetch, store): store for store in stores}
+            for future in as_completed(futures):
+                result = future.result()
+                try:
+                    self.apply(futures[future], result)
+                except Exception as e:
+                    result.status = FAILED
+                    result.error = f"Sync failed: {e}"
+                    result.blob = None
+                results.append(result)
+                if progress is not None:
+                    progress(len(results), len(stores))
+
+        if any(result.status != FAILED for result in results):
+            # crawled_at/etag are part of the stores nested in product responses
+            invalidate_catalog()
+        return results
+
+
+def crawl_stores(stores, progress=None, **options):
+    """Crawl ``stores`` and return per-store results plus status counts."""
+    results = StoreCrawler(**options).crawl(stores, progress=progress)
+    counts = {FETCHED: 0, NOT_MODIFIED: 0, FAILED: 0}
+    for result in results:
+        counts[result.status] += 1
+    return {**counts, "stores": [result.as_dict() for result in results]}
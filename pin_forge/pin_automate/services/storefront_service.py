@@ -0,0 +1,119 @@
+"""Scraping of the storefront page that embeds the product JSON."""
+
+import io
+import os
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from ..instrumentation import span
+from ..models import Store
+from .product_feed import PRODUCTS_KEY, JsonStream, products_json_path
+from .product_sync_service import ProductSyncService
+from .script_extractor import extract_from_response
+
+
+DEFAULTS = {
+    "MAX_WORKERS": 8,
+    "PER_HOST": 2,
+    "MIN_INTERVAL": 1.0,
+    "CONNECT_TIMEOUT": 5,
+    "READ_TIMEOUT": 30,
+    "USER_AGENT": "pin_forge-crawler/1.0",
+}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def crawler_setting(name):
+    return getattr(settings, "STORE_CRAWLER", {}).get(name, DEFAULTS[name])
+
+
+def storefront_timeout():
+    return (crawler_setting("CONNECT_TIMEOUT"), crawler_setting("READ_TIMEOUT"))
+
+
+def storefront_session():
+    """Process-wide keep-alive session for storefront pages."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=crawler_setting("MAX_WORKERS"))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = crawler_setting("USER_AGENT")
+                _session, _session_pid = session, pid
+    return _session
+
+
+def save_products_json(data):
+    """Write the raw JSON blob to downloads/products.json atomically."""
+    file_path = products_json_path()
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = file_path + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def scrape_store_json(url):
+    """Scrape ``url`` and return the product JSON embedded in the page."""
+    with span("storefront.scrape", url=url):
+        page = storefront_session().get(url, timeout=storefront_timeout(), stream=True)
+        page.raise_for_status()
+        return extract_from_response(page)
+
+
+def store_payload(data):
+    """The first key's ``b`` object of a scraped product JSON blob."""
+    with span("storefront.parse"):
+        b_value = JsonStream(io.StringIO(data)).read_value((0, "b"))
+    return b_value if isinstance(b_value, dict) else {}
+
+
+def fetch_store_payload(url):
+    """Scrape ``url``, save its product JSON and return the first key's ``b``."""
+    try:
+        data = scrape_store_json(url)
+        # Saved as-is; readers stream it instead of loading it whole.
+        save_products_json(data)
+        return store_payload(data)
+
+    except Exception as e:
+        raise Exception(f"Failed to fetch URL: {str(e)}")
+
+
+def sync_store_from_url(user, store_url):
+    """Scrape ``store_url``, get or create the user's Store for it and sync its products.
+
+    The products are streamed from the page just scraped, never from the
+    shared downloads/products.json, which a concurrent sync may overwrite.
+    """
+    try:
+        data = scrape_store_json(store_url)
+        product_data = store_payload(data)
+    except Exception as e:
+        raise Exception(f"Failed to fetch URL: {str(e)}")
+
+    name = product_data.get("title", "Untitled Store")
+    store, created = Store.objects.get_or_create(
+        user=user,
+        url=store_url,
+        name=name
+    )
+    products = JsonStream(io.StringIO(data)).iter_array((PRODUCTS_KEY, "b", "data"))
+    result = ProductSyncService(store).run(products)
+
+    message = "Store fetched and created" if created else "Store already exists"
+    return {
+        "message": message, "store_id": store.id, "products": product_data,
+        "synced_at": store.synced_at, **result.as_dict(),
+    }
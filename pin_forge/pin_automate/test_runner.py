@@ -0,0 +1,34 @@
+"""Test runner that keeps the suite's files out of the source tree.
+
+The response cache is file-based and the image cache and rendered pins
+live under ``BASE_DIR``, so a test run would otherwise leave (and reuse)
+``cache/`` and ``media/`` in the checkout. The runner swaps in local-memory
+caches and a scratch directory before the test databases are created,
+since creating them already instantiates every configured cache.
+"""
+
+import os
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class SandboxedTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._sandbox = tempfile.TemporaryDirectory()
+        self._settings = override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "responses": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "responses"},
+            },
+            IMAGE_CACHE={"DIRECTORY": os.path.join(self._sandbox.name, "images")},
+            MEDIA_ROOT=os.path.join(self._sandbox.name, "media"),
+        )
+        self._settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings.disable()
+        self._sandbox.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1660 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+
+from . import instrumentation
+from .benchmarks import storefront_page as saved_storefront, synthetic_products
+from .generation.content_cache import ContentCache
+from .generation.fake_model import FakeModel
+from .generation.image_cache import ImageCache, ImageFetchError
+from .generation.imaging import pillow_available, render_pin
+from .generation.pinGeneration import generate_pin_content, generate_pin_content_batch
+from .generation.pipeline import PinGenerationPipeline
+from .generation.renderer import PinRenderer
+from .jobs import HANDLERS, claim_next, enqueue, requeue_stale, run_job
+from .models import GeneratedPin, Job, PinTemplate, PinterestAuth, Product, PublishBucket, Store, Variant
+from .services import catalog_import_service, pin_service, pinterest_client, product_sync_service
+from .pagination import KeysetPagination
+from .services.bulk_publisher import BulkPublisher
+from .services.catalog_import_service import CatalogImportService, generate_variants
+from .services.option_matrix import VariantMatrix
+from .services.pin_service import save_generated_pins
+from .services.pin_publishing import idempotency_key, reconcile_publishing
+from .services.product_feed import JsonStream
+from .services.product_sync_service import ProductSyncService
+from .services.publishing_scheduler import PublishScheduler
+from .services.rate_limit import TokenBucket
+from .services.script_extractor import ScriptExtractor, extract_product_json
+from .services.store_crawler import FAILED, FETCHED, NOT_MODIFIED, HostLimiter, StoreCrawler
+
+
+# ------------------------------------------------------
+# Query plans of the catalog dedup hot paths
+# ------------------------------------------------------
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class DedupQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="plans")
+        cls.store = Store.objects.create(user=cls.user, name="Plans", url="https://example.com")
+        cls.product = Product.objects.create(
+            store=cls.store, product_id="p1", title="Tee", url="https://example.com/p1", status="new"
+        )
+        cls.variant = Variant.objects.create(product=cls.product, variant_id="v1", name="Black - M")
+        cls.template = PinTemplate.objects.create(variant=cls.variant, title="t", description="d")
+
+    def assertUsesIndex(self, queryset, columns):
+        plan = queryset.explain()
+        self.assertRegex(plan, r"SEARCH \S+ USING (COVERING )?INDEX", plan)
+        self.assertIn(columns, plan)
+
+    def test_product_lookup_by_store_and_product_id(self):
+        self.assertUsesIndex(
+            Product.objects.filter(store=self.store, product_id="p1"),
+            "(store_id=? AND product_id=?)",
+        )
+
+    def test_variant_lookup_by_product_and_variant_id(self):
+        self.assertUsesIndex(
+            Variant.objects.filter(product=self.product, variant_id="v1"),
+            "(product_id=? AND variant_id=?)",
+        )
+
+    def test_template_lookup_by_variant(self):
+        self.assertUsesIndex(PinTemplate.objects.filter(variant=self.variant), "(variant_id=?)")
+
+    def test_generated_pin_lookup_by_template(self):
+        self.assertUsesIndex(GeneratedPin.objects.filter(pin_template=self.template), "(pin_template_id=?)")
+
+    def test_store_lookup_by_user_and_name(self):
+        self.assertUsesIndex(
+            Store.objects.filter(user=self.user, name="Plans"),
+            "(user_id=? AND name=?)",
+        )
+
+    def test_due_pins_lookup_by_status_and_schedule(self):
+        self.assertUsesIndex(
+            GeneratedPin.objects.filter(status="queued", scheduled_at__lte=timezone.now()),
+            "(status=? AND scheduled_at<?)",
+        )
+
+    def test_duplicate_variants_are_ignored(self):
+        Variant.objects.bulk_create(
+            [Variant(product=self.product, variant_id="v1", name="Black - M")], ignore_conflicts=True
+        )
+        self.assertEqual(Variant.objects.filter(product=self.product).count(), 1)
+
+
+# ------------------------------------------------------
+# Query counts of the list/retrieve endpoints
+# ------------------------------------------------------
+class ReadPathQueryCountTests(TestCase):
+    """Every page costs the same number of queries, whatever its size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="reader")
+        store = Store.objects.create(user=cls.user, name="Reads", url="https://example.com")
+        for i in range(12):
+            product = Product.objects.create(
+                store=store, product_id=str(i), title=f"Tee {i}", url="https://example.com", status="new"
+            )
+            for j in range(3):
+                variant = Variant.objects.create(product=product, variant_id=str(j), name=f"Variant {j}")
+                template = PinTemplate.objects.create(variant=variant, title="t", description="d")
+                GeneratedPin.objects.create(
+                    pin_template=template, final_image="https://example.com/i.png", title="t", description="d"
+                )
+        GeneratedPin.objects.create(final_image="https://example.com/i.png", title="detached", description="d")
+        cls.product = product
+        cls.template = template
+        cls.pin = GeneratedPin.objects.filter(pin_template=template).get()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertQueries(self, num, url):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def next_page(self, response):
+        return response.data["next"].replace("http://testserver", "")
+
+    def test_product_list(self):
+        # products with their store + prefetched variants; no COUNT(*)
+        response = self.assertQueries(2, "/api/products/?expand=all")
+        self.assertQueries(2, self.next_page(response))
+
+    def test_product_list_compact(self):
+        response = self.assertQueries(1, "/api/products/")
+        self.assertEqual(set(response.data["results"][0]), {"id", "title", "status", "thumbnail", "created_at"})
+        response = self.assertQueries(1, "/api/products/?fields=id,store_id")
+        self.assertEqual(set(response.data["results"][0]), {"id", "store_id", "created_at"})
+
+    def test_product_detail(self):
+        response = self.assertQueries(2, f"/api/products/{self.product.id}/")
+        self.assertEqual(len(response.data["variants"]), 3)
+        self.assertEqual(response.data["store"]["name"], "Reads")
+
+    def test_pin_template_list(self):
+        self.assertQueries(1, "/api/pintemplates/")
+        self.assertQueries(1, "/api/pintemplates/?expand=variant")
+        self.assertQueries(1, f"/api/pintemplates/{self.template.id}/")
+
+    def test_generated_pin_list(self):
+        # pins joined to their template and variant
+        response = self.assertQueries(1, "/api/generatedpins/?expand=all")
+        self.assertIsNone(response.data["results"][0]["variant"])
+        response = self.assertQueries(1, self.next_page(response))
+        self.assertIsNotNone(response.data["results"][0]["variant"])
+
+    def test_generated_pin_list_compact(self):
+        last = GeneratedPin.objects.select_related("pin_template").filter(pin_template__isnull=False).latest("id")
+        response = self.assertQueries(1, "/api/generatedpins/?fields=id,variant_id&page_size=2")
+        self.assertEqual(
+            [{"id": row["id"], "variant_id": row["variant_id"]} for row in response.data["results"]],
+            [{"id": last.id + 1, "variant_id": None}, {"id": last.id, "variant_id": last.pin_template.variant_id}],
+        )
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen = []
+        url = "/api/generatedpins/?page_size=5"
+        while url:
+            response = self.assertQueries(1, url)
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"] and self.next_page(response)
+        self.assertEqual(seen, list(GeneratedPin.objects.order_by("-created_at", "-id").values_list("id", flat=True)))
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(KeysetPagination, "max_page_size", 5):
+            response = self.client.get("/api/generatedpins/?page_size=1000")
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_store_export(self):
+        store = self.product.store
+        response = self.client.get(f"/api/stores/{store.id}/export/pins/")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 36)
+        self.assertEqual(rows[-1]["variant_id"], self.template.variant_id)
+
+        response = self.client.get(f"/api/stores/{store.id}/export/variants/?output=csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "product_id", "variant_id"])
+        self.assertEqual(len(lines), 37)
+        self.assertEqual(self.client.get(f"/api/stores/{store.id}/export/pins/?output=xml").status_code, 400)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create(username="someone-else"))
+        self.assertEqual(other.get(f"/api/stores/{store.id}/export/pins/").status_code, 404)
+
+    def test_generated_pin_detail(self):
+        response = self.assertQueries(1, f"/api/generatedpins/{self.pin.id}/")
+        self.assertEqual(response.data["pin_template"]["variant"]["id"], self.template.variant_id)
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get("/api/generatedpins/?fields=secret").status_code, 400)
+        self.assertEqual(self.client.get("/api/products/?expand=user").status_code, 400)
+
+
+# ------------------------------------------------------
+# Incremental product sync
+# ------------------------------------------------------
+class ProductSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(
+            user=User.objects.create(username="syncer"), name="Sync", url="https://example.com"
+        )
+
+    def payload(self, count=3, price=2499):
+        for i in range(count):
+            yield {
+                "id": i,
+                "title": f"Tee {i}",
+                "path": f"/tee-{i}",
+                "default_variant": {"retail_price": price},
+                "options": [
+                    {"type": "color", "items": [{"id": 1, "label": "Black", "values": ["#000"]}]},
+                    {"type": "size", "items": [{"id": 2, "label": "S"}, {"id": 3, "label": "M"}]},
+                ],
+            }
+
+    def test_unchanged_resync_writes_only_the_watermark(self):
+        ProductSyncService(self.store).run(self.payload())
+        first_sync = Store.objects.get(pk=self.store.pk).synced_at
+
+        # savepoint, products read, watermark update, release
+        with self.assertNumQueries(4):
+            result = ProductSyncService(self.store).run(self.payload())
+
+        self.assertEqual(result.unchanged_products, 3)
+        self.assertEqual(result.created_variants + result.updated_variants + result.deleted_variants, 0)
+        self.assertGreater(Store.objects.get(pk=self.store.pk).synced_at, first_sync)
+
+    def test_only_changes_invalidate_the_catalog(self):
+        with mock.patch.object(product_sync_service, "invalidate_catalog") as invalidate:
+            ProductSyncService(self.store).run(self.payload())
+            self.assertEqual(invalidate.call_count, 1)
+
+            ProductSyncService(self.store).run(self.payload())
+            self.assertEqual(invalidate.call_count, 1)
+
+            ProductSyncService(self.store).run(self.payload(count=2))
+            self.assertEqual(invalidate.call_count, 2)
+
+    def test_changes_and_removals(self):
+        ProductSyncService(self.store).run(self.payload())
+        result = ProductSyncService(self.store).run(self.payload(count=2, price=2999))
+
+        self.assertEqual((result.updated_products, result.deleted_products), (2, 1))
+        self.assertEqual((result.updated_variants, result.deleted_variants), (4, 2))
+        self.assertEqual(
+            set(Variant.objects.filter(deleted_at__isnull=True).values_list("price", flat=True)), {Decimal("29.99")}
+        )
+        self.assertIsNotNone(Product.objects.get(store=self.store, product_id="2").deleted_at)
+
+        result = ProductSyncService(self.store).run(self.payload(count=3, price=2999))
+        self.assertEqual(result.updated_products, 1)
+        self.assertFalse(Variant.objects.filter(deleted_at__isnull=False).exists())
+
+
+    def rival_inserts_first(self, module, model, make):
+        """Patch ``module.bulk_insert`` so a concurrent writer inserts the first ``model`` row just before."""
+        bulk_insert = module.bulk_insert
+
+        def insert(rows, scope, batch_size):
+            if isinstance(rows[0], model):
+                make(rows[0])
+            return bulk_insert(rows, scope, batch_size)
+
+        return mock.patch.object(module, "bulk_insert", insert)
+
+    def rival_product(self, product):
+        Product.objects.create(store=self.store, product_id=product.product_id, title="rival")
+
+    def test_rows_inserted_concurrently_are_not_counted(self):
+        with self.rival_inserts_first(product_sync_service, Product, self.rival_product):
+            result = ProductSyncService(self.store).run(self.payload())
+        self.assertEqual((result.created_products, result.skipped_products), (2, 1))
+        self.assertEqual(result.created_variants, 6)
+
+        Product.objects.all().delete()
+        with self.rival_inserts_first(catalog_import_service, Product, self.rival_product):
+            result = CatalogImportService(self.store).run(self.payload())
+        self.assertEqual((result.created_products, result.skipped_products), (2, 1))
+
+        for variant in Variant.objects.all():
+            PinTemplate.objects.create(variant=variant, title="t", description="d")
+        rival_pin = partial(GeneratedPin.objects.create, final_image="", title="rival", description="d")
+        with self.rival_inserts_first(pin_service, GeneratedPin, lambda pin: rival_pin(pin_template=pin.pin_template)):
+            self.assertEqual(save_generated_pins(self.store, board="board-1", render=False), 5)
+        self.assertEqual(GeneratedPin.objects.count(), 6)
+
+
+# ------------------------------------------------------
+# Conditional storefront crawling
+# ------------------------------------------------------
+class StorefrontHandler(BaseHTTPRequestHandler):
+    """Serves one storefront page per path, answering 304 to a matching ETag."""
+
+    pages = {}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def storefront_page(count):
+    products = [{"id": i, "title": f"Tee {i}", "path": f"/tee-{i}"} for i in range(count)]
+    blob = json.dumps({"2712286816": {"b": {"title": "Shop", "data": products}}})
+    return f"<html><body><script>window.product = {blob};</script></body></html>".encode()
+
+
+class StoreCrawlerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StorefrontHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StorefrontHandler.pages = {"/a": storefront_page(3), "/b": storefront_page(2)}
+        StorefrontHandler.requests = []
+        user = User.objects.create(username="crawler")
+        self.stores = [
+            Store.objects.create(user=user, name=path, url=self.base + path) for path in ("/a", "/b", "/missing")
+        ]
+
+    def crawl(self):
+        results = StoreCrawler(max_workers=3, min_interval=0).crawl(Store.objects.order_by("id"))
+        return {result.url.rsplit("/", 1)[-1]: result for result in results}
+
+    def test_unchanged_pages_are_not_resynced(self):
+        results = self.crawl()
+        self.assertEqual([results[key].status for key in ("a", "b", "missing")], [FETCHED, FETCHED, FAILED])
+        self.assertEqual(results["a"].sync["created_products"], 3)
+        self.assertEqual(Product.objects.filter(store=self.stores[1]).count(), 2)
+        self.assertTrue(Store.objects.get(pk=self.stores[0].pk).etag)
+
+        synced_at = Store.objects.get(pk=self.stores[0].pk).synced_at
+        StorefrontHandler.pages["/b"] = storefront_page(1)
+        results = self.crawl()
+        self.assertEqual(results["a"].status, NOT_MODIFIED)
+        self.assertIsNone(results["a"].sync)
+        self.assertEqual(Store.objects.get(pk=self.stores[0].pk).synced_at, synced_at)
+        self.assertEqual(results["b"].sync["deleted_products"], 1)
+        self.assertIn(("/a", Store.objects.get(pk=self.stores[0].pk).etag), StorefrontHandler.requests)
+
+    def test_sync_job_results_are_stored_as_json(self):
+        # the real handler; its result carries Store.synced_at, a datetime
+        enqueue("sync_store", user=self.stores[0].user, store_id=self.stores[0].pk)
+        job = run_job(claim_next("test-worker"))
+
+        self.assertEqual(job.status, Job.SUCCEEDED, job.error)
+        stored = Job.objects.get(pk=job.pk).result
+        self.assertEqual(stored["fetched"], 1)
+        synced_at = Store.objects.get(pk=self.stores[0].pk).synced_at
+        # DjangoJSONEncoder keeps milliseconds
+        synced_at = synced_at.replace(microsecond=synced_at.microsecond // 1000 * 1000)
+        self.assertEqual(parse_datetime(stored["synced_at"]), synced_at)
+
+    def test_url_sync_uses_the_page_it_scraped(self):
+        # another sync's download, left in the shared products.json
+        decoy = json.dumps({"2712286816": {"b": {"title": "Other", "data": [{"id": 99, "title": "Mug"}]}}})
+        with tempfile.TemporaryDirectory() as tmp, override_settings(BASE_DIR=tmp):
+            os.makedirs(os.path.join(tmp, "downloads"))
+            with open(os.path.join(tmp, "downloads", "products.json"), "w", encoding="utf-8") as f:
+                f.write(decoy)
+
+            user = self.stores[0].user
+            enqueue("sync_store", user=user, store_url=self.base + "/b")
+            job = run_job(claim_next("test-worker"))
+
+            with open(os.path.join(tmp, "downloads", "products.json"), encoding="utf-8") as f:
+                self.assertEqual(f.read(), decoy)
+
+        self.assertEqual(job.status, Job.SUCCEEDED, job.error)
+        self.assertEqual(job.result["created_products"], 2)
+        store = Store.objects.get(pk=job.result["store_id"])
+        self.assertEqual(sorted(store.products.values_list("product_id", flat=True)), ["0", "1"])
+
+    def test_only_the_owner_can_sync_a_store(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="someone-else"))
+        response = client.post("/api/products/sync_from_store/", {"store_id": self.stores[0].pk}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Job.objects.exists())
+
+        client.force_authenticate(self.stores[0].user)
+        response = client.post("/api/products/sync_from_store/", {"store_id": self.stores[0].pk}, format="json")
+        self.assertEqual(response.status_code, 202)
+
+    def test_host_limiter_caps_concurrency(self):
+        limiter = HostLimiter(per_host=2, min_interval=0)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fetch():
+            with limiter.slot("example.com"):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                threading.Event().wait(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=fetch) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+
+
+# ------------------------------------------------------
+# Background job queue
+# ------------------------------------------------------
+@override_settings(PIN_JOBS={"HEARTBEAT_INTERVAL": 0.02, "STALE_AFTER": 600})
+class JobQueueTests(TransactionTestCase):
+    def run_with(self, handler):
+        with mock.patch.dict(HANDLERS, {"test": handler}):
+            enqueue("test")
+            return run_job(claim_next("worker-1"))
+
+    def test_long_jobs_keep_heartbeating(self):
+        def handler(job):
+            started = Job.objects.get(pk=job.pk).heartbeat_at
+            deadline = time.monotonic() + 5
+            while Job.objects.get(pk=job.pk).heartbeat_at == started and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return {"beat": Job.objects.get(pk=job.pk).heartbeat_at > started}
+
+        job = self.run_with(handler)
+        self.assertEqual(Job.objects.get(pk=job.pk).result, {"beat": True})
+
+    def test_superseded_run_does_not_overwrite_the_live_one(self):
+        def handler(job):
+            # This run went quiet; the job was requeued and another worker took it.
+            Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(requeue_stale(), 1)
+            self.assertEqual(claim_next("worker-2").pk, job.pk)
+            return {"run": "first"}
+
+        job = self.run_with(handler)
+        stored = Job.objects.get(pk=job.pk)
+        self.assertEqual((stored.status, stored.worker, stored.result), (Job.RUNNING, "worker-2", None))
+
+
+# ------------------------------------------------------
+# Streaming products.json
+# ------------------------------------------------------
+class JsonStreamTests(TestCase):
+    DOCUMENT = '{"skip": [1e3, "x\\"y", {"n": null}], "data": [1.5, 22, -3e-2, true, "a b", {"k": [false]}, null]}'
+
+    def test_chunk_boundaries_do_not_matter(self):
+        expected = json.loads(self.DOCUMENT)["data"]
+        for chunk_size in range(1, len(self.DOCUMENT) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                stream = JsonStream(io.StringIO(self.DOCUMENT), chunk_size=chunk_size)
+                self.assertEqual(list(stream.iter_array(("data",))), expected)
+
+    def test_scalars_at_the_end_of_the_input(self):
+        for chunk_size in (1, 2, 64):
+            self.assertEqual(JsonStream(io.StringIO("12.75"), chunk_size=chunk_size).read_value(), 12.75)
+            self.assertEqual(list(JsonStream(io.StringIO("[1.5, 22, 3]"), chunk_size).iter_array()), [1.5, 22, 3])
+
+
+# ------------------------------------------------------
+# Product JSON extraction from storefront pages
+# ------------------------------------------------------
+class ScriptExtractorTests(TestCase):
+    FIXTURES = ("ng_state.html", "server_app_state.html", "inline_state.html")
+
+    def products(self, blob):
+        return json.loads(blob)["2712286816"]["b"]["data"]
+
+    def test_saved_storefronts(self):
+        for name in self.FIXTURES:
+            with self.subTest(name):
+                products = self.products(extract_product_json(saved_storefront(name)))
+                self.assertEqual([product["id"] for product in products], [41000, 41001, 41002])
+                self.assertIn("</b>", products[0]["description"])
+
+    def test_chunk_boundaries_do_not_matter(self):
+        page = saved_storefront("server_app_state.html", products=5)
+        expected = extract_product_json(page)
+        extractor = ScriptExtractor()
+        for start in range(0, len(page), 7):
+            extractor.feed(page[start:start + 7])
+        self.assertEqual(extractor.close(), expected)
+        self.assertEqual(len(self.products(expected)), 8)
+
+    def test_fallbacks(self):
+        page = saved_storefront("ng_state.html").replace("2712286816", "1111111111")
+        self.assertIn("1111111111", json.loads(extract_product_json(page)))
+        with self.assertRaises(ValueError):
+            extract_product_json("<html><script>var product = 1;</script><p>{}</p></html>")
+
+
+# ------------------------------------------------------
+# Option matrices
+# ------------------------------------------------------
+class VariantMatrixTests(TestCase):
+    product = {
+        "options": [
+            {"type": "material", "items": [{"id": 7, "label": "Cotton"}, {"id": 8, "label": "Linen"}]},
+            {"type": "size", "items": [{"id": 2, "label": "S"}, {"id": 3, "label": "M"}]},
+            {"type": "color", "items": [{"id": 1, "label": "Black", "values": ["#000"]}]},
+        ],
+    }
+
+    def test_axes_keep_color_size_first(self):
+        matrix = VariantMatrix.from_product(self.product, 24.99)
+        self.assertEqual(matrix.variant_ids, ["1-2-7", "1-2-8", "1-3-7", "1-3-8"])
+        self.assertEqual(matrix.names[1], "Black-S-Linen")
+        self.assertEqual(matrix.attributes[3], {"color": "Black", "hex": "#000", "size": "M", "material": "Linen"})
+
+    def test_colour_by_size_rows_are_unchanged(self):
+        colors = [{"id": 1, "label": "Black", "hex": "#000"}]
+        sizes = [{"id": 2, "label": "S"}]
+        self.assertEqual(generate_variants(colors, sizes, 24.99), [{
+            "name": "Black-S",
+            "variant_id": "1-2",
+            "price": 24.99,
+            "attributes": {"color": "Black", "hex": "#000", "size": "S"},
+        }])
+        self.assertEqual(generate_variants(colors, [], 24.99), [])
+
+    def test_variants_feed_bulk_create(self):
+        store = Store.objects.create(user=User.objects.create(username="matrix"), name="M", url="https://example.com")
+        product = Product.objects.create(store=store, product_id="p", title="Tee", url="https://example.com/p")
+        matrix = VariantMatrix.from_product(self.product, 24.99)
+
+        Variant.objects.bulk_create(matrix.variants(product.pk, skip={"1-2-7"}, status="new"))
+        saved = Variant.objects.filter(product=product).order_by("variant_id")
+        self.assertEqual([variant.variant_id for variant in saved], ["1-2-8", "1-3-7", "1-3-8"])
+        self.assertEqual(saved[0].price, Decimal("24.99"))
+        self.assertIsNotNone(saved[0].created_at)
+
+
+# ------------------------------------------------------
+# Template generation against the local FakeModel
+# ------------------------------------------------------
+class PinGenerationPipelineTests(TestCase):
+    def setUp(self):
+        store = Store.objects.create(user=User.objects.create(username="generator"), name="Gen")
+        self.product = Product.objects.create(store=store, product_id="p", title="Tee", description="Soft")
+        colors = ["Black", "White", "Red", "Blue", "Green"]
+        self.variants = [
+            Variant.objects.create(product=self.product, variant_id=color, name=color, attributes={"color": color})
+            for color in colors
+        ]
+        self.model = FakeModel()
+        self.progress = []
+
+    def pipeline(self, generate=None, generate_batch=None, **kwargs):
+        options = {"max_workers": 2, "backoff": 0, "cache": False, "progress": lambda *args: self.progress.append(args)}
+        options.update(kwargs)
+        return PinGenerationPipeline(
+            generate=generate or partial(generate_pin_content, model=self.model),
+            generate_batch=generate_batch or partial(generate_pin_content_batch, model=self.model),
+            **options,
+        )
+
+    def run_pipeline(self, pipeline):
+        return pipeline.run(Variant.objects.filter(pin_templates__isnull=True).select_related("product"))
+
+    def test_batches(self):
+        result = self.run_pipeline(self.pipeline(batch_size=2, flush_size=2))
+
+        self.assertEqual((result.created, result.failed, result.model_calls), (5, 0, 3))
+        self.assertEqual(self.model.calls, 3)
+        self.assertEqual(set(PinTemplate.objects.values_list("title", flat=True)), {"Tee | Shop the look"})
+        self.assertEqual(self.progress[-1], (5, 5))
+
+    def test_items_missing_from_a_batch_reply_fall_back_to_single_calls(self):
+        def drop_the_second(items, timeout=None):
+            outcomes = generate_pin_content_batch(items, model=self.model, timeout=timeout)
+            outcomes[1] = None
+            return outcomes
+
+        result = self.run_pipeline(self.pipeline(batch_size=5, generate_batch=drop_the_second))
+        self.assertEqual((result.created, result.batch_fallbacks, result.model_calls), (5, 1, 2))
+
+    def test_retries(self):
+        failures = {"White": 2, "Red": 5}
+
+        def flaky(product_name, attributes, description, timeout=None):
+            if failures.get(attributes["color"], 0):
+                failures[attributes["color"]] -= 1
+                raise TimeoutError("model timed out")
+            return generate_pin_content(product_name, attributes, description, model=self.model, timeout=timeout)
+
+        result = self.run_pipeline(self.pipeline(generate=flaky, retries=2))
+        self.assertEqual((result.created, result.failed), (4, 1))
+        self.assertEqual(result.errors, [{"variant_id": "Red", "error": "model timed out"}])
+        self.assertEqual(self.progress[-1], (5, 5))
+
+    def test_content_cache(self):
+        Variant.objects.create(
+            product=self.product, variant_id="Black-L", name="Black L", attributes={"color": "Black", "size": "L"}
+        )
+        result = self.run_pipeline(self.pipeline(cache=ContentCache()))
+        # sizes of one color share a model call
+        self.assertEqual((result.created, result.model_calls, result.cache_hits), (6, 5, 0))
+
+        PinTemplate.objects.all().delete()
+        result = self.run_pipeline(self.pipeline(cache=ContentCache()))
+        self.assertEqual((result.created, result.model_calls, result.cache_hits), (6, 0, 6))
+
+    def test_templates_created_by_a_concurrent_run_are_not_counted(self):
+        variants = list(Variant.objects.select_related("product"))
+        PinTemplate.objects.create(variant=self.variants[0], title="theirs", description="d")
+
+        result = self.pipeline().run(variants)
+        self.assertEqual((result.created, result.skipped), (4, 1))
+        self.assertEqual(PinTemplate.objects.get(variant=self.variants[0]).title, "theirs")
+        self.assertEqual(self.progress[-1], (5, 5))
+
+
+# ------------------------------------------------------
+# Bulk publishing against a local Pinterest v5 stub
+# ------------------------------------------------------
+class PinterestStubHandler(BaseHTTPRequestHandler):
+    """POST /v5/pins: 201 with an id, 429 for "slow down", 400 without a board.
+
+    "no answer" pins are created but answered with a 502; GET
+    /v5/boards/<id>/pins lists what was created, notes included, at most
+    ``page_limit`` per page.
+    """
+
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    created = []
+    page_limit = 100
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            threading.Event().wait(0.02)
+            if self.path != "/v5/pins" or self.headers.get("Authorization") != "Bearer stub-token":
+                self.reply(401, {"message": "Unauthorized"})
+            elif body["title"] == "slow down":
+                self.reply(429, {"message": "Too many requests"}, {"Retry-After": "120"})
+            elif not body.get("board_id"):
+                self.reply(400, {"message": "board_id is required"})
+            else:
+                with cls.lock:
+                    cls.created.append(body)
+                    pin_id = f"stub-{len(cls.created)}"
+                if body["title"] == "no answer":
+                    self.reply(502, {"message": "Bad gateway"})
+                else:
+                    self.reply(201, {"id": pin_id, "board_id": body["board_id"]})
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        board = url.path.split("/")[3]
+        query = parse_qs(url.query)
+        items = [
+            {"id": f"stub-{i}", "note": body.get("note")}
+            for i, body in enumerate(type(self).created, 1) if body["board_id"] == board
+        ]
+        start = int(query.get("bookmark", ["0"])[0])
+        end = start + min(int(query.get("page_size", ["25"])[0]), type(self).page_limit)
+        self.reply(200, {"items": items[start:end], "bookmark": str(end) if end < len(items) else None})
+
+    def reply(self, status, data, headers=()):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BulkPublishTests(TestCase):
+    url = "/api/generatedpins/pinterest/bulkPublish/?sync=true"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), PinterestStubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = override_settings(PINTEREST_API_BASE_URL=f"http://127.0.0.1:{cls.server.server_port}/v5/")
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        PinterestStubHandler.peak = 0
+        PinterestStubHandler.created = []
+        self.user = User.objects.create(username="publisher")
+        PinterestAuth.objects.create(
+            user=self.user, access_token="stub-token", expires_at=timezone.now() + timedelta(days=30)
+        )
+        pinterest_client.forget_user_token(self.user)
+
+        store = Store.objects.create(user=self.user, name="Pins", url="https://example.com")
+        product = Product.objects.create(store=store, product_id="p", title="Tee", url="https://example.com/p")
+        self.pins = []
+        for i, title in enumerate(["one", "two", "three", "four", "slow down"]):
+            variant = Variant.objects.create(product=product, variant_id=str(i), name=title)
+            template = PinTemplate.objects.create(variant=variant, title=title, description="d")
+            self.pins.append(GeneratedPin.objects.create(
+                pin_template=template, final_image="https://example.com/i.png", title=title,
+                description="d", board="board-1", status="draft",
+            ))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_per_item_results(self):
+        foreign = GeneratedPin.objects.create(final_image="https://example.com/i.png", title="x", description="d")
+        adhoc = {"board_id": "board-2", "title": "ad hoc", "media_url": "https://example.com/a.png"}
+        items = [pin.id for pin in self.pins[:4]] + [self.pins[0].id, foreign.id, adhoc, {"title": "incomplete"}]
+
+        # pins, claim, claimed ids, token, then a stamp and a result per stored pin
+        with self.assertNumQueries(4 + 2 * 4):
+            response = self.client.post(self.url, {"pins": items, "concurrency": 3}, format="json")
+
+        self.assertEqual(response.status_code, 200, response.data)
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, ["posted"] * 4 + ["skipped", "not_found", "posted", "failed"])
+        self.assertEqual(response.data["counts"], {"posted": 5, "skipped": 1, "not_found": 1, "failed": 1})
+        self.assertEqual(PinterestStubHandler.peak, 3)
+
+        for pin in GeneratedPin.objects.filter(pk__in=[pin.id for pin in self.pins[:4]]):
+            self.assertEqual(pin.status, "posted")
+            self.assertTrue(pin.pinterest_pin_id.startswith("stub-"))
+            self.assertIsNotNone(pin.posted_at)
+
+        # already posted pins are not sent again
+        response = self.client.post(self.url, {"pins": [self.pins[0].id]}, format="json")
+        self.assertEqual(response.data["results"][0]["status"], "skipped")
+        self.assertEqual(len(PinterestStubHandler.created), 5)
+
+    def test_rate_limit_defers_to_the_scheduler(self):
+        adhoc = {"board_id": "board-2", "title": "ad hoc", "media_url": "https://example.com/a.png"}
+        items = [self.pins[4].id, self.pins[0].id, adhoc]
+        response = self.client.post(self.url, {"pins": items, "concurrency": 1}, format="json")
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results], ["deferred", "deferred", "failed"])
+        self.assertEqual(len(PinterestStubHandler.created), 0)
+
+        for pin in GeneratedPin.objects.filter(pk__in=items[:2]):
+            self.assertEqual(pin.status, "queued")
+            self.assertGreater(pin.scheduled_at, timezone.now() + timedelta(seconds=60))
+        self.assertEqual(results[1]["scheduled_at"], GeneratedPin.objects.get(pk=items[1]).scheduled_at)
+
+        # nothing would ever retry the payload, so it is not reported as deferred
+        self.assertEqual(results[2]["error"], "Rate limited by Pinterest, not sent")
+        self.assertNotIn("scheduled_at", results[2])
+
+    def test_uncertain_post_is_reconciled_not_reposted(self):
+        pin = self.pins[3]
+        GeneratedPin.objects.filter(pk=pin.pk).update(title="no answer")
+        response = self.client.post(self.url, {"pins": [pin.id]}, format="json")
+        self.assertEqual(response.data["results"][0]["status"], "uncertain")
+        self.assertEqual(GeneratedPin.objects.get(pk=pin.pk).status, "publishing")
+
+        # Neither a retry nor the scheduler posts it again...
+        response = self.client.post(self.url, {"pins": [pin.id]}, format="json")
+        self.assertEqual(response.data["results"][0]["status"], "skipped")
+        PublishScheduler().run_once()
+        self.assertEqual(len(PinterestStubHandler.created), 1)
+        self.assertEqual(PinterestStubHandler.created[0]["note"], f"pin_forge:{idempotency_key(pin)}")
+
+        # ...reconciliation finds it on the board by its key instead.
+        lost = self.pins[2]
+        GeneratedPin.objects.filter(pk=lost.pk).update(
+            status="publishing", idempotency_key=idempotency_key(lost),
+            publish_started_at=timezone.now() - timedelta(minutes=10),
+        )
+        stats = reconcile_publishing(older_than=0)
+        self.assertEqual(stats, {"reconciled": 1, "requeued": 1, "abandoned": 0, "unresolved": 0})
+
+        pin = GeneratedPin.objects.get(pk=pin.pk)
+        self.assertEqual((pin.status, pin.pinterest_pin_id), ("posted", "stub-1"))
+        self.assertEqual(GeneratedPin.objects.get(pk=lost.pk).status, "queued")
+        self.assertEqual(len(PinterestStubHandler.created), 1)
+
+    def test_pins_beyond_the_searched_pages_stay_unresolved(self):
+        PinterestStubHandler.page_limit = 2
+        self.addCleanup(setattr, PinterestStubHandler, "page_limit", 100)
+        # four older pins come first on the board
+        PinterestStubHandler.created = [{"board_id": "board-1", "note": None}] * 4
+
+        pin = self.pins[3]
+        GeneratedPin.objects.filter(pk=pin.pk).update(title="no answer")
+        self.client.post(self.url, {"pins": [pin.id]}, format="json")
+
+        with override_settings(PINTEREST_PUBLISHING={"RECONCILE_PAGES": 2}):
+            stats = reconcile_publishing(older_than=0)
+        self.assertEqual(stats, {"reconciled": 0, "requeued": 0, "abandoned": 0, "unresolved": 1})
+        self.assertEqual(GeneratedPin.objects.get(pk=pin.pk).status, "publishing")
+
+        with override_settings(PINTEREST_PUBLISHING={"RECONCILE_PAGES": 3}):
+            stats = reconcile_publishing(older_than=0)
+        self.assertEqual(stats["reconciled"], 1)
+        self.assertEqual(GeneratedPin.objects.get(pk=pin.pk).pinterest_pin_id, "stub-5")
+        self.assertEqual(len(PinterestStubHandler.created), 5)
+
+    def test_reconciliation_during_a_long_batch_does_not_double_post(self):
+        start = BulkPublisher._start
+        scheduler = PublishScheduler()
+
+        def start_after_reconcile_after(publisher, pin):
+            if pin.pk == self.pins[1].pk:
+                # The batch has now run past RECONCILE_AFTER: the pin still
+                # waiting here is requeued, and the scheduler posts it.
+                later = timezone.now() + timedelta(seconds=301)
+                self.assertEqual(reconcile_publishing(now=later)["requeued"], 1)
+                GeneratedPin.objects.filter(pk=pin.pk).update(scheduled_at=None)  # due right away
+                self.assertEqual(scheduler.publish(scheduler.claim(pin.pk)), "posted")
+            return start(publisher, pin)
+
+        with mock.patch.object(BulkPublisher, "_start", start_after_reconcile_after):
+            response = self.client.post(
+                self.url, {"pins": [self.pins[0].id, self.pins[1].id], "concurrency": 1}, format="json"
+            )
+
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, ["posted", "skipped"])
+        self.assertEqual(len(PinterestStubHandler.created), 2)
+        pin = GeneratedPin.objects.get(pk=self.pins[1].pk)
+        self.assertEqual((pin.status, pin.pinterest_pin_id), ("posted", "stub-2"))
+
+    def test_late_results_do_not_overwrite_a_requeued_pin(self):
+        record = BulkPublisher._record
+
+        def reconcile_then_record(publisher, entry, attempt):
+            GeneratedPin.objects.filter(pk=self.pins[0].pk).update(status="queued", publish_started_at=None)
+            record(publisher, entry, attempt)
+
+        with mock.patch.object(BulkPublisher, "_record", reconcile_then_record):
+            response = self.client.post(self.url, {"pins": [self.pins[0].id]}, format="json")
+
+        self.assertEqual(response.data["results"][0]["status"], "posted")
+        self.assertEqual(GeneratedPin.objects.get(pk=self.pins[0].pk).status, "queued")
+
+    def test_concurrent_claims_post_once(self):
+        GeneratedPin.objects.filter(pk=self.pins[0].pk).update(status="queued")
+        first, second = PublishScheduler(), PublishScheduler()
+
+        pin = first.claim(self.pins[0].pk)
+        self.assertIsNotNone(pin)
+        self.assertIsNone(second.claim(self.pins[0].pk))
+        response = self.client.post(self.url, {"pins": [self.pins[0].id]}, format="json")
+        self.assertEqual(response.data["results"][0]["error"], "Already being published")
+
+        self.assertEqual(first.publish(pin), "posted")
+        self.assertEqual(second.run_once()["posted"], 0)
+        self.assertEqual(len(PinterestStubHandler.created), 1)
+        self.assertEqual(GeneratedPin.objects.get(pk=pin.pk).status, "posted")
+
+    def test_invalid_body(self):
+        self.assertEqual(self.client.post(self.url, {"pins": []}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"pins": [1], "concurrency": "x"}, format="json").status_code, 400)
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.bucket = TokenBucket(rate=2, capacity=3, clock=lambda: self.now)
+
+    def test_bursts_then_refills_at_rate(self):
+        self.assertEqual([self.bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(self.bucket.wait_time(), 0.5)
+        self.now += 0.5
+        self.assertTrue(self.bucket.try_acquire())
+        self.now += 60
+        self.assertAlmostEqual(self.bucket.wait_time(3), 0)
+        self.assertAlmostEqual(self.bucket.wait_time(4), 0.5)  # never holds more than capacity
+
+    def test_pause_empties_and_blocks(self):
+        self.bucket.pause(10)
+        self.now += 9
+        self.assertFalse(self.bucket.try_acquire())
+        self.assertAlmostEqual(self.bucket.wait_time(), 1)
+        self.now += 1
+        self.assertTrue(self.bucket.try_acquire())
+
+
+def pinterest_response(status, data=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(data or {}).encode()
+    response.headers.update(headers or {})
+    return response
+
+
+class PublishSchedulerTests(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.posts = []
+        self.rate_limited = set()
+
+    def queue_pins(self, username, count):
+        user = User.objects.create(username=username)
+        store = Store.objects.create(user=user, name=username, url="https://example.com")
+        product = Product.objects.create(store=store, product_id="p", title="Tee", url="https://example.com/p")
+        pins = []
+        for i in range(count):
+            variant = Variant.objects.create(product=product, variant_id=str(i), name=str(i))
+            template = PinTemplate.objects.create(variant=variant, title=str(i), description="d")
+            pins.append(GeneratedPin.objects.create(
+                pin_template=template, final_image=f"https://example.com/{i}.png", title=f"{username} {i}",
+                description="d", board="board-1", status="queued",
+                scheduled_at=timezone.now() - timedelta(hours=1, seconds=-i),
+            ))
+        return user
+
+    def request(self, user, method, path, data=None):
+        if user.username in self.rate_limited:
+            return pinterest_response(429, {"message": "Too many requests"}, {"Retry-After": "120"})
+        self.posts.append(user.username)
+        return pinterest_response(201, {"id": f"stub-{len(self.posts)}"})
+
+    def scheduler(self, **kwargs):
+        return PublishScheduler(rate_per_minute=10, burst=5, request=self.request, clock=lambda: self.now, **kwargs)
+
+    def test_per_user_rate(self):
+        self.queue_pins("busy", 8)
+        scheduler = self.scheduler()
+
+        self.assertEqual(scheduler.run_once()["posted"], 5)  # the burst
+        self.assertEqual(scheduler.run_once()["posted"], 0)
+        self.now += 6  # 10 per minute
+        self.assertEqual(scheduler.run_once()["posted"], 1)
+        self.now += 60
+        self.assertEqual(scheduler.run_once()["posted"], 2)
+        self.assertEqual(GeneratedPin.objects.filter(status="posted").count(), 8)
+
+    def test_429_pauses_that_user_only(self):
+        limited = self.queue_pins("limited", 3)
+        self.queue_pins("other", 2)
+        self.rate_limited.add("limited")
+        scheduler = self.scheduler()
+
+        stats = scheduler.run_once()
+        self.assertEqual((stats["deferred"], stats["posted"], stats["throttled"]), (1, 2, 2))
+        self.assertEqual(self.posts, ["other", "other"])
+        self.assertAlmostEqual(scheduler.bucket_for(limited.id).wait_time(), 120)
+
+        deferred = GeneratedPin.objects.get(pin_template__variant__product__store__user=limited, title="limited 0")
+        self.assertEqual(deferred.status, "queued")
+        self.assertGreater(deferred.scheduled_at, timezone.now() + timedelta(seconds=100))
+
+        # still paused: not even picked as a candidate
+        self.rate_limited.clear()
+        self.now += 60
+        self.assertEqual(scheduler.run_once()["throttled"], 0)
+        self.now += 60
+        self.assertEqual(scheduler.run_once()["posted"], 2)
+
+    def test_a_backlog_does_not_starve_other_users(self):
+        self.queue_pins("backlog", 60)  # all due before the others'
+        self.queue_pins("a", 2)
+        self.queue_pins("b", 2)
+        scheduler = self.scheduler(batch_size=10)
+
+        scheduler.run_once()
+        self.assertEqual(sorted(self.posts), ["a", "a", "b", "b"] + ["backlog"] * 5)
+        # users take turns
+        self.assertEqual(self.posts[:3], ["backlog", "a", "b"])
+
+    def test_lost_claims_cost_no_token(self):
+        user = self.queue_pins("busy", 3)
+        scheduler, rival = self.scheduler(), self.scheduler()
+        claim = scheduler.claim
+        lost = []
+
+        def lose_the_first(pin_id):
+            if not lost:
+                lost.append(rival.claim(pin_id))  # another scheduler gets there first
+            return claim(pin_id)
+
+        with mock.patch.object(scheduler, "claim", lose_the_first):
+            self.assertEqual(scheduler.run_once()["posted"], 2)
+        self.assertIsNotNone(lost[0])
+        self.assertAlmostEqual(PublishBucket.objects.get(user=user).tokens, 3)
+
+    def test_schedulers_share_each_users_quota(self):
+        self.queue_pins("busy", 8)
+        first, second = self.scheduler(), self.scheduler()
+
+        self.assertEqual(first.run_once()["posted"], 5)
+        self.assertEqual(second.run_once()["posted"], 0)
+        self.now += 6
+        self.assertEqual(second.run_once()["posted"], 1)
+        self.assertEqual(first.run_once()["posted"], 0)
+
+    def test_a_token_lost_after_the_claim_requeues_the_pin(self):
+        user = self.queue_pins("busy", 1)
+        scheduler, rival = self.scheduler(), self.scheduler()
+        claim = scheduler.claim
+
+        def claim_then_lose_the_token(pin_id):
+            pin = claim(pin_id)
+            for _ in range(5):
+                rival.bucket_for(user.id).try_acquire()
+            return pin
+
+        with mock.patch.object(scheduler, "claim", claim_then_lose_the_token):
+            stats = scheduler.run_once()
+        self.assertEqual((stats["posted"], stats["throttled"]), (0, 1))
+        self.assertEqual(GeneratedPin.objects.get().status, "queued")
+        self.assertEqual(self.posts, [])
+
+
+# ------------------------------------------------------
+# Pinterest client: access tokens and the pooled session
+# ------------------------------------------------------
+class PinterestTokenTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="pinner")
+        self.auth = PinterestAuth.objects.create(
+            user=self.user, access_token="expired", refresh_token="refresh",
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        pinterest_client.forget_user_token(self.user)
+        self.addCleanup(pinterest_client.forget_user_token, self.user)
+
+    def test_expired_token_is_refreshed_once(self):
+        exchanges = []
+
+        def exchange(pa):
+            exchanges.append(pa.pk)
+            time.sleep(0.05)  # long enough for every thread to be waiting
+            pa.access_token = "fresh"
+            pa.expires_at = timezone.now() + timedelta(days=30)
+            return pa
+
+        barrier = threading.Barrier(8)
+        tokens = []
+
+        def fetch():
+            try:
+                barrier.wait()
+                tokens.append(pinterest_client.get_user_access_token(self.user.pk))
+            finally:
+                connection.close()
+
+        with mock.patch.object(pinterest_client, "_exchange_refresh_token", side_effect=exchange):
+            threads = [threading.Thread(target=fetch) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # Another process holding the expired row re-reads it.
+            pinterest_client.forget_user_token(self.user)
+            self.assertEqual(pinterest_client.refresh_pinterest_token(self.auth).access_token, "fresh")
+
+        self.assertEqual(tokens, ["fresh"] * 8)
+        self.assertEqual(exchanges, [self.auth.pk])
+
+    def test_the_exchange_holds_no_database_lock(self):
+        other = PinterestAuth.objects.create(user=User.objects.create(username="other"), access_token="a")
+        written = []
+
+        def write():
+            try:
+                written.append(PinterestAuth.objects.filter(pk=other.pk).update(access_token="b"))
+            finally:
+                connection.close()
+
+        def exchange(pa):
+            # Another writer gets through while the token request is in flight.
+            thread = threading.Thread(target=write)
+            thread.start()
+            thread.join()
+            pa.access_token = "fresh"
+            pa.expires_at = timezone.now() + timedelta(days=30)
+            return pa
+
+        with mock.patch.object(pinterest_client, "_exchange_refresh_token", side_effect=exchange):
+            self.assertEqual(pinterest_client.get_user_access_token(self.user), "fresh")
+
+        self.assertEqual(written, [1])
+        self.auth.refresh_from_db()
+        self.assertEqual((self.auth.access_token, self.auth.refreshing_until), ("fresh", None))
+
+    def test_waits_for_the_process_holding_the_lease(self):
+        PinterestAuth.objects.filter(pk=self.auth.pk).update(refreshing_until=timezone.now() + timedelta(minutes=1))
+        tokens = []
+
+        def fetch():
+            try:
+                tokens.append(pinterest_client.get_user_access_token(self.user))
+            finally:
+                connection.close()
+
+        with mock.patch.object(pinterest_client, "_exchange_refresh_token") as exchange:
+            thread = threading.Thread(target=fetch)
+            thread.start()
+            time.sleep(0.2)
+            self.assertEqual(tokens, [])
+            # The lease holder writes its token.
+            PinterestAuth.objects.filter(pk=self.auth.pk).update(
+                access_token="theirs", expires_at=timezone.now() + timedelta(days=30), refreshing_until=None,
+            )
+            thread.join()
+
+        exchange.assert_not_called()
+        self.assertEqual(tokens, ["theirs"])
+
+    def test_an_expired_lease_is_taken_over(self):
+        PinterestAuth.objects.filter(pk=self.auth.pk).update(refreshing_until=timezone.now() - timedelta(seconds=1))
+
+        def exchange(pa):
+            pa.access_token = "fresh"
+            pa.expires_at = timezone.now() + timedelta(days=30)
+            return pa
+
+        with mock.patch.object(pinterest_client, "_exchange_refresh_token", side_effect=exchange):
+            self.assertEqual(pinterest_client.get_user_access_token(self.user), "fresh")
+
+    def test_oauth_callback_drops_the_cached_token(self):
+        PinterestAuth.objects.filter(pk=self.auth.pk).update(expires_at=timezone.now() + timedelta(days=30))
+        self.assertEqual(pinterest_client.get_user_access_token(self.user), "expired")
+
+        client = self.client_class()
+        client.force_login(self.user)
+        session = client.session
+        session["pinterest_oauth_state"] = "state"
+        session.save()
+        reply = pinterest_response(200, {"access_token": "reconnected", "refresh_token": "r2", "expires_in": 3600})
+
+        with mock.patch.object(pinterest_client, "request", return_value=reply) as post:
+            response = client.get("/api/pinterest/callback/", {"code": "code", "state": "state"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(post.call_args.args[:2], ("POST", pinterest_client.TOKEN_URL))
+
+        self.assertEqual(pinterest_client.get_user_access_token(self.user), "reconnected")
+
+
+class KeepAliveStubHandler(PinterestStubHandler):
+    """The Pinterest stub over keep-alive connections; the next ``fail`` calls get a 503."""
+
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    calls = []
+    fail = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections.add(self.client_address)
+
+    def unavailable(self):
+        cls = type(self)
+        with cls.lock:
+            cls.calls.append(self.command)
+            failing = cls.fail > 0
+            cls.fail -= failing
+        if failing:
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.reply(503, {"message": "Service unavailable"})
+        return failing
+
+    def do_GET(self):
+        if not self.unavailable():
+            super().do_GET()
+
+    def do_POST(self):
+        if not self.unavailable():
+            super().do_POST()
+
+
+class PinterestSessionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveStubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = override_settings(
+            PINTEREST_API_BASE_URL=f"http://127.0.0.1:{cls.server.server_port}/v5/",
+            PINTEREST_HTTP={"RETRIES": 2, "BACKOFF": 0},
+        )
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        KeepAliveStubHandler.connections = set()
+        KeepAliveStubHandler.calls = []
+        KeepAliveStubHandler.fail = 0
+        PinterestStubHandler.created = []
+        pinterest_client.close_session()
+        self.addCleanup(pinterest_client.close_session)
+
+    def post_pin(self):
+        pin = {"board_id": "board-1", "title": "t", "media_source": {"source_type": "image_url", "url": "u"}}
+        return pinterest_client.api_request("stub-token", "POST", "pins", data=pin)
+
+    def test_connections_are_reused(self):
+        session = pinterest_client.get_session()
+        for _ in range(3):
+            self.assertEqual(pinterest_client.api_request("stub-token", "GET", "boards/board-1/pins").status_code, 200)
+            self.assertEqual(self.post_pin().status_code, 201)
+
+        self.assertIs(pinterest_client.get_session(), session)
+        self.assertEqual(len(KeepAliveStubHandler.calls), 6)
+        self.assertEqual(len(KeepAliveStubHandler.connections), 1)
+
+    def test_session_is_rebuilt_after_fork(self):
+        session = pinterest_client.get_session()
+        with mock.patch.object(pinterest_client.os, "getpid", return_value=os.getpid() + 1):
+            child = pinterest_client.get_session()
+            self.assertIsNot(child, session)
+            self.assertIs(pinterest_client.get_session(), child)
+
+    def test_only_idempotent_methods_are_retried(self):
+        KeepAliveStubHandler.fail = 2
+        response = pinterest_client.api_request("stub-token", "GET", "boards/board-1/pins")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(KeepAliveStubHandler.calls, ["GET"] * 3)
+
+        # A 503 may come after the pin was created: never post it again.
+        KeepAliveStubHandler.calls = []
+        KeepAliveStubHandler.fail = 1
+        self.assertEqual(self.post_pin().status_code, 503)
+        self.assertEqual(KeepAliveStubHandler.calls, ["POST"])
+        self.assertEqual(PinterestStubHandler.created, [])
+
+
+# ------------------------------------------------------
+# Pin creative rendering and its content-addressed cache
+# ------------------------------------------------------
+def jpeg(width, height, color=(180, 90, 40)):
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, "JPEG")
+    return out.getvalue()
+
+
+@skipUnless(pillow_available(), "rendering needs Pillow")
+class PinRendererTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, MEDIA_URL="/media/")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.fetched = []
+        user = User.objects.create(username="renderer")
+        self.store = Store.objects.create(user=user, name="Render", url="https://example.com")
+        product = Product.objects.create(store=self.store, product_id="p", title="Tee", url="https://example.com/p")
+        self.templates = []
+        for i, title in enumerate(["Cozy tee", "Cozy tee", "Summer tee"]):
+            variant = Variant.objects.create(
+                product=product, variant_id=str(i), name=title, image="https://cdn.example.com/tee.jpg"
+            )
+            self.templates.append(PinTemplate.objects.create(
+                variant=variant, title=title, description="Soft cotton, relaxed fit. " * 20
+            ))
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        return jpeg(800, 600)
+
+    def test_render_is_2_by_3(self):
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(render_pin(jpeg(300, 900), "A " * 200, "text", 500, 750)))
+        self.assertEqual((image.format, image.size), ("JPEG", (500, 750)))
+
+    def test_unchanged_templates_hit_the_cache(self):
+        result = PinRenderer(max_workers=1, fetch=self.fetch).render(self.templates)
+        self.assertEqual((result.rendered, result.cache_hits, result.failed), (3, 0, 0))
+        self.assertEqual(self.fetched, ["https://cdn.example.com/tee.jpg"])  # one download per image
+        urls = [result.urls[template.pk] for template in self.templates]
+        self.assertEqual(urls[0], urls[1])  # identical inputs share a file
+        self.assertNotEqual(urls[0], urls[2])
+        self.assertTrue(urls[0].startswith("/media/pins/"))
+
+        again = PinRenderer(max_workers=1, fetch=self.fetch).render(self.templates)
+        self.assertEqual((again.rendered, again.cache_hits), (0, 3))
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(again.urls, result.urls)
+
+        self.templates[2].title = "Winter tee"
+        changed = PinRenderer(max_workers=1, fetch=self.fetch).render(self.templates)
+        self.assertEqual((changed.rendered, changed.cache_hits), (1, 2))
+
+    def test_process_pool_and_failures(self):
+        Variant.objects.filter(pk=self.templates[1].variant_id).update(image="https://cdn.example.com/gone.jpg")
+        self.templates[1].variant.image = "https://cdn.example.com/gone.jpg"
+
+        def fetch(url):
+            if url.endswith("gone.jpg"):
+                raise OSError("404")
+            return jpeg(600, 600)
+
+        result = PinRenderer(max_workers=2, fetch=fetch).render(self.templates)
+        self.assertEqual((result.rendered, result.failed), (2, 1))
+        self.assertNotIn(self.templates[1].pk, result.urls)
+
+    @override_settings(IMAGE_CACHE={"ENABLED": False})
+    def test_saved_pins_use_the_rendered_image(self):
+        with mock.patch("pin_forge.pin_automate.generation.renderer.fetch_image", self.fetch):
+            self.assertEqual(save_generated_pins(self.store, board="board-1", render=True), 3)
+        images = set(GeneratedPin.objects.values_list("final_image", flat=True))
+        self.assertEqual(len(images), 2)
+        self.assertTrue(all(image.startswith("/media/pins/") for image in images))
+
+
+# ------------------------------------------------------
+# Source image cache against a local static file server
+# ------------------------------------------------------
+class CountingFileHandler(SimpleHTTPRequestHandler):
+    lock = threading.Lock()
+    hits = {}
+
+    def do_GET(self):
+        with type(self).lock:
+            type(self).hits[self.path] = type(self).hits.get(self.path, 0) + 1
+        threading.Event().wait(0.05)  # long enough for callers to pile up
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.files = tempfile.TemporaryDirectory()
+        for name, data in [("a.jpg", b"a" * 4000), ("b.jpg", b"b" * 4000), ("c.jpg", b"c" * 4000),
+                           ("copy-of-a.jpg", b"a" * 4000)]:
+            with open(f"{cls.files.name}/{name}", "wb") as f:
+                f.write(data)
+        cls.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(CountingFileHandler, directory=cls.files.name)
+        )
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.files.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        CountingFileHandler.hits = {}
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ImageCache(directory=directory.name, max_bytes=10_000)
+
+    def test_cached_reads_and_shared_blobs(self):
+        with self.cache.open(self.base + "a.jpg") as view:
+            self.assertEqual(view[:3], b"aaa")
+            self.assertEqual(len(view), 4000)
+        self.assertEqual(self.cache.read(self.base + "a.jpg"), b"a" * 4000)
+        self.assertEqual(CountingFileHandler.hits, {"/a.jpg": 1})
+
+        # same bytes under another URL: downloaded, but stored once
+        self.assertEqual(self.cache.path(self.base + "copy-of-a.jpg"), self.cache.path(self.base + "a.jpg"))
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+        with self.assertRaises(ImageFetchError):
+            self.cache.path(self.base + "missing.jpg")
+
+    def test_concurrent_requests_are_coalesced(self):
+        found = self.cache.fetch_many([self.base + "b.jpg"] * 6 + [self.base + "c.jpg"], max_workers=4)
+        self.assertEqual(len(found), 2)
+
+        barrier = threading.Barrier(6)
+        paths = []
+
+        def fetch():
+            barrier.wait()
+            paths.append(self.cache.path(self.base + "a.jpg"))
+
+        threads = [threading.Thread(target=fetch) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(CountingFileHandler.hits, {"/a.jpg": 1, "/b.jpg": 1, "/c.jpg": 1})
+        self.assertEqual(self.cache.stats()["coalesced"] + self.cache.stats()["hits"], 5)
+
+    def test_least_recently_used_images_are_evicted(self):
+        a, b, c = (self.base + name for name in ("a.jpg", "b.jpg", "c.jpg"))
+        path_a, path_b = self.cache.path(a), self.cache.path(b)
+        past = timezone.now().timestamp() - 60
+        os.utime(path_a, (past, past))
+        os.utime(path_b, (past + 1, past + 1))
+        self.cache.path(a)  # a is now the most recently used
+
+        self.cache.path(c)  # 12000 bytes > 10000: b goes
+        self.assertTrue(os.path.exists(path_a))
+        self.assertFalse(os.path.exists(path_b))
+        self.assertEqual(self.cache.stats()["evicted"], 1)
+
+        self.cache.path(b)
+        self.assertEqual(CountingFileHandler.hits["/b.jpg"], 2)
+
+    @skipUnless(pillow_available(), "rendering needs Pillow")
+    def test_renders_from_a_mapped_blob(self):
+        with open(f"{self.files.name}/tee.jpg", "wb") as f:
+            f.write(jpeg(400, 300))
+        path = self.cache.path(self.base + "tee.jpg")
+        self.assertEqual(render_pin(image_path=path, title="t", width=200, height=300)[:2], b"\xff\xd8")
+
+
+# ------------------------------------------------------
+# Benchmark suite
+# ------------------------------------------------------
+class BenchmarkSuiteTests(TestCase):
+    def test_endpoints_scenario_runs_at_each_scale_and_rolls_back(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.json")
+            call_command("benchmark", "endpoints", "--variants", "20", "40", "--output", path, stdout=out)
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(saved, report)
+        self.assertEqual(report["environment"]["database"], connection.vendor)
+        self.assertEqual(sorted(report["results"]["endpoints"]), ["20", "40"])
+
+        run = report["results"]["endpoints"]["40"]
+        self.assertEqual(run["storeProductfromJson"]["result"]["created_variants"], 40)
+        self.assertEqual(run["reimport"]["result"]["created_variants"], 0)
+        self.assertEqual(run["generatedPin"]["result"]["created"], 40)
+        self.assertEqual(run["savePin"]["result"]["created"], 40)
+        for step in (run["savePin"], run["list_generatedpins"]["compact"], run["list_products"]["expanded"]):
+            self.assertEqual(step["status"], 200)
+            self.assertGreater(step["queries"], 0)
+            self.assertIn("peak_mb", step)
+        self.assertFalse(Store.objects.exists())
+
+# ------------------------------------------------------
+# Spans, request metrics and the Prometheus endpoint
+# ------------------------------------------------------
+class OTLPCollectorHandler(BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        type(self).received.append((self.path, self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.REGISTRY.reset()
+        self.user = User.objects.create(username="observer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_spans_record_durations_and_errors(self):
+        @instrumentation.span("test.decorated")
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        with self.assertRaises(ValueError), instrumentation.span("test.block"):
+            raise ValueError("boom")
+
+        registry = instrumentation.REGISTRY
+        self.assertEqual(registry.value("pin_forge_span_seconds", span="test.decorated"), 1)
+        self.assertEqual(registry.value("pin_forge_span_errors_total", span="test.block"), 1)
+        text = registry.render()
+        self.assertIn('pin_forge_span_seconds_bucket{span="test.decorated",le="+Inf"} 1', text)
+        self.assertIn('pin_forge_span_seconds_count{span="test.block"} 1', text)
+
+    def test_requests_report_query_counts(self):
+        Store.objects.create(user=self.user, name="Observed", url="https://example.com")
+        response = self.client.get("/api/stores/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+        registry = instrumentation.REGISTRY
+        self.assertEqual(
+            registry.value("pin_forge_http_requests_total", view="store-list", method="GET", status="200"), 1
+        )
+        self.assertEqual(registry.value("pin_forge_http_request_queries", view="store-list"), 1)
+
+        metrics = self.client.get("/metrics/")
+        self.assertEqual(metrics["Content-Type"], instrumentation.CONTENT_TYPE)
+        self.assertIn('pin_forge_http_requests_total{method="GET",status="200",view="store-list"} 1', metrics.content.decode())
+
+        with override_settings(INSTRUMENTATION={"METRICS_TOKEN": "s3cret"}):
+            self.assertEqual(self.client.get("/metrics/").status_code, 401)
+            self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    @skipUnless(instrumentation.otlp_available(), "OTLP export needs the OpenTelemetry SDK")
+    def test_spans_are_exported_over_otlp(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), OTLPCollectorHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        endpoint = f"http://127.0.0.1:{server.server_port}/v1/traces"
+        with override_settings(INSTRUMENTATION={"OTLP_ENDPOINT": endpoint}), \
+                mock.patch.multiple(instrumentation, _provider=None, _tracer=None, _tracer_pid=None):
+            with instrumentation.span("test.exported", store_id=7):
+                pass
+            self.assertTrue(instrumentation.flush_spans())
+            instrumentation._provider.shutdown()
+
+        self.assertEqual([path for path, _ in OTLPCollectorHandler.received], ["/v1/traces"])
+        self.assertIn(b"test.exported", OTLPCollectorHandler.received[0][1])
+
+
+# ------------------------------------------------------
+# Cached catalog reads
+# ------------------------------------------------------
+@override_settings(RESPONSE_CACHE={"ALIAS": "default"})
+class ResponseCacheTests(TransactionTestCase):
+    """Runs outside a transaction: responses seen inside one are never cached."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create(username="poller")
+        self.store = Store.objects.create(user=self.user, name="Print Hive", url="https://example.com")
+        self.product = Product.objects.create(
+            store=self.store, product_id="1", title="Tee", url="https://example.com/tee", status="new"
+        )
+        self.variant = Variant.objects.create(product=self.product, variant_id="1", name="Black - M")
+        self.template = PinTemplate.objects.create(variant=self.variant, title="Pin", description="d")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_are_cached_until_the_catalog_changes(self):
+        url = f"/api/products/{self.product.id}/"
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            again = self.client.get(url)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+        self.variant.name = "White - M"
+        self.variant.save()
+        with self.assertNumQueries(2):
+            changed = self.client.get(url)
+        self.assertEqual(changed.json()["variants"][0]["name"], "White - M")
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+        # a bulk import bypasses the signals
+        CatalogImportService(self.store).run(synthetic_products(1))
+        titles = [row["title"] for row in self.client.get("/api/products/").json()["results"]]
+        self.assertEqual(titles, ["Synthetic Tee 0", "Tee"])
+
+        self.template.delete()
+        self.assertEqual(self.client.get("/api/pintemplates/").json()["results"], [])
+
+    def test_entries_are_per_user(self):
+        self.client.get("/api/pintemplates/")
+        other = APIClient()
+        other.force_authenticate(User.objects.create(username="other-poller"))
+        with self.assertNumQueries(1):
+            self.assertEqual(other.get("/api/pintemplates/").status_code, 200)
+
+    def test_if_none_match_answers_not_modified(self):
+        url = f"/api/pintemplates/{self.template.id}/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        self.template.title = "New pin"
+        self.template.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "New pin")
+
+        # without the cache, the ETag still saves the body
+        with override_settings(RESPONSE_CACHE={"ENABLED": False}):
+            fresh = self.client.get(url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=fresh["ETag"]).status_code, 304)
@@ -7,7 +7,8 @@ from .views import (
     StoreViewSet,
     ProductViewSet,
     PinTemplateViewSet,
-    GeneratedPinViewSet
+    GeneratedPinViewSet,
+    JobViewSet,
 )
 
 # -----------------------------
@@ -28,6 +29,8 @@ router.register(r'products', ProductViewSet, basename='product')
 router.register(r'pintemplates', PinTemplateViewSet, basename='pintemplate')
 # generatedpin
 router.register(r'generatedpins', GeneratedPinViewSet, basename='generatedpin')
+# background jobs (status / progress)
+router.register(r'jobs', JobViewSet, basename='job')
 
 
 # -----------------------------
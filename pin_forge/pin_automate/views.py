@@ -2,10 +2,12 @@ from django.contrib.auth.models import Group, User
 from rest_framework import permissions, viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework_simplejwt.views import TokenObtainPairView
 from lxml import html
 import requests
 import json
+import logging
 import os
 import requests
 from rest_framework import viewsets
@@ -13,12 +15,17 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from django.http import JsonResponse
+from django.db.models import Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
 from django.conf import settings
 from rest_framework.permissions import IsAuthenticated
 from urllib.parse import urlencode
-from .generation.pinGeneration import generate_pin_content
-from .models import Store, Product, Variant, PinTemplate, GeneratedPin
+from .exports import CONTENT_TYPES, DATASETS, NDJSON, ExportError, export_filename, export_stream
+from .field_selection import FieldSelectionMixin
+from .jobs import HANDLERS, enqueue, jobs_setting
+from .models import Store, Product, Variant, PinTemplate, GeneratedPin, Job
+from .pagination import KeysetPagination
+from .response_cache import CachedResponseMixin
 from .serializers import (
     GroupSerializer,
     UserSerializer,
@@ -26,9 +33,23 @@ from .serializers import (
     ProductWriteSerializer,
     ProductSerializer,
     PinTemplateSerializer,
-    GeneratedPinSerializer
+    GeneratedPinSerializer,
+    JobSerializer,
 )
 from .services.product_sync_service import ProductSyncService
+from .services.catalog_import_service import (
+    extract_options,
+    generate_variants,
+)
+from .services.product_feed import (
+    PRODUCTS_KEY,
+    iter_products,
+    products_json_path,
+    read_store_title,
+)
+from .services.storefront_service import fetch_store_payload
+from .services import pinterest_client
+from .services.bulk_publisher import BulkPublishError, validate_items
 from .services.ai_service import AIContentService
 from .services.pin_service import PinGeneratorService
 
@@ -42,6 +63,9 @@ import requests
 from django.utils import timezone
 from datetime import timedelta
 from .models import PinterestAuth
+
+logger = logging.getLogger(__name__)
+
 # -----------------------------------------------------
 # Pinterst AUTH
 # -----------------------------------------------------
@@ -105,8 +129,6 @@ def pinterest_auth_callback(request):
     if not code or state != expected_state:
         return JsonResponse({"error": "Invalid or missing code/state"}, status=400)
 
-    token_url = "https://api.pinterest.com/v5/oauth/token"
-
     # Pinterest v5 requires HTTP Basic Auth for client credentials
     client_id = settings.PINTEREST_APP_ID
     client_secret = settings.PINTEREST_APP_SECRET
@@ -125,7 +147,7 @@ def pinterest_auth_callback(request):
     }
 
     try:
-        resp = requests.post(token_url, headers=headers, data=data, timeout=10)
+        resp = pinterest_client.request("POST", pinterest_client.TOKEN_URL, headers=headers, data=data)
         resp.raise_for_status()
     except requests.HTTPError:
         return JsonResponse({"error": "token exchange failed", "details": resp.text}, status=resp.status_code)
@@ -148,11 +170,53 @@ def pinterest_auth_callback(request):
             "expires_at": expires_at
         }
     )
+    pinterest_client.forget_user_token(request.user)
 
     return JsonResponse({"status": "connected", "scope": token_data.get("scope")})
 
 
 
+# -----------------------------------------------------
+# BACKGROUND JOBS
+# -----------------------------------------------------
+def run_or_enqueue(request, kind, **payload):
+    """Queue ``kind`` as a background job and return its id (HTTP 202).
+
+    ``?sync=true`` (or ``"sync": true`` in the body), or
+    ``PIN_JOBS['ASYNC'] = False``, runs the job inline instead and
+    returns its result.
+    """
+    sync = request.query_params.get("sync") or request.data.get("sync")
+    if str(sync).lower() in ("1", "true", "yes") or not jobs_setting("ASYNC"):
+        job = Job(kind=kind, user=request.user, payload=payload)
+        try:
+            return Response(HANDLERS[kind](job))
+        except Store.DoesNotExist:
+            return Response({"error": "Store not found"}, status=404)
+        except Exception as e:
+            return Response({"error": str(e)}, status=400)
+
+    job = enqueue(kind, user=request.user, **payload)
+    return Response(
+        {
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": reverse("job-detail", args=[job.id], request=request),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """GET /api/jobs/ and /api/jobs/<id>/ - status and progress of queued work."""
+    queryset = Job.objects.all().order_by("-created_at")
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by("-created_at")
+
+
 # -----------------------------------------------------
 # AUTH
 # -----------------------------------------------------
@@ -192,13 +256,66 @@ class StoreViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    # ------------------------------
+    # BULK EXPORT
+    # ------------------------------
+    @action(detail=True, methods=["get"], url_path=f"export/(?P<dataset>{'|'.join(DATASETS)})")
+    def export(self, request, pk=None, dataset=None):
+        """GET /api/stores/<id>/export/<dataset>/?output=ndjson|csv|parquet
+
+        Streams every products/variants/templates/pins row of the store.
+        ("output" rather than "format", which DRF reserves for renderers.)
+        """
+        store = self.get_object()
+        output = request.query_params.get("output", NDJSON)
+        try:
+            stream = export_stream(store, dataset, output)
+        except ExportError as e:
+            return Response({"error": str(e)}, status=400)
+
+        response = StreamingHttpResponse(stream, content_type=CONTENT_TYPES[output])
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(store, dataset, output)}"'
+        return response
+
+    # ------------------------------
+    # CRAWL
+    # ------------------------------
+    @action(detail=False, methods=["post"])
+    def crawl(self, request):
+        """POST /api/stores/crawl/ {"store_ids": [...]} (default: all of the user's stores)
+
+        Re-fetches the storefronts concurrently; unchanged pages (HTTP 304)
+        are not re-synced.
+        """
+        stores = self.get_queryset()
+        store_ids = request.data.get("store_ids")
+        if store_ids:
+            stores = stores.filter(id__in=store_ids)
+        return run_or_enqueue(request, "crawl_stores", store_ids=list(stores.values_list("id", flat=True)))
+
 
 # -----------------------------------------------------
 # PRODUCT VIEWSET
 # -----------------------------------------------------
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.prefetch_related("variants").all()
+class ProductViewSet(CachedResponseMixin, FieldSelectionMixin, viewsets.ModelViewSet):
+    # Soft-deleted (no longer on the storefront) rows are hidden.
+    queryset = (
+        Product.objects.filter(deleted_at__isnull=True)
+        .select_related("store")
+        .prefetch_related(Prefetch("variants", queryset=Variant.objects.filter(deleted_at__isnull=True)))
+        .order_by("-created_at", "-id")
+    )
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    compact_fields = {"id": "id", "title": "title", "status": "status", "thumbnail": "main_image"}
+    selectable_fields = {
+        "product_id": "product_id",
+        "store_id": "store_id",
+        "description": "description",
+        "url": "url",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
 
     def get_serializer_class(self):
         if self.request.method in ["POST", "PUT", "PATCH"]:
@@ -216,178 +333,67 @@ class ProductViewSet(viewsets.ModelViewSet):
         if not store_id and not store_url:
             return Response({"error": "store_id or store_url required"}, status=400)
 
-        try:
-            if store_url:
-                product_data = self._fetch_products_from_url(store_url)
-                # extract fields for store
-                name = product_data.get("title", "Untitled Store")
-                url = store_url
-                store, created = Store.objects.get_or_create(
-                    user = request.user,
-                    url = url,
-                    name = name
-                )
-                message = "Store fetched and created" if created else "Store already exists"
-                return Response({"message": message, "products": product_data})
-
-            store = Store.objects.get(id=store_id)
-            ProductSyncService.sync(store)
-
-            return Response({"message": "Sync started", "store_id": store_id})
+        if store_url:
+            return run_or_enqueue(request, "sync_store", store_url=store_url)
 
-        except Store.DoesNotExist:
+        if not Store.objects.filter(id=store_id, user=request.user).exists():
             return Response({"error": "Store not found"}, status=404)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=400)
+        return run_or_enqueue(request, "sync_store", store_id=store_id)
+
     # ------------------------------
     # SCRAPE PRODUCT JSON FROM URL
     # ------------------------------
     def _fetch_products_from_url(self, url):
-        try:
-            page = requests.get(url, timeout=10)
-            page.raise_for_status()
-
-            tree = html.fromstring(page.content.decode("utf8"))
-            all_scripts = tree.xpath('//script/text()')
-            # print(all_scripts)
-            for script in all_scripts:
-                # print(script)
-                if 'product' in script.lower() and '{' in script:
-                    fi = script.find('{')
-                    li = script.rfind('};')
-                    if li == -1:
-                        li = script.rfind('}')
-                    else:
-                        li += 2
-
-                    data = script[fi:li+1]
-                    product_data = json.loads(data)
-
-                    # Save JSON into downloads/products.json
-                    save_path = os.path.join(settings.BASE_DIR, "downloads")
-                    os.makedirs(save_path, exist_ok=True)
-                    file_path = os.path.join(save_path, "products.json")
-
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        json.dump(product_data, f, indent=2, ensure_ascii=False)
-
-                    first_key = list(product_data.keys())[0]
-                    return product_data[first_key].get("b", {})
-
-            raise Exception("No valid product JSON found")
-
-        except Exception as e:
-            raise Exception(f"Failed to fetch URL: {str(e)}")
+        return fetch_store_payload(url)
 
 
     # -----------------------------------------------------
     # READ JSON FROM downloads/products.json
     # -----------------------------------------------------
     def read_products_json(self):
-        file_path = os.path.join(settings.BASE_DIR, "downloads", "products.json")
-
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            first_key = list(data.keys())[0]
-
-            b_value = data[first_key].get('b', {})
-
-                # Ensure b_value is a dict with 'data'
-            if isinstance(b_value, dict) and 'data' in b_value:
-                data_list = b_value['data']
-                if isinstance(data_list, list) and len(data_list) > 0:
-                    first_product = data_list[0]
-                    title = first_product.get("title", "Untitled")
-                else:
-                    title = "Untitled"
-            else:
-                title = "Untitled"
-            productKey = "2712286816" # this is from where our products are starting
-
-            if productKey in data:
-                try:
-                    product_list = data[productKey]['b'].get('data', [])
-                    if not isinstance(product_list, list):
-                        product_list = [product_list]
-                    return product_list, title
-                except KeyError as e:
-                    print(f"eror accessing nested product data: {e}")
-                    return e
-            else:
-                 print(f"Key '{productKey}' not found in the JSON file.")
-                 return None, title
+            product_list = list(iter_products())
         except FileNotFoundError:
-            print("Error: products.json not found.")
+            logger.warning("products.json not found")
             return None, "Untitled"
-
+        except KeyError:
+            logger.warning("Key %r not found in products.json", PRODUCTS_KEY)
+            return None, read_store_title()
         except json.JSONDecodeError:
-            print("Error: JSON file is invalid.")
+            logger.warning("products.json is not valid JSON")
             return None, "Untitled"
 
+        return product_list, read_store_title()
+
 
     # -----------------------------------------------------
     # extract variants 
     # -----------------------------------------------------
     def extractOptions(self, product):
-        colors = []
-        sizes = []
-
-        for option in product.get("options", []):
-            if option.get("type") == "color":
-                for item in option.get("items", []):
-                    colors.append({
-                        "id": item.get("id"),
-                        "label": item.get("label"),
-                        "hex": item.get("values", [None])[0]
-                    })
-
-            if option.get("type") == "size":
-                for item in option.get("items", []):
-                    sizes.append({
-                        "id": item.get("id"),
-                        "label": item.get("label")
-                    })
-
-        return colors, sizes
+        return extract_options(product)
 
     # -----------------------------------------------------
     # generate variants from mextracted variants
     # -----------------------------------------------------
 
     def generateVariants(self, colors, sizes, price):
-        variants = []
-
-        for color in colors:
-            for size in sizes:
-                variants.append({
-                    "name": f"{color['label']}-{size['label']}",
-                    "variant_id": f"{color['id']}-{size['id']}",
-                    "price": price,
-                    "attributes": {
-                        "color": color.get("label"),
-                        "hex": color.get("hex"),
-                        "size": size.get("label")
-                    }
-                })
-
-        return variants
+        return generate_variants(colors, sizes, price)
 
     # -----------------------------------------------------
     # STORE PRODUCTS FROM JSON API
     # -----------------------------------------------------
     @action(detail=False, methods=["get", "post"], url_path="storeProductfromJson")
     def storeProductfromJson(self, request):
-        data, title = self.read_products_json()
-
         if request.method == "GET":
+            data, title = self.read_products_json()
             return Response({"status": "success", "products": data})
 
         if request.method == "POST":
-            if not data:
+            title = read_store_title()
+            if not os.path.exists(products_json_path()):
                 return Response({"error": "No data found"}, status=400)
+
             try:
                 store = Store.objects.get(
                     # name = title,
@@ -396,62 +402,30 @@ class ProductViewSet(viewsets.ModelViewSet):
                 )
             except Store.DoesNotExist:
                 return Response({"error": f"Store {title} not found for this user"})
-            created_count = 0
-            for product in data:
-                # craete product
-                title=product.get("title", "Untitled")
-                description=product.get("description", "")
-                url = store.url + product.get("path", "")
-                main_image=product.get("image", "")
-                product_id = product.get("id")
-                print('/n',created_count, title, description)
-                
-                # if exist then skip
-                if Product.objects.filter(product_id = product_id).exists():
-                    print("skiping existing product", product_id)
-                    continue
-                p = Product.objects.create(
-                    title=title,
-                    product_id = product_id,
-                    description=description,
-                    store = store,
-                    url = url,
-                    main_image = main_image,
-                    status = "new"
-                )
-
-                #  ok for varainsts => colro and size will be list of dicts so taht we can concatenate them for each different variant 
-                # extract colors and sizes
-                colors, sizes = self.extractOptions(product)
-                price=product["default_variant"].get("retail_price", 0)
-                variants = self.generateVariants(colors, sizes, price/100)
-                for variant in variants:
-                    # skip if variant exist
-                    if Variant.objects.filter(product = p, variant_id = variant["variant_id"]).exists():
-                        print("skipping exisitng variants: ", variant["variant_id"])
-                        continue
-
-                    Variant.objects.create(
-                    product=p,
-                    variant_id = variant["variant_id"],
-                    name = variant["name"],
-                    price=variant["price"],
-                    attributes= variant["attributes"],
-                    status = "new"
-                )
-                created_count += 1
 
-            return Response({"message": f"{created_count} products imported successfully"})
+            update_existing = str(request.data.get("update_existing", "")).lower() in ("1", "true", "yes")
+            return run_or_enqueue(
+                request, "import_products", store_id=store.id, update_existing=update_existing
+            )
 
 
 # ----------------------------------
 # geneate pin view set
 # ---------------------------------
 # -----------------------------------------------------
-class PinTemplateViewSet(viewsets.ModelViewSet):
-    queryset = PinTemplate.objects.all()
+class PinTemplateViewSet(CachedResponseMixin, FieldSelectionMixin, viewsets.ModelViewSet):
+    queryset = PinTemplate.objects.select_related("variant").order_by("-created_at", "-id")
     serializer_class = PinTemplateSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    compact_fields = {"id": "id", "title": "title", "variant_id": "variant_id", "thumbnail": "variant__image"}
+    selectable_fields = {
+        "description": "description",
+        "hashtags": "hashtags",
+        "alt_text": "alt_text",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
 
 
     def perform_create(self, serializer):
@@ -459,8 +433,6 @@ class PinTemplateViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"], url_path="generatedPin")
     def generatedPin(self, request):
-        created_count = 0
-
         title = "Print Hive"
 
         # 1. Get store for the logged-in user
@@ -476,90 +448,59 @@ class PinTemplateViewSet(viewsets.ModelViewSet):
         if not variants.exists():
             return Response({"error": "No variants found for this store"}, status=404)
 
-        # 3. Process all variants
-        for variant in variants:
-
-            # Skip duplicates
-            if PinTemplate.objects.filter(variant=variant).exists():
-                print("Skipping existing variant pin:", variant.variant_id)
-                continue
-
-            # Call AI
-            ai_output = generate_pin_content(
-                product_name=variant.product.title,
-                attributes=variant.attributes,
-                description=variant.product.description
-            )
-            print(ai_output)
-
-            pin = PinTemplate.objects.create(
-                variant=variant,
-                title=ai_output.get("title", variant.name),
-                description=ai_output.get("description", ""),
-                hashtags=ai_output.get("hashtags", ""),
-                alt_text=ai_output.get("alt_text", ""),
-                ai_prompt_used="auto_generated",
-                ai_response_id=""
-            )
-
-            created_count += 1
-
-        return Response({"message": f"{created_count} pin templates generated."})
+        # 3. Generate templates for variants that don't have one yet
+        try:
+            parallelism = int(request.data.get("parallelism") or 0) or None
+            batch_size = int(request.data.get("batch_size") or 0) or None
+        except (TypeError, ValueError):
+            return Response({"error": "parallelism and batch_size must be integers"}, status=400)
+
+        return run_or_enqueue(
+            request, "generate_templates",
+            store_id=store.id, parallelism=parallelism, batch_size=batch_size,
+        )
 
 
 
-class GeneratedPinViewSet(viewsets.ModelViewSet):
-    queryset = GeneratedPin.objects.all()
+class GeneratedPinViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
+    # Everything the nested template/variant serializers read, in one query.
+    queryset = GeneratedPin.objects.select_related("pin_template__variant").order_by("-created_at", "-id")
     serializer_class = GeneratedPinSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    compact_fields = {
+        "id": "id",
+        "title": "title",
+        "status": "status",
+        "thumbnail": "final_image",
+        "board": "board",
+    }
+    selectable_fields = {
+        "description": "description",
+        "pin_template_id": "pin_template_id",
+        "variant_id": "pin_template__variant_id",
+        "pinterest_pin_id": "pinterest_pin_id",
+        "error_message": "error_message",
+        "scheduled_at": "scheduled_at",
+        "posted_at": "posted_at",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
     boards = {"Aesthetic Cozy Outfits" : "904590343844451063",
               "Casual Women’s Graphic Tees":"904590343844479634",
               "Custom Hoodies": "904590343844551606",
               "Programmer Humor T-Shirts": "904590343844474181"}
 
     def get_user_access_token(self, user):
-        pa = PinterestAuth.objects.filter(user=user).first()
-        if not pa:
-            raise Exception("Pinterest not connected for this user")
-
-        if pa.expires_at and pa.expires_at < timezone.now() + timedelta(minutes=5):
-            pa = self.refresh_pinterest_token(pa)
-
-        return pa.access_token
+        return pinterest_client.get_user_access_token(user)
 
     def refresh_pinterest_token(self, pa: PinterestAuth):
-        token_url = "https://api.pinterest.com/v5/oauth/token"
-        client_id = settings.PINTEREST_APP_ID
-        client_secret = settings.PINTEREST_APP_SECRET
-        b64 = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
-        headers = {"Authorization": f"Basic {b64}", "Content-Type": "application/x-www-form-urlencoded"}
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": pa.refresh_token,
-        }
-        resp = requests.post(token_url, headers=headers, data=data, timeout=10)
-        resp.raise_for_status()
-        token_data = resp.json()
-        pa.access_token = token_data.get("access_token")
-        pa.refresh_token = token_data.get("refresh_token", pa.refresh_token)
-        expires_in = token_data.get("expires_in")
-        pa.expires_at = timezone.now() + timedelta(seconds=int(expires_in)) if expires_in else None
-        pa.scope = token_data.get("scope", pa.scope)
-        pa.save()
-        return pa
+        return pinterest_client.refresh_pinterest_token(pa)
 
-    SANDBOX_BASE_URL = "https://api-sandbox.pinterest.com/v5/"
+    SANDBOX_BASE_URL = pinterest_client.SANDBOX_BASE_URL
 
     def pinterest_request(self, user, method, endpoint, data=None):
-        token = self.get_user_access_token(user)
-        url = f"{self.SANDBOX_BASE_URL}{endpoint}"
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-        if method.upper() == "GET":
-            return requests.get(url, headers=headers, params=data)
-        elif method.upper() == "POST":
-            return requests.post(url, headers=headers, json=data)
-        raise Exception("Unsupported method")
+        return pinterest_client.pinterest_request(user, method, endpoint, data=data)
 
 
 
@@ -571,8 +512,6 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
     # ------------------------------------------------------
     @action(detail=False, methods=["post"], url_path="savePin")
     def save_pin(self, request):
-
-        created_count = 0
         store_title = "Print Hive"
 
         # 1. Validate store
@@ -594,27 +533,11 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
         if not pins.exists():
             return Response({"error": "No pin templates found"}, status=404)
 
-        # 4. Create GeneratedPin for each template
-        for pin in pins:
-
-            # Skip duplicates
-            if GeneratedPin.objects.filter(pin_template=pin).exists():
-                continue
-
-            GeneratedPin.objects.create(
-                final_image = pin['variant']["product"]["image"],
-                pin_template=pin,
-                title=pin.title,
-                description=pin.description,
-                board=self.boards["asthetic cozy outfits"],   # you can change if needed
-                status="draft",
-                pinterest_pin_id = pin, # abhichagne akrna hai 
-                ai_prompt_used="auto_generated"
-            )
-
-            created_count += 1
-
-        return Response({"message": f"{created_count} generated pins saved."})
+        # 4. Create GeneratedPin for each template without one
+        return run_or_enqueue(
+            request, "save_pins",
+            store_id=store.id, board=self.boards["Aesthetic Cozy Outfits"],  # you can change if needed
+        )
 
 
     # # =====================================================
@@ -641,12 +564,10 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
     # ------------------------------------------------------
     @action(detail=False, methods=["get"], url_path="pinterest/boards")
     def get_pinterest_boards(self, request):
-        access_token = settings.PINTEREST_ACCESS_TOKEN
-
         response = self.pinterest_request(
+            request.user,
             method="GET",
-            endpoint="boards",
-            token=access_token
+            endpoint="boards"
         )
 
         return Response(response.json(), status=response.status_code)
@@ -657,7 +578,6 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
     # ------------------------------------------------------
     @action(detail=False, methods=["post"], url_path="pinterest/createBoard")
     def create_pinterest_board(self, request):
-        access_token = settings.PINTEREST_ACCESS_TOKEN
         board_name = request.data.get("name")
 
         if not board_name:
@@ -666,9 +586,9 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
         payload = {"name": board_name}
 
         response = self.pinterest_request(
+            request.user,
             method="POST",
             endpoint="boards",
-            token=access_token,
             data=payload
         )
 
@@ -680,8 +600,6 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
     # ------------------------------------------------------
     @action(detail=False, methods=["post"], url_path="pinterest/postPin")
     def post_pin(self, request):
-        access_token = settings.PINTEREST_ACCESS_TOKEN
-
         board_id = request.data.get("board_id")
         title = request.data.get("title")
         description = request.data.get("description")
@@ -717,5 +635,28 @@ class GeneratedPinViewSet(viewsets.ModelViewSet):
 
         return Response(response.json(), status=response.status_code)
 
+    # ------------------------------------------------------
+    # POST MANY PINS TO PINTEREST
+    # ------------------------------------------------------
+    @action(detail=False, methods=["post"], url_path="pinterest/bulkPublish")
+    def bulk_publish(self, request):
+        """{"pins": [<GeneratedPin id> | <postPin body>, ...], "concurrency": 8}
+
+        Posts the pins concurrently and answers with one result per item
+        (posted / failed / deferred / uncertain / not_found / skipped), in order.
+        """
+        pins = request.data.get("pins")
+        try:
+            concurrency = int(request.data.get("concurrency") or 0) or None
+        except (TypeError, ValueError):
+            return Response({"error": "concurrency must be an integer"}, status=400)
+
+        try:
+            validate_items(pins)
+        except BulkPublishError as e:
+            return Response({"error": str(e)}, status=400)
+
+        return run_or_enqueue(request, "bulk_publish", pins=pins, concurrency=concurrency)
+
 
 
@@ -30,6 +30,9 @@ PINTEREST_ACCESS_TOKEN = os.getenv("PINTEREST_ACCESS_TOKEN")
 PINTEREST_APP_ID = os.getenv("PINTEREST_APP_ID")
 PINTEREST_APP_SECRET = os.getenv("PINTEREST_APP_SECRET")
 PINTEREST_REDIRECT_URI = os.getenv("PINTEREST_REDIRECT_URI")
+PINTEREST_API_BASE_URL = os.getenv("PINTEREST_API_BASE_URL", "https://api-sandbox.pinterest.com/v5/")
+# "fake" swaps Gemini for the local FakeModel (see pin_automate/generation)
+PIN_AI_MODEL = os.getenv("PIN_AI_MODEL", "gemini-2.5-flash")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
@@ -56,6 +59,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pin_forge.pin_automate.instrumentation.InstrumentationMiddleware',  # timings, query counts
     'corsheaders.middleware.CorsMiddleware',  # CORS
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -168,3 +172,123 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+
+# AI pin template generation (PinTemplateViewSet.generatedPin)
+PIN_GENERATION = {
+    'MAX_WORKERS': int(os.getenv("PIN_GENERATION_MAX_WORKERS", 8)),
+    'MAX_WORKERS_LIMIT': 32,  # cap for the per-request "parallelism" option
+    'TIMEOUT': 30,  # seconds per model call
+    'RETRIES': 3,
+    'BACKOFF': 1.0,  # base seconds, doubled on every retry
+    'FLUSH_SIZE': 25,  # templates written per bulk insert
+    'BATCH_SIZE': 1,  # variants per prompt; >1 enables batch prompts
+    'MAX_BATCH_SIZE': 20,  # cap for the per-request "batch_size" option
+}
+
+# Memoized AI pin content shared by variants with the same prompt inputs
+PIN_CONTENT_CACHE = {
+    'ENABLED': True,
+    'TTL': 30 * 24 * 3600,  # seconds
+    'MAX_ENTRIES': 50_000,  # least recently used entries are evicted first
+    'IGNORED_ATTRIBUTES': ['size'],  # attributes that don't change the copy
+}
+
+# Rendered pin creatives, cached under MEDIA_ROOT by a hash of their inputs
+# (needs Pillow; without it pins use the variant image as is)
+PIN_RENDERING = {
+    'ENABLED': True,
+    'WIDTH': 1000,  # 2:3, Pinterest's recommended pin size
+    'HEIGHT': 1500,
+    'QUALITY': 88,  # JPEG
+    'MAX_WORKERS': None,  # render processes; None uses every core
+    'FETCH_WORKERS': 8,  # concurrent source image downloads
+    'DIRECTORY': 'pins',  # under MEDIA_ROOT
+    'FONT': os.getenv("PIN_RENDERING_FONT"),  # TrueType path; Pillow's default font otherwise
+    'BOLD_FONT': os.getenv("PIN_RENDERING_BOLD_FONT"),
+    'BASE_URL': os.getenv("PIN_MEDIA_BASE_URL", ""),  # public origin Pinterest fetches MEDIA_URL from
+}
+
+# Downloaded product images, shared by every render that uses them
+IMAGE_CACHE = {
+    'ENABLED': True,
+    'DIRECTORY': os.getenv("IMAGE_CACHE_DIR", os.path.join(BASE_DIR, 'cache', 'images')),
+    'MAX_BYTES': 2 * 1024 ** 3,  # least recently used images are evicted beyond this
+    'MAX_IMAGE_BYTES': 20 * 1024 ** 2,  # larger downloads are refused
+    'MAX_DOWNLOADS': 8,  # concurrent downloads per process
+    'TTL': 7 * 24 * 3600,  # seconds before a URL is downloaded again
+}
+
+# Django caches; "responses" must be shared by the web and worker processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("RESPONSE_CACHE_DIR", os.path.join(BASE_DIR, 'cache', 'responses')),
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+}
+
+# Tests run against local-memory caches and a scratch MEDIA_ROOT
+TEST_RUNNER = 'pin_forge.pin_automate.test_runner.SandboxedTestRunner'
+
+# Per-user caching of product and pin template reads, invalidated by writes
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'responses',  # a key of CACHES
+    'TIMEOUT': 3600,  # seconds before an entry expires even without writes
+}
+
+# Spans, per-request query counts and the /metrics/ endpoint (Prometheus text)
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'METRICS_TOKEN': os.getenv("METRICS_TOKEN", ""),  # required as a Bearer token when set
+    'OTLP_ENDPOINT': os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", ""),  # e.g. http://localhost:4318/v1/traces
+    'SERVICE_NAME': 'pin_forge',
+}
+
+# Background job queue (python manage.py runworker --processes N)
+PIN_JOBS = {
+    'ASYNC': True,  # False runs sync/import/generate/save actions inline
+    'POLL_INTERVAL': 1.0,  # seconds an idle worker waits between polls
+    'STALE_AFTER': 600,  # seconds without a heartbeat before a job is requeued
+    'HEARTBEAT_INTERVAL': 60,  # seconds between heartbeats of a running job
+    'MAX_ATTEMPTS': 3,
+}
+
+# Publishing scheduler (python manage.py runscheduler)
+PINTEREST_PUBLISHING = {
+    'RATE_PER_MINUTE': 10,  # per Pinterest user; keep under the app's write quota
+    'BURST': 5,  # token bucket capacity per user
+    'BATCH_SIZE': 50,  # due pins examined per scheduler pass
+    'RECONCILE_AFTER': 300,  # seconds before an unanswered post is looked up on its board
+    'RECONCILE_PAGES': 5,  # board pages (100 pins each) searched per reconciliation
+    'POLL_INTERVAL': 5.0,
+    'DEFAULT_RETRY_AFTER': 60,  # used when a 429 has no Retry-After header
+    'BULK_CONCURRENCY': 8,  # pins posted in parallel by bulkPublish
+    'BULK_MAX_ITEMS': 500,  # pins accepted per bulkPublish request
+}
+
+# Shared keep-alive session for every outbound Pinterest call
+PINTEREST_HTTP = {
+    'POOL_CONNECTIONS': 4,  # distinct hosts kept in the pool
+    'POOL_MAXSIZE': int(os.getenv("PINTEREST_HTTP_POOL_MAXSIZE", 32)),  # connections per host
+    'CONNECT_TIMEOUT': 5,  # seconds
+    'READ_TIMEOUT': 30,  # seconds
+    'RETRIES': 3,  # GET/PUT/DELETE only; POSTs are never retried
+    'BACKOFF': 0.5,  # urllib3 backoff factor
+    'TOKEN_REFRESH_MARGIN': 300,  # refresh access tokens this many seconds before expiry
+    'TOKEN_CACHE_TTL': 300,  # max seconds a token is reused without re-reading the DB
+}
+
+# Storefront crawling (POST /api/stores/crawl/, python manage.py crawlstores)
+STORE_CRAWLER = {
+    'MAX_WORKERS': 8,  # storefronts fetched concurrently
+    'PER_HOST': 2,  # concurrent requests to any one host
+    'MIN_INTERVAL': 1.0,  # seconds between request starts to one host
+    'CONNECT_TIMEOUT': 5,  # seconds
+    'READ_TIMEOUT': 30,  # seconds
+    'USER_AGENT': 'pin_forge-crawler/1.0',
+}
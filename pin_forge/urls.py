@@ -1,11 +1,14 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import permissions
 from rest_framework.routers import DefaultRouter
 from rest_framework.schemas import get_schema_view
 path('api/', include('pin_forge.pin_automate.urls')),
+from pin_forge.pin_automate.instrumentation import metrics_view
 from pin_forge.pin_automate.views import (
-    UserViewSet, GroupViewSet, StoreViewSet, ProductViewSet, LoginView, PinTemplateViewSet, GeneratedPinViewSet, pinterest_auth_callback, pinterest_auth_start
+    UserViewSet, GroupViewSet, StoreViewSet, ProductViewSet, LoginView, PinTemplateViewSet, GeneratedPinViewSet, JobViewSet, pinterest_auth_callback, pinterest_auth_start
 )
 
 # include_docs_urls requires `coreapi` to be installed; create docs view
@@ -37,6 +40,7 @@ router.register(r'stores', StoreViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'pintemplates', PinTemplateViewSet)
 router.register(r'generatedpins', GeneratedPinViewSet)
+router.register(r'jobs', JobViewSet, basename='job')
 
 urlpatterns = [
     # Django admin
@@ -53,6 +57,9 @@ urlpatterns = [
     # Optional DRF Auth (login/logout for browsable API)
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 
+    # Prometheus scrape target
+    path('metrics/', metrics_view, name='metrics'),
+
     # API schema and optional docs
     path('api/schema/', schema_view, name='api-schema'),
 ]
@@ -63,3 +70,6 @@ if docs_view is not None:
         path('api/docs/', docs_view),
     ]
 
+# Rendered pin images; serve MEDIA_ROOT from the web server in production
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)